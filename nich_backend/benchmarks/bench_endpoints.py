@@ -0,0 +1,188 @@
+# benchmarks/bench_endpoints.py
+#
+# End-to-end benchmark of the YouTube endpoints against the offline fake API
+# (src/services/fake_youtube), so no quota is spent:
+#
+#   python benchmarks/bench_endpoints.py                      # default matrix
+#   python benchmarks/bench_endpoints.py --niches 1,5 --pages 1,3 --runs 10
+#   python benchmarks/bench_endpoints.py --json after.json --compare before.json
+#
+# Every run is cold: it searches niches / keywords no earlier run used (the synthetic
+# data is derived from the query), with an empty snapshot store. Reports p50/p95 latency,
+# YouTube API calls, HTTP round trips, quota units and peak traced memory per endpoint
+# and variant.
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_workdir = tempfile.mkdtemp(prefix="nich-bench-")
+os.environ.setdefault("YOUTUBE_FAKE_API", "synthetic")
+os.environ.setdefault("YOUTUBE_API_KEY", "benchmark-key")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'bench.db')}")
+os.environ.setdefault("HARVESTER_ENABLED", "false")
+os.environ.setdefault("YOUTUBE_DAILY_QUOTA", str(10 ** 9))
+os.environ.setdefault("QUOTA_BUDGET_ANONYMOUS", str(10 ** 9))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark of /api/search/viral-videos and /api/youtube/find_niches on the fake YouTube API.")
+    parser.add_argument("--niches", default="1,3,5", help="Niche counts of viral-videos (comma separated).")
+    parser.add_argument("--pages", default="1,3", help="search.list pages per niche of viral-videos.")
+    parser.add_argument("--channels", default="10,50", help="max_channels of find_niches.")
+    parser.add_argument("--videos", default="20,50", help="max_videos (per channel) of find_niches.")
+    parser.add_argument("--endpoints", default="viral,niches", help="Endpoints to run: viral, niches.")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per variant.")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Latency of each fake API call.")
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of fake API calls answered with an error.")
+    parser.add_argument("--json", dest="json_path", help="Writes the results to this file.")
+    parser.add_argument("--compare", help="Results file of an earlier run to compare with.")
+    return parser.parse_args()
+
+
+def int_list(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class Bench:
+    def __init__(self, app, fake_api, runs):
+        self.app = app
+        self.client = app.test_client()
+        self.fake_api = fake_api
+        self.runs = runs
+        self.sequence = 0
+
+    def unique(self, label):
+        self.sequence += 1
+        return f"{label}{self.sequence}"
+
+    def call(self, url):
+        """One cold request: (seconds, fake API stats, X-Quota-Units)."""
+        from src.services.search_snapshots import snapshot_store
+        snapshot_store.clear()
+        self.fake_api.reset_stats()
+        started = time.perf_counter()
+        response = self.client.get(url)
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} answered {response.status_code}: {response.get_data(as_text=True)[:300]}")
+        return elapsed, self.fake_api.stats(), int(response.headers.get("X-Quota-Units", 0))
+
+    def measure(self, endpoint, variant, make_url, setup=None):
+        if setup:
+            setup()
+        self.call(make_url())  # Warm-up: imports, discovery document, thread pools
+        timings, calls, round_trips, units, metered = [], [], [], [], []
+        for _ in range(self.runs):
+            elapsed, stats, quota_units = self.call(make_url())
+            timings.append(elapsed * 1000)
+            calls.append(stats["total_calls"])
+            round_trips.append(stats["round_trips"])
+            units.append(stats["quota_units"])
+            metered.append(quota_units)
+        # Peak memory on a separate run: tracing slows everything down
+        tracemalloc.start()
+        self.call(make_url())
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return {
+            "endpoint": endpoint,
+            "variant": variant,
+            "runs": self.runs,
+            "p50_ms": round(percentile(timings, 50), 1),
+            "p95_ms": round(percentile(timings, 95), 1),
+            "api_calls": round(statistics.mean(calls), 1),
+            "round_trips": round(statistics.mean(round_trips), 1),
+            "quota_units": round(statistics.mean(units), 1),
+            "metered_units": round(statistics.mean(metered), 1),
+            "peak_mib": round(peak / 2 ** 20, 2),
+        }
+
+
+def run_matrix(args):
+    from src.main import app
+    from src.routes import viral_search
+    from src.services.fake_youtube import get_fake_api
+
+    app.logger.setLevel("WARNING")
+    fake_api = get_fake_api()
+    fake_api.latency_ms, fake_api.jitter_ms, fake_api.error_rate = args.latency_ms, args.jitter_ms, args.error_rate
+    bench = Bench(app, fake_api, args.runs)
+    endpoints = args.endpoints.split(",")
+    results = []
+
+    if "viral" in endpoints:
+        for pages in int_list(args.pages):
+            for niche_count in int_list(args.niches):
+                def make_url(niche_count=niche_count):
+                    niches = ",".join(bench.unique("niche") for _ in range(niche_count))
+                    return f"/api/search/viral-videos?niches={niches}&platform=youtube&local_first=false&page_size=100"
+
+                def setup(pages=pages):
+                    viral_search.SEARCH_PAGES_PER_NICHE = pages
+                results.append(bench.measure("viral-videos", f"niches={niche_count} pages={pages}", make_url, setup))
+                print_row(results[-1])
+
+    if "niches" in endpoints:
+        for max_videos in int_list(args.videos):
+            for max_channels in int_list(args.channels):
+                def make_url(max_channels=max_channels, max_videos=max_videos):
+                    return f"/api/youtube/find_niches?keywords={bench.unique('keyword')}&max_channels={max_channels}&max_videos={max_videos}&max_subs=1000000&min_views=1000"
+                results.append(bench.measure("find_niches", f"channels={max_channels} videos={max_videos}", make_url))
+                print_row(results[-1])
+    return results
+
+
+COLUMNS = ("endpoint", "variant", "p50_ms", "p95_ms", "api_calls", "round_trips", "quota_units", "peak_mib")
+WIDTHS = (14, 24, 10, 10, 10, 12, 12, 10)
+
+
+def print_row(row):
+    print("".join(str(row[column]).ljust(width) for column, width in zip(COLUMNS, WIDTHS)), flush=True)
+
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(row["endpoint"], row["variant"]): row for row in json.load(f)["results"]}
+    print(f"\nChange against {baseline_path}:")
+    for row in results:
+        before = baseline.get((row["endpoint"], row["variant"]))
+        if not before:
+            continue
+        deltas = []
+        for column in ("p50_ms", "p95_ms", "api_calls", "round_trips", "quota_units", "peak_mib"):
+            if column not in before:
+                continue
+            change = (row[column] - before[column]) / before[column] * 100 if before[column] else 0.0
+            deltas.append(f"{column} {change:+.1f}%")
+        print(f"{row['endpoint']:<14}{row['variant']:<24}" + "  ".join(deltas))
+
+
+def main():
+    args = parse_args()
+    print(f"Fake API latency {args.latency_ms}±{args.jitter_ms} ms, error rate {args.error_rate}, {args.runs} runs per variant.")
+    print("".join(column.ljust(width) for column, width in zip(COLUMNS, WIDTHS)))
+    results = run_matrix(args)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+    if args.compare:
+        print_comparison(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# src/http_encoding.py
+
+import os
+import gzip
+import threading
+from collections import OrderedDict
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Sem o pacote brotli, só gzip é oferecido
+    brotli = None
+
+# Compressão (gzip/brotli conforme Accept-Encoding) e validação condicional (ETag /
+# If-None-Match -> 304) das respostas da API e dos arquivos estáticos do frontend.
+#
+# Respostas JSON de GET sem ETag recebem um ETag forte calculado do corpo; rotas que
+# conhecem um validador mais barato (ex.: o snapshot da busca viral) definem o próprio
+# ETag e respondem 304 antes de montar o corpo, com `etag_matches`/`not_modified`.
+# Cada codificação é uma representação diferente, então o ETag recebe o sufixo dela
+# ("<etag>-gzip"); a comparação aceita tanto o ETag base quanto os sufixados.
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))  # Corpos menores vão sem compressão
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+COMPRESSED_FILE_CACHE_ENTRIES = 64  # Arquivos estáticos comprimidos, por ETag e codificação
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "application/javascript", "text/javascript", "image/svg+xml")
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+_compressed_files = OrderedDict()
+_compressed_files_lock = threading.Lock()
+
+
+def _is_compressible(response):
+    return response.mimetype.startswith("text/") or response.mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def choose_encoding():
+    """Melhor codificação suportada pelo cliente (respeitando os pesos q), ou None."""
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def etag_matches(etag):
+    """True se o If-None-Match da requisição contém `etag` em qualquer codificação."""
+    if_none_match = request.if_none_match
+    return any(if_none_match.contains(tag) for tag in (etag,) + tuple(f"{etag}-{encoding}" for encoding in ENCODINGS))
+
+
+def not_modified(etag, response_class):
+    """Resposta 304 para o ETag (ou a variante codificada dele) enviado pelo cliente."""
+    response = response_class(status=304)
+    matched = next((tag for tag in request.if_none_match.as_set() if tag.startswith(etag)), etag)
+    response.set_etag(matched)
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def _compressed_file(etag, encoding, response):
+    """Corpo comprimido de um arquivo estático, reaproveitado enquanto o ETag não mudar."""
+    key = (etag, encoding)
+    with _compressed_files_lock:
+        if key in _compressed_files:
+            _compressed_files.move_to_end(key)
+            return _compressed_files[key]
+    data = compress(response.get_data(), encoding)
+    with _compressed_files_lock:
+        _compressed_files[key] = data
+        while len(_compressed_files) > COMPRESSED_FILE_CACHE_ENTRIES:
+            _compressed_files.popitem(last=False)
+    return data
+
+
+def encode_response(response):
+    """after_request: ETag, 304 condicional e compressão (respostas em streaming passam direto)."""
+    is_file = response.direct_passthrough  # Arquivos de send_from_directory (iteráveis, mas de tamanho conhecido)
+    if request.method not in ("GET", "HEAD") or response.status_code != 200 or (response.is_streamed and not is_file):
+        return response
+    if "Content-Encoding" in response.headers:
+        return response
+    if response.mimetype == "application/json" and not response.get_etag()[0]:
+        response.add_etag()
+
+    encoding = None
+    if _is_compressible(response):
+        response.vary.add("Accept-Encoding")
+        if response.content_length is None or response.content_length >= COMPRESSION_MIN_BYTES:
+            encoding = choose_encoding()
+    etag, weak = response.get_etag()
+    if etag:
+        if encoding:
+            response.set_etag(f"{etag}-{encoding}", weak)
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+
+    if encoding:
+        response.direct_passthrough = False  # O corpo do arquivo é lido para comprimir
+        data = _compressed_file(etag, encoding, response) if is_file and etag else compress(response.get_data(), encoding)
+        response.set_data(data)
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_http_encoding(app):
+    app.after_request(encode_response)
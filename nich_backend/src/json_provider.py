@@ -0,0 +1,31 @@
+# src/json_provider.py
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Sem orjson, o provedor padrão do Flask continua sendo usado
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Provedor JSON do Flask baseado no orjson.
+
+    Os registros com __slots__ de src.models.records (dataclasses) são serializados
+    direto pelo orjson, sem dict intermediário. Datas e demais tipos que o orjson não
+    trata como o Flask passam pelo `default` do Flask, então a saída das outras rotas
+    não muda. Sem orjson instalado, tudo funciona como o DefaultJSONProvider.
+    """
+
+    OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.OPTIONS).decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self.default, option=self.OPTIONS | orjson.OPT_APPEND_NEWLINE), mimetype=self.mimetype)
@@ -7,20 +7,34 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, send_from_directory
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_cors import CORS # Importar Flask-CORS
-# from src.models.niche_data import db # Removido - DB não está sendo usado
+from src.models.niche_data import NicheData, NicheCoverage, TrendingNiche  # Armazém local de vídeos (tabelas criadas abaixo)
 from src.routes.user import user_bp
 from src.routes.youtube import youtube_bp
 from src.routes.stripe_payment import payment_bp
 from src.routes.viral_search import viral_search_bp
 from src.routes.auth import auth_bp  # Adicionado - Importação do blueprint de autenticação
+from src.routes.quota import quota_bp
+from src.routes.search_jobs import search_jobs_bp
+from src.routes.trending import trending_bp
 from src.models.user import db  # Importação do db do modelo de usuário
-# from src.scheduler import init_scheduler # Removido - Scheduler não está sendo usado
+from src.json_provider import FastJSONProvider
+from src.http_encoding import init_http_encoding
+from src.scheduler import init_scheduler, HARVESTER_ENABLED
 
 # Inicializa a aplicação Flask
 # static_folder aponta para onde os arquivos estáticos do frontend (React build) estarão
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config["SECRET_KEY"] = os.getenv("FLASK_SECRET_KEY", "default_secret_key_for_dev") # Chave secreta para sessões, etc.
+app.json = FastJSONProvider(app) # Serialização JSON rápida (orjson), inclusive dos registros de src.models.records
+init_http_encoding(app) # gzip/brotli conforme Accept-Encoding e ETag / If-None-Match (304) nas respostas GET
+
+# Atrás do roteador do Heroku o IP do cliente é o último salto de X-Forwarded-For (acrescentado pelo proxy);
+# os anteriores vêm do cliente e não são confiáveis. TRUSTED_PROXY_COUNT=0 quando o app recebe conexões diretas.
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", "1"))
+if TRUSTED_PROXY_COUNT > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT)
 
 # Configurar CORS para permitir requisições da origem do frontend
 # Em desenvolvimento, permita a origem específica do servidor de desenvolvimento do frontend.
@@ -38,11 +52,19 @@ app.register_blueprint(youtube_bp, url_prefix="/api/youtube") # Rotas da API do
 app.register_blueprint(payment_bp, url_prefix="/api/payment") # Rotas de pagamento Stripe
 app.register_blueprint(viral_search_bp, url_prefix="/api/search") # Rotas de busca viral
 app.register_blueprint(auth_bp) # Rotas de autenticação (já tem prefix /api/auth)
+app.register_blueprint(quota_bp) # Uso da quota da API do YouTube (já tem prefix /api/quota)
+app.register_blueprint(search_jobs_bp) # Buscas em segundo plano (já tem prefix /api/jobs)
+app.register_blueprint(trending_bp) # Nichos em tendência (já tem prefix /api/trending)
 
 # Criar tabelas do banco de dados
 with app.app_context():
     db.create_all()
 
+# Coletor de nichos populares em segundo plano (horários de baixo uso); desligado por padrão,
+# ative com HARVESTER_ENABLED=true apenas no processo que deve coletar
+if HARVESTER_ENABLED:
+    scheduler = init_scheduler(app)
+
 # Rota para servir o frontend React (build estático) - Esta parte não é usada quando o frontend está em modo de desenvolvimento (pnpm dev)
 @app.route("/", defaults={"path": ""})
 @app.route("/<path:path>")
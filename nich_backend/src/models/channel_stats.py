@@ -0,0 +1,33 @@
+from datetime import datetime
+from src.models.user import db
+from src.models.records import ChannelRecord
+
+class ChannelStats(db.Model):
+    """Cache persistente de estatísticas de canais do YouTube (compartilhado entre workers)."""
+    __tablename__ = 'channel_stats'
+
+    channel_id = db.Column(db.String(64), primary_key=True)
+    title = db.Column(db.String(255))
+    subscriber_count = db.Column(db.BigInteger, nullable=True)  # None quando oculto
+    video_count = db.Column(db.BigInteger, nullable=True)
+    hidden_subscriber_count = db.Column(db.Boolean, default=False)
+    uploads_playlist_id = db.Column(db.String(64), nullable=True)  # contentDetails.relatedPlaylists.uploads
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def to_record(self):
+        return ChannelRecord(
+            self.channel_id, self.title, self.subscriber_count, self.video_count,
+            self.hidden_subscriber_count, self.fetched_at.isoformat() if self.fetched_at else None,
+            self.uploads_playlist_id,
+        )
+
+    def to_dict(self):
+        return {
+            'channelId': self.channel_id,
+            'title': self.title,
+            'subscriberCount': self.subscriber_count,
+            'videoCount': self.video_count,
+            'hiddenSubscriberCount': self.hidden_subscriber_count,
+            'fetchedAt': self.fetched_at.isoformat() if self.fetched_at else None,
+            'uploadsPlaylistId': self.uploads_playlist_id
+        }
@@ -0,0 +1,26 @@
+from datetime import datetime
+from src.models.user import db
+
+class ChannelSyncState(db.Model):
+    """Marca d'água da sincronização de uploads de um canal.
+
+    Guarda o vídeo mais novo já visto na playlist de uploads e até onde o histórico está
+    completo: todos os uploads publicados entre covered_since e newest_published_at estão
+    em video_details, então a próxima busca só pagina a playlist até a marca.
+    """
+    __tablename__ = 'channel_sync_state'
+
+    channel_id = db.Column(db.String(64), primary_key=True)
+    newest_video_id = db.Column(db.String(64), nullable=True)  # None quando não há uploads na janela
+    newest_published_at = db.Column(db.DateTime, nullable=True)
+    covered_since = db.Column(db.DateTime, nullable=False)  # UTC sem fuso, como as outras colunas
+    synced_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        return {
+            'channelId': self.channel_id,
+            'newestVideoId': self.newest_video_id,
+            'newestPublishedAt': self.newest_published_at.isoformat() if self.newest_published_at else None,
+            'coveredSince': self.covered_since.isoformat() if self.covered_since else None,
+            'syncedAt': self.synced_at.isoformat() if self.synced_at else None
+        }
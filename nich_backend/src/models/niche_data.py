@@ -1,47 +1,81 @@
 # src/models/niche_data.py
 
-# ATENÇÃO: Este módulo e seus modelos (NicheData, TrendingNiche) NÃO estão sendo usados atualmente.
-# A funcionalidade de "Top 10 Nichos" que utilizaria este módulo foi removida a pedido do usuário.
-# O código é mantido aqui para referência futura, caso a funcionalidade seja reativada.
-
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-
-# Supondo que \'db\' seja inicializado em main.py ou em um arquivo de extensão
-# from src.main import db # Evitar import circular, melhor inicializar em um local central
-# Por enquanto, vamos assumir que db é um objeto SQLAlchemy válido passado ou importado
-
-db = SQLAlchemy() # Placeholder - idealmente importado de onde foi inicializado
+from src.models.user import db
 
 class NicheData(db.Model):
-    """Modelo para armazenar dados brutos de vídeos/canais encontrados.
-    
-    Atualmente NÃO UTILIZADO.
+    """Armazém local de vídeos/canais encontrados pelas buscas, por palavra-chave (nicho).
+
+    Cada busca faz upsert dos vídeos que obteve (com os dados do canal no momento da coleta),
+    e o modo "local-first" da busca viral responde os filtros direto desta tabela.
+    source: 'shorts' (/api/search/viral-videos) ou 'niches' (/api/youtube/find_niches).
     """
-    __tablename__ = \'niche_data\'
+    __tablename__ = 'niche_data'
+    __table_args__ = (
+        db.UniqueConstraint('keyword', 'source', 'video_id', name='uq_niche_data_keyword_source_video'),
+        db.Index('ix_niche_data_keyword_published', 'keyword', 'video_published_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    keyword = db.Column(db.String(255), nullable=False, index=True)
+    keyword = db.Column(db.String(255), nullable=False)
+    source = db.Column(db.String(20), nullable=False, default='shorts')
     channel_id = db.Column(db.String(255), nullable=False, index=True)
-    video_id = db.Column(db.String(255), nullable=False, unique=True) # Vídeo único
+    video_id = db.Column(db.String(255), nullable=False)
     channel_name = db.Column(db.String(255))
     video_title = db.Column(db.String(500))
-    subscriber_count = db.Column(db.Integer)
-    view_count = db.Column(db.Integer)
+    thumbnail_url = db.Column(db.String(500))
+    subscriber_count = db.Column(db.BigInteger, index=True)
+    channel_video_count = db.Column(db.BigInteger)
+    view_count = db.Column(db.BigInteger, index=True)
+    like_count = db.Column(db.BigInteger)
+    comment_count = db.Column(db.BigInteger)
     views_per_subscriber = db.Column(db.Float)
     video_published_at = db.Column(db.DateTime)
     data_collected_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     def __repr__(self):
-        return f\'<NicheData {self.keyword} - {self.channel_name} - {self.video_title}>\'
+        return f'<NicheData {self.keyword} - {self.channel_name} - {self.video_title}>'
 
-# Poderíamos adicionar outra tabela para agregar os dados semanais do Top 10
-class TrendingNiche(db.Model):
-    """Modelo para armazenar os resultados calculados dos nichos em tendência.
-    
-    Atualmente NÃO UTILIZADO.
+class NicheCoverage(db.Model):
+    """Última busca completa de um nicho gravada em NicheData e os filtros com que foi feita.
+
+    Só os vídeos que passaram nesses filtros foram guardados, então o armazém responde
+    buscas do nicho com filtros iguais ou mais restritos (None = sem limite).
     """
-    __tablename__ = \'trending_niches\'
+    __tablename__ = 'niche_coverage'
+
+    keyword = db.Column(db.String(255), primary_key=True)
+    source = db.Column(db.String(20), primary_key=True, default='shorts')
+    started_at = db.Column(db.DateTime, nullable=False)
+    searched_at = db.Column(db.DateTime, nullable=False, index=True)
+    published_after = db.Column(db.DateTime, nullable=False)
+    min_views = db.Column(db.BigInteger, nullable=False, default=0)
+    max_subs = db.Column(db.BigInteger, nullable=True)
+    max_channel_videos_total = db.Column(db.BigInteger, nullable=True)
+    video_count = db.Column(db.Integer, default=0)
+
+class NicheDemand(db.Model):
+    """Quantas vezes cada nicho foi buscado (o coletor em segundo plano atualiza os mais pedidos primeiro)."""
+    __tablename__ = 'niche_demand'
+
+    keyword = db.Column(db.String(255), primary_key=True)
+    request_count = db.Column(db.Integer, default=0, nullable=False, index=True)
+    last_requested_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class NicheWeeklyStats(db.Model):
+    """Métricas semanais por nicho, calculadas a partir de NicheData (semana = coleta, a partir de segunda)."""
+    __tablename__ = 'niche_weekly_stats'
+
+    keyword = db.Column(db.String(255), primary_key=True)
+    week_start_date = db.Column(db.Date, primary_key=True)
+    video_count = db.Column(db.Integer, nullable=False, default=0)
+    median_views_per_subscriber = db.Column(db.Float)
+    median_view_count = db.Column(db.Float)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+class TrendingNiche(db.Model):
+    """Top N de nichos em tendência por semana, materializado pelo motor de tendências."""
+    __tablename__ = 'trending_niches'
 
     id = db.Column(db.Integer, primary_key=True)
     week_start_date = db.Column(db.Date, nullable=False, index=True)
@@ -49,15 +83,22 @@ class TrendingNiche(db.Model):
     keyword = db.Column(db.String(255), nullable=False)
     # Métricas que definem o "trending" (ex: crescimento médio de views/sub)
     trend_score = db.Column(db.Float)
+    video_count = db.Column(db.Integer)
+    median_views_per_subscriber = db.Column(db.Float)
+    week_over_week_change = db.Column(db.Float, nullable=True)  # None quando o nicho não tem semana anterior
     # Outros dados relevantes (ex: número de vídeos/canais analisados)
     notes = db.Column(db.Text)
 
     def __repr__(self):
-        return f\'<TrendingNiche Week {self.week_start_date} Rank {self.rank} - {self.keyword}>\'
-
-# Função para inicializar o db (se não for feito em main.py)
-# def init_db(app):
-#     db.init_app(app)
-#     with app.app_context():
-#         db.create_all()
+        return f'<TrendingNiche Week {self.week_start_date} Rank {self.rank} - {self.keyword}>'
 
+    def to_dict(self):
+        return {
+            'weekStartDate': self.week_start_date.isoformat() if self.week_start_date else None,
+            'rank': self.rank,
+            'keyword': self.keyword,
+            'trendScore': self.trend_score,
+            'videoCount': self.video_count,
+            'medianViewsPerSubscriber': self.median_views_per_subscriber,
+            'weekOverWeekChange': self.week_over_week_change,
+        }
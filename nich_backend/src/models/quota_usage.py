@@ -0,0 +1,30 @@
+from datetime import datetime
+from src.models.user import db
+
+class QuotaUsage(db.Model):
+    """Unidades de quota da API do YouTube consumidas por dia, escopo e método.
+
+    scope: 'global', 'user:<id>', 'anon:<ip>' ou 'system' (tarefas em segundo plano).
+    day: dia de quota do YouTube (meia-noite no horário do Pacífico).
+    """
+    __tablename__ = 'quota_usage'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'scope', 'method', name='uq_quota_usage_day_scope_method'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    scope = db.Column(db.String(120), nullable=False)
+    method = db.Column(db.String(100), nullable=False)
+    calls = db.Column(db.Integer, default=0, nullable=False)
+    units = db.Column(db.BigInteger, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'scope': self.scope,
+            'method': self.method,
+            'calls': self.calls,
+            'units': self.units
+        }
@@ -0,0 +1,61 @@
+# src/models/records.py
+
+# Registros leves (sem banco de dados) para vídeos e canais que circulam pelas buscas.
+# Usam __slots__ (sem __dict__ por instância) e os nomes dos atributos são os próprios
+# nomes dos campos JSON da API, então o provedor JSON (src/json_provider.py) serializa
+# cada registro direto, sem montar um dict intermediário.
+
+from dataclasses import dataclass
+
+
+@dataclass
+class ChannelRecord:
+    """Canal do YouTube como guardado em ChannelStats."""
+    __slots__ = ("channelId", "title", "subscriberCount", "videoCount", "hiddenSubscriberCount", "fetchedAt", "uploadsPlaylistId")
+    channelId: str
+    title: str
+    subscriberCount: int
+    videoCount: int
+    hiddenSubscriberCount: bool
+    fetchedAt: str
+    uploadsPlaylistId: str
+
+
+@dataclass
+class ShortVideoRecord:
+    """Resultado de /api/search/viral-videos (YouTube Shorts ou TikTok)."""
+    __slots__ = (
+        "id", "platform", "niche", "videoTitle", "videoLink", "thumbnailUrl", "publishedAt",
+        "viewCount", "likeCount", "commentCount", "channelName", "channelLink", "subscriberCount",
+    )
+    id: str
+    platform: str
+    niche: str
+    videoTitle: str
+    videoLink: str
+    thumbnailUrl: str
+    publishedAt: str
+    viewCount: int
+    likeCount: int
+    commentCount: int
+    channelName: str
+    channelLink: str
+    subscriberCount: int
+
+
+@dataclass
+class NicheVideoRecord:
+    """Resultado de /api/youtube/find_niches."""
+    __slots__ = (
+        "channelName", "channelLink", "subscriberCount", "videoTitle", "videoLink",
+        "publishedAt", "viewCount", "viewsPerSubscriber", "keyword",
+    )
+    channelName: str
+    channelLink: str
+    subscriberCount: int
+    videoTitle: str
+    videoLink: str
+    publishedAt: str
+    viewCount: int
+    viewsPerSubscriber: float
+    keyword: str
@@ -0,0 +1,12 @@
+from datetime import datetime
+from src.models.user import db
+
+class SchedulerLock(db.Model):
+    """Lock com prazo (lease) para tarefas agendadas: cada worker do gunicorn agenda a tarefa,
+    mas só quem detém o lock a executa."""
+    __tablename__ = 'scheduler_locks'
+
+    name = db.Column(db.String(100), primary_key=True)
+    owner = db.Column(db.String(255), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    acquired_at = db.Column(db.DateTime, default=datetime.utcnow)
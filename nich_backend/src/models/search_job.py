@@ -0,0 +1,57 @@
+import json
+from datetime import datetime
+from src.models.user import db
+
+class SearchJob(db.Model):
+    """Busca executada em segundo plano (viral-videos ou find_niches).
+
+    kind: 'viral' ou 'niches'. params_key: hash dos parâmetros normalizados, usado para
+    reaproveitar jobs idênticos ainda pendentes do mesmo scope. active_key: único enquanto o
+    job está pendente e NULL depois de terminado, para que dois workers não enfileirem o mesmo
+    job. result/progress são JSON.
+    """
+    __tablename__ = 'search_jobs'
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    PENDING_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    params_key = db.Column(db.String(64), nullable=False, index=True)
+    active_key = db.Column(db.String(64), nullable=True, unique=True)
+    params = db.Column(db.Text, nullable=False)
+    scope = db.Column(db.String(120), nullable=False)
+    tier = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), default=STATUS_QUEUED, nullable=False, index=True)
+    progress = db.Column(db.Text, nullable=True)
+    result = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    quota_units = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def is_finished(self):
+        return self.status not in self.PENDING_STATUSES
+
+    def to_dict(self, include_result=False):
+        data = {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'params': json.loads(self.params) if self.params else None,
+            'progress': json.loads(self.progress) if self.progress else None,
+            'error': self.error,
+            'quotaUnits': self.quota_units,
+            'createdAt': self.created_at.isoformat() if self.created_at else None,
+            'startedAt': self.started_at.isoformat() if self.started_at else None,
+            'finishedAt': self.finished_at.isoformat() if self.finished_at else None,
+        }
+        if include_result:
+            data['result'] = json.loads(self.result) if self.result else None
+        return data
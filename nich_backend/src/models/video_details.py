@@ -0,0 +1,39 @@
+from datetime import datetime
+from src.models.user import db
+
+class VideoDetails(db.Model):
+    """Cache persistente de detalhes de vídeos do YouTube.
+
+    Os metadados estáticos (título, publicação, thumbnails, duração) nunca expiram;
+    as estatísticas têm o próprio carimbo de tempo (stats_fetched_at) e TTL curto.
+    """
+    __tablename__ = 'video_details'
+
+    video_id = db.Column(db.String(64), primary_key=True)
+    channel_id = db.Column(db.String(64), index=True)
+    title = db.Column(db.String(500))
+    published_at = db.Column(db.DateTime)
+    thumbnail_default = db.Column(db.String(500))
+    thumbnail_high = db.Column(db.String(500))
+    duration_seconds = db.Column(db.Integer, nullable=True)
+    metadata_fetched_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    view_count = db.Column(db.BigInteger, nullable=True)
+    like_count = db.Column(db.BigInteger, nullable=True)
+    comment_count = db.Column(db.BigInteger, nullable=True)
+    stats_fetched_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            'videoId': self.video_id,
+            'channelId': self.channel_id,
+            'title': self.title,
+            'publishedAt': self.published_at.strftime('%Y-%m-%dT%H:%M:%SZ') if self.published_at else None,
+            'thumbnailDefault': self.thumbnail_default,
+            'thumbnailUrl': self.thumbnail_high,
+            'durationSeconds': self.duration_seconds,
+            'viewCount': self.view_count,
+            'likeCount': self.like_count,
+            'commentCount': self.comment_count,
+            'statsFetchedAt': self.stats_fetched_at.isoformat() if self.stats_fetched_at else None
+        }
@@ -20,7 +20,7 @@ def generate_token(user_id):
     payload = {
         'exp': datetime.datetime.utcnow() + datetime.timedelta(days=30),
         'iat': datetime.datetime.utcnow(),
-        'sub': user_id
+        'sub': str(user_id)  # O PyJWT recente exige que o 'sub' seja string
     }
     return jwt.encode(
         payload,
@@ -46,7 +46,7 @@ def token_required(f):
         try:
             # Decodificar o token
             data = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
-            current_user = User.query.get(data['sub'])
+            current_user = User.query.get(int(data['sub']))
             if not current_user:
                 return jsonify({'message': 'User not found!'}), 401
         except jwt.ExpiredSignatureError:
@@ -0,0 +1,44 @@
+# src/routes/quota.py
+
+from flask import Blueprint, jsonify, current_app
+from src.services.quota import (
+    TIER_BUDGETS, quota_day, resolve_principal, budget_status, usage_breakdown, units_used, global_daily_quota
+)
+from src.services.key_pool import key_pool
+
+quota_bp = Blueprint("quota", __name__, url_prefix="/api/quota")
+
+@quota_bp.route("/usage", methods=["GET"])
+def get_usage():
+    """Uso da quota da API do YouTube hoje: do chamador (por token ou IP) e global."""
+    try:
+        scope, tier, _ = resolve_principal()
+        return jsonify({
+            "day": quota_day().isoformat(),
+            "caller": dict(budget_status(scope, tier), by_method=usage_breakdown(scope)),
+            "global": {
+                "used_units": units_used("global"),
+                "daily_quota": global_daily_quota(),
+                "by_method": usage_breakdown("global"),
+                "background_units": units_used("system"),
+            },
+            "tier_budgets": TIER_BUDGETS,
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error reading quota usage: {e}", exc_info=True)
+        return jsonify({"error": "Failed to read quota usage."}), 500
+
+@quota_bp.route("/keys", methods=["GET"])
+def get_key_pool():
+    """Saúde do pool de chaves da API do YouTube: uso de hoje, folga e chaves esgotadas até o reset."""
+    try:
+        keys = key_pool.status()
+        return jsonify({
+            "day": quota_day().isoformat(),
+            "keys": keys,
+            "available_keys": sum(1 for key in keys if key["available"]),
+            "daily_quota": global_daily_quota(),
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error reading API key pool status: {e}", exc_info=True)
+        return jsonify({"error": "Failed to read API key pool status."}), 500
@@ -0,0 +1,164 @@
+# src/routes/search_jobs.py
+
+import time
+from flask import Blueprint, Response, request, jsonify, current_app, url_for, stream_with_context
+from werkzeug.datastructures import MultiDict
+from src.models.user import db
+from src.models.search_job import SearchJob
+from src.routes.viral_search import parse_viral_search_args, make_viral_search_key, run_viral_search, format_stream_event
+from src.routes.youtube import parse_find_niches_args, collect_niche_results
+from src.services.youtube_data import get_youtube_client
+from src.services.search_snapshots import make_search_key
+from src.services.result_columns import ResultColumns, SORT_KEYS, DEFAULT_SORT
+from src.services.video_store import channel_view_history
+from src.services.search_jobs import job_runner, get_job, purge_expired_jobs, JobQueueFull
+from src.services.quota import check_budget
+from src.services.niche_warehouse import record_niche_requests
+
+search_jobs_bp = Blueprint("search_jobs", __name__, url_prefix="/api/jobs")
+
+EVENTS_POLL_INTERVAL_SECONDS = 1.0
+
+
+def run_viral_job(params, on_progress):
+    niches_total = len(params["niches"])
+    niches_done = []
+
+    def on_niche_done(niche):
+        niches_done.append(niche)
+        on_progress({"niche": niche, "niches_done": len(niches_done), "niches_total": niches_total})
+
+    snapshot = run_viral_search(params, on_niche_done=on_niche_done)
+    return {
+        "results": snapshot.results,
+        "totals": {
+            "total_results": snapshot.total_results,
+            "youtube_results": snapshot.meta.get("youtube_results", 0),
+            "tiktok_results": snapshot.meta.get("tiktok_results", 0),
+        },
+        "plan": snapshot.meta.get("plan"),
+        "degraded": snapshot.meta.get("degraded"),
+    }
+
+
+def run_niches_job(params, on_progress):
+    youtube = get_youtube_client()
+    if not youtube:
+        raise RuntimeError("Falha ao conectar com a API do YouTube.")
+    incomplete_channels = []
+    results = collect_niche_results(youtube, params, incomplete_channels=incomplete_channels)  # Sem prazo total: o job não segura uma requisição
+    return {"results": results, "incomplete_channels": incomplete_channels}
+
+
+def niches_search_key(params):
+    filters = {name: value for name, value in params.items() if name != "keywords"}
+    return make_search_key([params["keywords"]], **filters)
+
+
+# kind -> (parse request params, key of identical searches, job body)
+JOB_KINDS = {
+    "viral": (parse_viral_search_args, make_viral_search_key, run_viral_job),
+    "niches": (parse_find_niches_args, niches_search_key, run_niches_job),
+}
+
+
+def _job_args(raw_params):
+    """Turns the JSON params of a job into a MultiDict, so the endpoints' parsers can be reused."""
+    args = MultiDict()
+    for name, value in (raw_params or {}).items():
+        if isinstance(value, list):
+            value = ",".join(str(v) for v in value)
+        args[name] = str(value)
+    return args
+
+
+@search_jobs_bp.route("", methods=["POST"])
+def create_job():
+    """Queues a viral-videos or find_niches search and returns its id right away (202).
+
+    Body: {"kind": "viral" | "niches", "params": {same query parameters as the endpoint}}.
+    An identical search the same caller still has queued or running is reused instead of started twice.
+    """
+    data = request.get_json(silent=True) or {}
+    kind = data.get("kind")
+    if kind not in JOB_KINDS:
+        return jsonify({"error": f"Invalid job kind. Use one of: {', '.join(JOB_KINDS)}."}), 400
+    parse_args, search_key, run = JOB_KINDS[kind]
+    params = parse_args(_job_args(data.get("params")))
+    if kind == "viral" and not params["niches"]:
+        return jsonify({"error": "No niches provided"}), 400
+    if kind == "niches" and not params["keywords"]:
+        return jsonify({"error": "Parâmetro \"keywords\" é obrigatório"}), 400
+
+    scope, tier, _, error = check_budget()
+    if error:
+        return error
+
+    purge_expired_jobs()
+    if kind == "viral":
+        record_niche_requests(params["niches"])
+    try:
+        job, reused = job_runner.submit(kind, params, search_key(params), run, scope, tier)
+    except JobQueueFull:
+        current_app.logger.warning(f"Search job queue full, rejecting {kind} job for {scope}.")
+        response = jsonify({"error": "Too many searches in progress. Try again in a few seconds."})
+        response.headers["Retry-After"] = "10"
+        return response, 503
+    except Exception as e:
+        current_app.logger.error(f"Failed to queue {kind} search job: {e}", exc_info=True)
+        return jsonify({"error": "Failed to queue the search."}), 500
+
+    response = jsonify(dict(job, reused=reused))
+    response.headers["Location"] = url_for("search_jobs.get_job_status", job_id=job["id"])
+    return response, 202
+
+
+@search_jobs_bp.route("/<job_id>", methods=["GET"])
+def get_job_status(job_id):
+    """Status and progress of a job; once it succeeded, a page of its results (page, page_size, sort)."""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found."}), 404
+    data = job.to_dict()
+    if job.status == SearchJob.STATUS_SUCCEEDED:
+        page = request.args.get("page", default=1, type=int)
+        page_size = request.args.get("page_size", default=100, type=int)
+        sort = request.args.get("sort", default=DEFAULT_SORT if job.kind == "viral" else "views_per_subscriber", type=str)
+        if sort not in SORT_KEYS:
+            return jsonify({"error": f"Invalid sort. Use one of: {', '.join(SORT_KEYS)}."}), 400
+        result = job.to_dict(include_result=True)["result"] or {}
+        data["results"], data["pagination"] = ResultColumns(result.get("results", []), channel_view_history).page(page, page_size, sort)
+        data["totals"] = result.get("totals")
+        data["plan"] = result.get("plan")
+    return jsonify(data), 200
+
+
+@search_jobs_bp.route("/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    """Server-Sent Events with the job status: `status` on every change, then `done`."""
+    if not get_job(job_id):
+        return jsonify({"error": "Job not found."}), 404
+
+    def generate():
+        last_state = None
+        while True:
+            job = get_job(job_id)
+            if not job:
+                yield format_stream_event("sse", "error", {"error": "Job not found."})
+                return
+            data = job.to_dict()
+            state = (data["status"], data["progress"])
+            if job.is_finished:
+                yield format_stream_event("sse", "done", data)
+                return
+            if state != last_state:
+                yield format_stream_event("sse", "status", data)
+                last_state = state
+            # Ends the read transaction so the next poll sees the worker's commits
+            db.session.rollback()
+            time.sleep(EVENTS_POLL_INTERVAL_SECONDS)
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,26 @@
+# src/routes/trending.py
+
+from datetime import date
+from flask import Blueprint, request, jsonify, current_app
+from src.models.niche_data import TrendingNiche
+from src.services.trending import TRENDING_TOP_N, latest_trending_week
+
+trending_bp = Blueprint("trending", __name__, url_prefix="/api/trending")
+
+@trending_bp.route("", methods=["GET"])
+def get_trending_niches():
+    """Nichos em tendência materializados pelo motor semanal (semana mais recente por padrão)."""
+    try:
+        week = request.args.get("week", default=None, type=str)  # Segunda-feira da semana, YYYY-MM-DD
+        limit = min(request.args.get("limit", default=TRENDING_TOP_N, type=int), TRENDING_TOP_N)
+        try:
+            week_start_date = date.fromisoformat(week) if week else latest_trending_week()
+        except ValueError:
+            return jsonify({"error": "Invalid week. Use YYYY-MM-DD."}), 400
+        if week_start_date is None:
+            return jsonify({"weekStartDate": None, "niches": []})
+        niches = TrendingNiche.query.filter_by(week_start_date=week_start_date).order_by(TrendingNiche.rank).limit(limit).all()
+        return jsonify({"weekStartDate": week_start_date.isoformat(), "niches": [niche.to_dict() for niche in niches]})
+    except Exception as e:
+        current_app.logger.error(f"Error reading trending niches: {e}", exc_info=True)
+        return jsonify({"error": "Failed to read trending niches."}), 500
@@ -1,38 +1,51 @@
 # src/routes/viral_search.py
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 import os
-import json
+import time
+import queue
+import threading
+from collections import defaultdict
+from operator import itemgetter
+from concurrent.futures import wait, FIRST_COMPLETED
 from datetime import datetime, timedelta, timezone
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-import isodate # For parsing ISO 8601 duration strings, e.g. PT1M30S
+from src.models.records import ShortVideoRecord
+from src.services.search_snapshots import make_search_key, snapshot_store
+from src.services.single_flight import search_flights
+from src.services.result_columns import SORT_KEYS, DEFAULT_SORT
+from src.services.channel_store import get_channels
+from src.services.video_store import get_videos, channel_view_history
+from src.services.search_planner import plan_viral_search
+from src.services import niche_warehouse
+from src.services.quota import QuotaBudgetExceeded, budget_error, quota_metered, with_current_ledger, with_ledger, current_ledger
+from src.services.key_pool import key_pool
+from src.services.youtube_data import get_youtube_client, handle_youtube_api_error
+from src.services.youtube_client import WorkerPool
+from src.services.upstream import STALE_FALLBACK_MAX_AGE_SECONDS, youtube_breaker
+from src.http_encoding import etag_matches, not_modified
 
-# Load environment variables, especially YOUTUBE_API_KEY
+# Load environment variables, especially YOUTUBE_API_KEY / YOUTUBE_API_KEYS
 from dotenv import load_dotenv
 load_dotenv(os.path.join(os.path.dirname(__file__), "..", "..", ".env")) # Adjust path to .env if necessary
 
 viral_search_bp = Blueprint("viral_search", __name__)
 
-# YouTube API Configuration
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-API_SERVICE_NAME = "youtube"
-API_VERSION = "v3"
+# Maximum number of niches searched at the same time (one YouTube client per worker thread)
+SEARCH_CONCURRENCY = int(os.getenv("YOUTUBE_SEARCH_CONCURRENCY", "5"))
+# Maximum number of videos.list/channels.list batches in flight while the search streams in
+DETAIL_CONCURRENCY = int(os.getenv("YOUTUBE_DETAIL_CONCURRENCY", "4"))
+API_BATCH_SIZE = 50  # Maximum number of IDs per videos.list/channels.list call
+SEARCH_PAGES_PER_NICHE = 3
+# Partial batches wait at most this long for more IDs before going out (see PIPELINE_FLUSH)
+PIPELINE_FLUSH_SECONDS = float(os.getenv("SEARCH_PIPELINE_FLUSH_SECONDS", "0.2"))
+# Snapshots holding stale or missing niches (YouTube unavailable) are searched again sooner
+DEGRADED_SNAPSHOT_TTL_SECONDS = int(os.getenv("DEGRADED_SNAPSHOT_TTL_SECONDS", "60"))
 
 # TikTok API Keys (placeholders, will be used when TikTok logic is implemented)
 TIKTOK_CLIENT_KEY = os.getenv("TIKTOK_CLIENT_KEY", "awq4bo3we76x8f7q")
 TIKTOK_CLIENT_SECRET = os.getenv("TIKTOK_CLIENT_SECRET", "2fnFCitMqXSjlcq9BQWLvb7kFvDlTMZj")
 
-# --- YouTube Helper Functions (adapted from youtube.py or new) ---
-
-def get_youtube_client():
-    if not YOUTUBE_API_KEY:
-        current_app.logger.error("CRITICAL: YOUTUBE_API_KEY not configured.")
-        return None
-    try:
-        return build(API_SERVICE_NAME, API_VERSION, developerKey=YOUTUBE_API_KEY)
-    except Exception as e:
-        current_app.logger.error(f"Error building YouTube client: {str(e)}")
-        return None
+# --- YouTube Helper Functions ---
 
 def parse_youtube_datetime(date_string):
     if not date_string: return None
@@ -42,270 +55,781 @@ def parse_youtube_datetime(date_string):
         current_app.logger.warning(f"Failed to parse YouTube datetime: {date_string}")
         return None
 
-def handle_youtube_api_error(e):
-    error_message = "Error processing YouTube API request"
-    status_code = 500
-    details = str(e)
-    if isinstance(e, HttpError):
+# --- Search Pipeline ---
+#
+# The YouTube Shorts search runs as a chain of generators so network waits overlap:
+#   iter_search_hits -> [iter_with_channels -> channel filters] -> iter_video_details
+#   -> iter_with_channels -> channel filters
+# Search pages stream in from one worker per niche; every full batch of 50 IDs goes
+# to videos.list right away, and every 50 newly seen channels go to channels.list.
+# Batches that fill up while all detail workers are busy go out together, in one HTTP
+# batch round trip.
+# When the plan resolves channels first (see search_planner), videos of rejected
+# channels never reach videos.list. Raw API items are normalized (and dropped)
+# inside the worker that fetched them.
+# Whenever a niche finishes, and at least every PIPELINE_FLUSH_SECONDS, stage 1 sends
+# PIPELINE_FLUSH down the chain: each stage with no batch in flight then sends its partial
+# batch, yields whatever finished meanwhile and passes the marker on, so the first results
+# don't wait for the whole search. Stages that are still busy keep filling their batch, so
+# the flushes don't crowd the shared workers with tiny calls.
+
+PIPELINE_FLUSH = object()
+
+def iter_niche_search_pages(app, niche, pages_per_niche, max_results_per_page, search_params, failed_niches=None):
+    """Yields the (video_id, channel_id) hits of each search.list page for one niche.
+
+    channel_id is only known when the plan asks search.list for snippets. Niches whose
+    search failed are added to `failed_niches`.
+
+    Runs on a worker thread, so it pushes its own app context and builds its own
+    YouTube client (the httplib2-based client is not thread-safe). Errors are logged
+    and isolated to this niche, except QuotaBudgetExceeded: the caller's budget running
+    out ends the whole search.
+    """
+    with app.app_context():
         try:
-            error_content = json.loads(e.content.decode("utf-8"))
-            details_dict = error_content.get("error", {})
-            error_message = details_dict.get("message", error_message)
-            if e.resp.status == 403 and any("quotaExceeded" in reason.get("reason", "") for reason in details_dict.get("errors", [])):
-                error_message = "YouTube API quota exceeded. Try again later."
-                status_code = 429
-            elif e.resp.status == 400:
-                 error_message = "Invalid request to YouTube API. Check parameters."
-                 status_code = 400
+            youtube = get_youtube_client()
+            if not youtube:
+                current_app.logger.error(f"Skipping niche '{niche}': failed to initialize YouTube client.")
+                return
+
+            query = f"{niche} #shorts"
+            current_app.logger.info(f"Searching YouTube for query: {query}")
+            
+            # Busca paginada para cada nicho
+            next_page_token = None
+            pages_fetched = 0
+            
+            while pages_fetched < pages_per_niche:
+                # Configuração da busca com suporte a paginação
+                search_request = youtube.search().list(
+                    q=query,
+                    type="video",
+                    videoDuration="short", # Specifically for shorts
+                    maxResults=max_results_per_page,  # Máximo permitido pela API
+                    pageToken=next_page_token,
+                    **search_params # part, publishedAfter, order (filter pushdown)
+                )
+                search_response = search_request.execute()
+                
+                yield [
+                    (item["id"]["videoId"], item.get("snippet", {}).get("channelId"))
+                    for item in search_response.get("items", [])
+                    if item.get("id", {}).get("videoId")
+                ]
+                
+                # Verifica se há mais páginas
+                next_page_token = search_response.get("nextPageToken")
+                pages_fetched += 1
+                
+                # Se não houver mais páginas, sai do loop
+                if not next_page_token:
+                    break
+                    
+            current_app.logger.info(f"Found videos for niche '{niche}' across {pages_fetched} pages.")
+
+        except QuotaBudgetExceeded:
+            raise
+        except HttpError as e:
+            # Log HttpError and continue with the other niches
+            current_app.logger.error(f"HttpError during YouTube search for niche '{niche}': {str(e)}")
+            if failed_niches is not None:
+                failed_niches.add(niche)
+        except Exception as e:
+            current_app.logger.error(f"Generic error during YouTube search for niche '{niche}': {str(e)}", exc_info=True)
+            if failed_niches is not None:
+                failed_niches.add(niche)
+
+def iter_search_hits(app, selected_niches, pages_per_niche, max_results_per_page, search_params, on_niche_done=None, failed_niches=None):
+    """Stage 1: yields (video_id, niche, channel_id) for every search hit, as soon as any niche returns a page.
+
+    `on_niche_done(niche)` is called when a niche has no more pages (used for progress events).
+    QuotaBudgetExceeded in any niche search is raised here.
+    PIPELINE_FLUSH is yielded after each finished niche and at least every PIPELINE_FLUSH_SECONDS.
+    """
+    pages = queue.Queue()
+    niche_done = object()
+
+    def search_worker(niche):
+        try:
+            for hits in iter_niche_search_pages(app, niche, pages_per_niche, max_results_per_page, search_params, failed_niches):
+                pages.put((niche, hits))
+        except QuotaBudgetExceeded as e:
+            pages.put((niche, e))  # Raised again below, on the consumer's thread
+        finally:
+            pages.put((niche, niche_done))
+
+    max_workers = max(1, min(SEARCH_CONCURRENCY, len(selected_niches)))
+    with WorkerPool(max_workers) as executor:
+        for niche in selected_niches:
+            executor.submit(with_current_ledger(search_worker), niche)
+        remaining = len(selected_niches)
+        next_flush = time.monotonic() + PIPELINE_FLUSH_SECONDS
+        while remaining:
+            try:
+                niche, hits = pages.get(timeout=max(0, next_flush - time.monotonic()))
+            except queue.Empty:
+                niche, hits = None, []
+            if isinstance(hits, QuotaBudgetExceeded):
+                raise hits
+            if hits is niche_done:
+                remaining -= 1
+                if on_niche_done:
+                    on_niche_done(niche)
+                next_flush = 0  # Flush right away
             else:
-                status_code = e.resp.status
-            details = details_dict
-        except (json.JSONDecodeError, AttributeError):
-            details = e.content.decode("utf-8") if hasattr(e.content, "decode") else str(e.content)
-            status_code = e.resp.status if hasattr(e, "resp") else 500
-    current_app.logger.error(f"YouTube API Error: {status_code} - {error_message} - Details: {details}")
-    return jsonify({"error": error_message, "details": details}), status_code
+                for video_id, channel_id in hits:
+                    yield video_id, niche, channel_id
+            if time.monotonic() >= next_flush:
+                yield PIPELINE_FLUSH
+                next_flush = time.monotonic() + PIPELINE_FLUSH_SECONDS
+
+def iter_completed(pending, block=False):
+    """Yields the items returned by finished batch futures, removing them from `pending`.
+
+    With `block`, first waits for at least one of them to finish.
+    """
+    if not pending:
+        return
+    done, _ = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+    for future in done:
+        pending.discard(future)
+        yield from future.result()
+
+def normalize_short_video(video, niche, video_cutoff_date, min_views):
+    """Turns a video-store entry into a compact dict, or None if it fails the video-level filters."""
+    duration_seconds = video.get("durationSeconds")
+    if duration_seconds is not None and duration_seconds > 70: 
+        return None
+    
+    published_at_dt = parse_youtube_datetime(video.get("publishedAt"))
+    if not published_at_dt or published_at_dt < video_cutoff_date:
+        return None
+
+    view_count = video.get("viewCount") or 0
+    if view_count < min_views:
+        return None
+
+    return {
+        "id": video["videoId"],
+        "niche": niche,
+        "title": video.get("title"),
+        "thumbnailUrl": video.get("thumbnailUrl"),
+        "publishedAt": video.get("publishedAt"),
+        "channelId": video.get("channelId"),
+        "viewCount": view_count,
+        "likeCount": video.get("likeCount") or 0,
+        "commentCount": video.get("commentCount") or 0,
+    }
+
+def fetch_video_batch(app, batch, video_cutoff_date, min_views, failed_niches=None):
+    """Resolves one batch of (video_id, niche) pairs and returns the normalized videos that pass.
+
+    When the batch (or some of its IDs) can't be resolved, the niches affected are added
+    to `failed_niches`; QuotaBudgetExceeded is raised instead, as it only concerns this caller.
+    """
+    videos = []
+    with app.app_context():
+        try:
+            youtube = get_youtube_client()
+            if not youtube:
+                current_app.logger.error("Skipping video details batch: failed to initialize YouTube client.")
+                if failed_niches is not None:
+                    failed_niches.update(niche for _, niche in batch)
+                return videos
+            niche_by_id = dict(batch)
+            unavailable = set()
+            # Cached metadata is reused; only misses and stale statistics hit videos.list
+            video_data_by_id = get_videos(youtube, list(niche_by_id), unavailable=unavailable)
+            if unavailable and failed_niches is not None:
+                failed_niches.update(niche_by_id[video_id] for video_id in unavailable if video_id in niche_by_id)
+            for video_id, video_data in video_data_by_id.items():
+                try:
+                    video = normalize_short_video(video_data, niche_by_id.get(video_id, "Unknown"), video_cutoff_date, min_views)
+                    if video:
+                        videos.append(video)
+                except Exception as e:
+                    current_app.logger.error(f"Error processing YouTube video {video_id}: {str(e)}", exc_info=True)
+        except QuotaBudgetExceeded:
+            raise
+        except HttpError as e:
+            current_app.logger.error(f"HttpError fetching YouTube video details batch: {str(e)}")
+            if failed_niches is not None:
+                failed_niches.update(niche for _, niche in batch)
+        except Exception as e:
+            current_app.logger.error(f"Error fetching YouTube video details batch: {str(e)}", exc_info=True)
+            if failed_niches is not None:
+                failed_niches.update(niche for _, niche in batch)
+    return videos
+
+def fetch_channel_batch(app, channel_ids, failed_channels=None):
+    """Resolves one batch of channels and returns (channel_id, channel) pairs; channel is None when unavailable.
+
+    Channels the API couldn't answer (as opposed to unknown ones) are added to `failed_channels`;
+    QuotaBudgetExceeded is raised instead, as it only concerns this caller.
+    """
+    channels = {}
+    with app.app_context():
+        try:
+            youtube = get_youtube_client()
+            if not youtube:
+                current_app.logger.error("Skipping channel details batch: failed to initialize YouTube client.")
+                if failed_channels is not None:
+                    failed_channels.update(channel_ids)
+            else:
+                # Fresh channels come from the shared channel store; only missing/stale IDs hit channels.list
+                channels = get_channels(youtube, channel_ids, unavailable=failed_channels)
+        except QuotaBudgetExceeded:
+            raise
+        except HttpError as e:
+            current_app.logger.error(f"HttpError fetching YouTube channel details batch: {str(e)}")
+            if failed_channels is not None:
+                failed_channels.update(channel_ids)
+        except Exception as e:
+            current_app.logger.error(f"Error fetching YouTube channel details batch: {str(e)}", exc_info=True)
+            if failed_channels is not None:
+                failed_channels.update(channel_ids)
+    return [(channel_id, channels.get(channel_id)) for channel_id in channel_ids]
+
+def submit_coalesced(pending, ready, submit, flush=False):
+    """Sends the full batches waiting in `ready` as a single job once the stage has a free slot.
+
+    While DETAIL_CONCURRENCY jobs of a stage are in flight, new full batches wait here
+    instead of queueing in the executor; they then go out together and their 50-ID calls
+    share one HTTP batch round trip (see youtube_data.execute_lookups).
+    """
+    if ready and (flush or len(pending) < DETAIL_CONCURRENCY):
+        pending.add(submit([entry for batch in ready for entry in batch]))
+        ready.clear()
+
+def iter_video_details(app, executor, hits, video_cutoff_date, min_views, failed_niches=None):
+    """Sends each full batch of new video IDs to videos.list and yields the normalized videos.
+
+    On PIPELINE_FLUSH the partial batch goes out too when no batch is in flight, and the
+    marker is passed on.
+    """
+    seen_ids = set()
+    batch = []
+    ready = []
+    pending = set()
+
+    def submit(pairs):
+        return executor.submit(with_current_ledger(fetch_video_batch), app, pairs, video_cutoff_date, min_views, failed_niches)
+
+    for hit in hits:
+        if hit is PIPELINE_FLUSH:
+            if batch and not pending:
+                ready.append(batch)
+                batch = []
+            submit_coalesced(pending, ready, submit)
+            yield from iter_completed(pending)
+            yield PIPELINE_FLUSH
+            continue
+        video_id, niche, _ = hit
+        if video_id not in seen_ids:
+            seen_ids.add(video_id)
+            batch.append((video_id, niche))
+            if len(batch) == API_BATCH_SIZE:
+                ready.append(batch)
+                batch = []
+        yield from iter_completed(pending)
+        submit_coalesced(pending, ready, submit)
+    if batch:
+        ready.append(batch)
+    submit_coalesced(pending, ready, submit, flush=True)
+    current_app.logger.info(f"Sent {len(seen_ids)} unique YouTube video IDs to videos.list.")
+    # Once the hits are exhausted, every finished batch flushes the next stage
+    while pending:
+        yield from iter_completed(pending, block=True)
+        yield PIPELINE_FLUSH
+
+def iter_with_channels(app, executor, items, channel_id_of, channels, niche_of=None, failed_niches=None, failed_channels=None):
+    """Pairs each item with its channel, fetching unseen channels in batches of 50.
+
+    `channels` (and `failed_channels`) are shared between stages, so a channel resolved
+    once is never looked up again; items whose channel is unavailable are dropped. When
+    that is because the API failed, the item's niche (`niche_of(item)`) is added to
+    `failed_niches`, like fetch_video_batch does. On PIPELINE_FLUSH the partial batch goes
+    out too when no batch is in flight, and (PIPELINE_FLUSH, None) is yielded.
+    """
+    waiting_items = defaultdict(list)
+    batch = []
+    ready = []
+    pending = set()
+    failed_channels = set() if failed_channels is None else failed_channels
+
+    def submit(channel_ids):
+        return executor.submit(with_current_ledger(fetch_channel_batch), app, channel_ids, failed_channels)
+
+    def drop(channel_id, item):
+        if channel_id in failed_channels and failed_niches is not None and niche_of:
+            failed_niches.add(niche_of(item))
+
+    def release(channel_results):
+        for channel_id, channel in channel_results:
+            channels[channel_id] = channel
+            for item in waiting_items.pop(channel_id, []):
+                if channel:
+                    yield item, channel
+                else:
+                    drop(channel_id, item)
+
+    for item in items:
+        if item is PIPELINE_FLUSH:
+            if batch and not pending:
+                ready.append(batch)
+                batch = []
+            submit_coalesced(pending, ready, submit)
+            yield from release(iter_completed(pending))
+            yield PIPELINE_FLUSH, None
+            continue
+        channel_id = channel_id_of(item)
+        if channel_id in channels:
+            if channels[channel_id]:
+                yield item, channels[channel_id]
+            else:
+                drop(channel_id, item)
+        else:
+            if channel_id not in waiting_items:
+                batch.append(channel_id)
+            waiting_items[channel_id].append(item)
+            if len(batch) == API_BATCH_SIZE:
+                ready.append(batch)
+                batch = []
+        yield from release(iter_completed(pending))
+        submit_coalesced(pending, ready, submit)
+    if batch:
+        ready.append(batch)
+    submit_coalesced(pending, ready, submit, flush=True)
+    # Once the items are exhausted, every finished batch flushes the next stage
+    while pending:
+        yield from release(iter_completed(pending, block=True))
+        yield PIPELINE_FLUSH, None
+
+def passes_channel_filters(channel, max_subs, max_channel_videos_total):
+    return (channel.subscriberCount or 0) <= max_subs and (channel.videoCount or 0) <= max_channel_videos_total
+
+def format_short_video(video, channel):
+    return ShortVideoRecord(
+        id=video["id"],
+        platform="YouTube Shorts",
+        niche=video["niche"],
+        videoTitle=video["title"],
+        videoLink=f"https://www.youtube.com/shorts/{video['id']}",
+        thumbnailUrl=video["thumbnailUrl"],
+        publishedAt=video["publishedAt"],
+        viewCount=video["viewCount"],
+        likeCount=video["likeCount"],
+        commentCount=video["commentCount"],
+        channelName=channel.title,
+        channelLink=f"https://www.youtube.com/channel/{video['channelId']}",
+        subscriberCount=channel.subscriberCount or 0,
+    )
+
+def iter_stale_shorts(failed, video_cutoff_date, min_views, max_subs, max_channel_videos_total, served_ids, degraded=None):
+    """Yields warehouse videos (up to STALE_FALLBACK_MAX_AGE_SECONDS old) for niches YouTube couldn't answer.
+
+    Fills `degraded` with the niches served stale (and the age of their data) and the
+    niches left without results.
+    """
+    stale = niche_warehouse.covered_niches(failed, video_cutoff_date, min_views, max_subs, max_channel_videos_total, max_age_seconds=STALE_FALLBACK_MAX_AGE_SECONDS)
+    for video, channel in niche_warehouse.iter_local_shorts(stale, video_cutoff_date, min_views, max_subs, max_channel_videos_total):
+        if video["id"] not in served_ids:
+            yield format_short_video(video, channel)
+    now = datetime.utcnow()
+    current_app.logger.warning(f"YouTube unavailable for niches {failed}; {len(stale)} served from older warehouse data.")
+    if degraded is not None:
+        degraded["stale_niches"] = [{"niche": niche, "age_seconds": int((now - started_at).total_seconds())} for niche, started_at in stale.items()]
+        degraded["failed_niches"] = [niche for niche in failed if niche not in stale]
+
+def iter_youtube_shorts(selected_niches, video_cutoff_date, min_views, max_subs, max_channel_videos_total, plan=None, on_niche_done=None, local_first=None, degraded=None):
+    """Runs the YouTube Shorts pipeline following the search plan (see search_planner).
+
+    Yields each formatted video as soon as it passes every filter. In local-first mode,
+    niches the warehouse covers for these filters are answered from NicheData and only
+    the other niches are searched on YouTube; everything fetched is stored back. Niches
+    YouTube fails on (or all of them, while its circuit breaker is open) are answered
+    from older warehouse data and reported in `degraded`.
+    """
+    # Número de páginas a buscar por nicho (aumentado para obter mais resultados)
+    pages_per_niche = SEARCH_PAGES_PER_NICHE
+    max_results_per_page = 50  # Máximo permitido pela API do YouTube
+
+    passed = 0
+    local_first = niche_warehouse.SEARCH_LOCAL_FIRST if local_first is None else local_first
+    covered = niche_warehouse.covered_niches(selected_niches, video_cutoff_date, min_views, max_subs, max_channel_videos_total) if local_first else {}
+    if covered:
+        for video, channel in niche_warehouse.iter_local_shorts(covered, video_cutoff_date, min_views, max_subs, max_channel_videos_total):
+            passed += 1
+            yield format_short_video(video, channel)
+        for niche in covered:
+            if on_niche_done:
+                on_niche_done(niche)
+    remaining_niches = [niche for niche in selected_niches if niche not in covered]
+    if not remaining_niches:
+        current_app.logger.info(f"All {len(selected_niches)} niches served from the niche warehouse ({passed} videos).")
+        return
+
+    if plan is None or covered:
+        plan = plan_viral_search(len(remaining_niches), pages_per_niche, video_cutoff_date, min_views, max_subs, max_channel_videos_total)
+    current_app.logger.info(f"Search plan: {plan.to_dict()}")
+
+    if youtube_breaker.is_open:
+        # Don't wait on an upstream that is known to be failing
+        current_app.logger.warning(f"YouTube circuit open; not searching {len(remaining_niches)} niches.")
+        for niche in remaining_niches:
+            if on_niche_done:
+                on_niche_done(niche)
+        yield from iter_stale_shorts(remaining_niches, video_cutoff_date, min_views, max_subs, max_channel_videos_total, set(), degraded)
+        return
+
+    app = current_app._get_current_object()
+    channels = {}
+    failed_channels = set()
+    fetched = []
+    served_ids = set()
+    failed_niches = set()
+    started_at = datetime.utcnow()
+    with WorkerPool(DETAIL_CONCURRENCY) as executor:
+        hits = iter_search_hits(app, remaining_niches, pages_per_niche, max_results_per_page, plan.search_params, on_niche_done, failed_niches)
+        if plan.channels_first:
+            # Channel filters run before videos.list: hits from rejected channels are dropped here
+            hits = (
+                hit for hit, channel in iter_with_channels(app, executor, hits, itemgetter(2), channels, itemgetter(1), failed_niches, failed_channels)
+                if hit is PIPELINE_FLUSH or passes_channel_filters(channel, max_subs, max_channel_videos_total)
+            )
+        videos = iter_video_details(app, executor, hits, video_cutoff_date, min_views, failed_niches)
+        for video, channel in iter_with_channels(app, executor, videos, itemgetter("channelId"), channels, itemgetter("niche"), failed_niches, failed_channels):
+            if video is PIPELINE_FLUSH:
+                continue
+            fetched.append((video, channel))
+            if not passes_channel_filters(channel, max_subs, max_channel_videos_total):
+                continue
+            passed += 1
+            served_ids.add(video["id"])
+            yield format_short_video(video, channel)
+
+    current_app.logger.info(f"Resolved {sum(1 for c in channels.values() if c)} YouTube channels; {passed} videos passed all filters.")
+    # Only niches whose search, video and channel lookups all succeeded are marked covered:
+    # a partial answer recorded as coverage would be served by local-first until it expires.
+    # Channel filters only pruned what was fetched when they ran first.
+    completed_niches = [niche for niche in remaining_niches if niche not in failed_niches]
+    niche_warehouse.store_short_search(
+        completed_niches, fetched, started_at, video_cutoff_date, min_views,
+        max_subs=max_subs if plan.channels_first else None,
+        max_channel_videos_total=max_channel_videos_total if plan.channels_first else None,
+    )
+    failed = [niche for niche in remaining_niches if niche in failed_niches]
+    if failed:
+        yield from iter_stale_shorts(failed, video_cutoff_date, min_views, max_subs, max_channel_videos_total, served_ids, degraded)
+
+def search_youtube_shorts(selected_niches, video_cutoff_date, min_views, max_subs, max_channel_videos_total, plan=None, on_niche_done=None, local_first=None, degraded=None):
+    """Runs the whole YouTube Shorts pipeline and returns the list of formatted videos."""
+    return list(iter_youtube_shorts(selected_niches, video_cutoff_date, min_views, max_subs, max_channel_videos_total, plan=plan, on_niche_done=on_niche_done, local_first=local_first, degraded=degraded))
+
+def mock_tiktok_results(selected_niches, min_views, max_subs):
+    """TikTok search logic placeholder."""
+    tiktok_results = []
+    for i, niche_val in enumerate(selected_niches):
+        if len(tiktok_results) < 5: 
+            tiktok_results.append(ShortVideoRecord(
+                id=f"tiktok_mock_{i+1}",
+                platform="TikTok",
+                niche=niche_val,
+                videoTitle=f"Mock TikTok Video sobre {niche_val}",
+                videoLink="#tiktok_video_link",
+                thumbnailUrl="https://via.placeholder.com/300x300.png?text=TikTok+Mock",
+                publishedAt=(datetime.now(timezone.utc) - timedelta(days=i*2)).isoformat(),
+                viewCount=min_views + (i * 10000),
+                likeCount=(min_views + (i * 10000)) // 15,
+                commentCount=(min_views + (i * 10000)) // 150,
+                channelName=f"TikTokCreator{i+1}",
+                channelLink="#tiktok_channel_link",
+                subscriberCount=max_subs // (i+1) if i < 2 else max_subs // 2
+            ))
+    return tiktok_results
+
+def store_search_snapshot(search_key, youtube_results, tiktok_results, plan=None, degraded=None):
+    """Stores the combined results as the snapshot for `search_key` (sorted per page request).
+
+    A degraded result set (see iter_youtube_shorts) is kept for a shorter time.
+    """
+    combined_results = youtube_results + tiktok_results
+    meta = {"youtube_results": len(youtube_results), "tiktok_results": len(tiktok_results), "plan": plan.to_dict() if plan else None}
+    if degraded:
+        meta["degraded"] = degraded
+    snapshot = snapshot_store.put(search_key, combined_results, meta=meta, ttl=DEGRADED_SNAPSHOT_TTL_SECONDS if degraded else None, channel_history=channel_view_history)
+    current_app.logger.info(f"Stored snapshot {snapshot.id} with {snapshot.total_results} results (YouTube: {len(youtube_results)}, TikTok: {len(tiktok_results)}).")
+    return snapshot
+
+def parse_flag(value):
+    return value.lower() in ("1", "true", "yes")
+
+def parse_viral_search_args(args):
+    """Reads the search filters from request.args (or a job's stored parameters)."""
+    niches_str = args.get("niches", default="", type=str)
+    return {
+        "niches": [n.strip() for n in niches_str.split(",") if n.strip()] if niches_str else [],
+        "video_published_days": args.get("video_published_days", default=30, type=int),
+        "max_subs": args.get("max_subs", default=10000, type=int),
+        "min_views": args.get("min_views", default=10000, type=int), # Adjusted default for viral
+        "max_channel_videos_total": args.get("max_channel_videos_total", default=50, type=int),
+        "platform": args.get("platform", default="all", type=str),
+        "local_first": args.get("local_first", default=niche_warehouse.SEARCH_LOCAL_FIRST, type=parse_flag), # Responde do armazém local quando possível
+    }
+
+def make_viral_search_key(params):
+    return make_search_key(
+        params["niches"],
+        video_published_days=params["video_published_days"],
+        max_subs=params["max_subs"],
+        min_views=params["min_views"],
+        max_channel_videos_total=params["max_channel_videos_total"],
+        platform=params["platform"],
+    )
+
+def search_flight_lock(search_key, local_first):
+    """Cross-worker lease of a search. Only taken local-first: a worker that waited on it
+    then answers from what the leader stored in the niche warehouse."""
+    local_first = niche_warehouse.SEARCH_LOCAL_FIRST if local_first is None else local_first
+    return f"viral-search:{search_key[:64]}" if local_first else None
+
+def run_viral_search(params, search_key=None, video_cutoff_date=None, plan=None, on_niche_done=None):
+    """Runs the whole search for `params` and returns its snapshot (a live one is reused).
+
+    Shared by the synchronous endpoint and the background search jobs. Concurrent
+    identical searches are coalesced (see single_flight): only one of them runs.
+    """
+    search_key = search_key or make_viral_search_key(params)
+    snapshot = snapshot_store.get(key=search_key)
+    if snapshot:
+        return snapshot
+    selected_niches = params["niches"]
+    platform_filter = params["platform"]
+    if video_cutoff_date is None:
+        video_cutoff_date = datetime.now(timezone.utc) - timedelta(days=params["video_published_days"])
+
+    def search():
+        youtube_results = []
+        tiktok_results = [] # Placeholder for TikTok
+        degraded = {}
+        search_plan = plan
+        if platform_filter == "all" or platform_filter == "youtube":
+            current_app.logger.info("Starting YouTube Shorts search logic...")
+            if search_plan is None:
+                search_plan = plan_viral_search(len(selected_niches), SEARCH_PAGES_PER_NICHE, video_cutoff_date, params["min_views"], params["max_subs"], params["max_channel_videos_total"])
+            youtube_results = search_youtube_shorts(selected_niches, video_cutoff_date, params["min_views"], params["max_subs"], params["max_channel_videos_total"], plan=search_plan, on_niche_done=on_niche_done, local_first=params.get("local_first"), degraded=degraded)
+
+        if platform_filter == "all" or platform_filter == "tiktok":
+            current_app.logger.info("TikTok search logic placeholder.")
+            tiktok_results = mock_tiktok_results(selected_niches, params["min_views"], params["max_subs"])
+
+        return store_search_snapshot(search_key, youtube_results, tiktok_results, search_plan, degraded)
+
+    snapshot, shared = search_flights.do(search_key, search, lock_name=search_flight_lock(search_key, params.get("local_first")))
+    if shared:
+        current_app.logger.info(f"Joined the identical search already running; reusing snapshot {snapshot.id}.")
+    return snapshot
+
+# --- Streaming Mode (NDJSON / Server-Sent Events) ---
+
+def format_stream_event(stream_format, event_type, payload):
+    if stream_format == "sse":
+        return f"event: {event_type}\ndata: {current_app.json.dumps(payload)}\n\n"
+    return current_app.json.dumps(dict(payload, type=event_type)) + "\n"
+
+def stream_viral_search(stream_format, search_key, snapshot, selected_niches, video_cutoff_date, min_views, max_subs, max_channel_videos_total, platform_filter, page_size, plan=None, local_first=None, sort=DEFAULT_SORT):
+    """Streams qualifying videos as soon as they pass the filters.
+
+    Events: `results` ({niche, results}) as videos qualify, `progress` ({niches_done,
+    niches_total}) as niche searches finish, `done` (totals and pagination of page 1 of the
+    stored snapshot, plus `degraded` when some niches are stale or missing) at the end,
+    `error` on failure. A live snapshot is replayed as a
+    single `results` event. The pipeline runs on its own thread, so every event is sent as
+    soon as it is ready, and it completes (filling the caches and the snapshot) even if
+    the client disconnects.
+    """
+    app = current_app._get_current_object()
+    # quota_metered's ledger is only current while the view runs, and the response is
+    # iterated after it returned: the search thread gets it explicitly
+    ledger = current_ledger()
+    events = queue.Queue()
+    niches_total = len(selected_niches)
+
+    def search():
+        youtube_results = []
+        tiktok_results = []
+        degraded = {}
+        if platform_filter == "all" or platform_filter == "youtube":
+            niches_done = []
+            def on_niche_done(niche):
+                niches_done.append(niche)
+                events.put(("progress", {"niche": niche, "niches_done": len(niches_done), "niches_total": niches_total}))
+            for video in iter_youtube_shorts(selected_niches, video_cutoff_date, min_views, max_subs, max_channel_videos_total, plan=plan, on_niche_done=on_niche_done, local_first=local_first, degraded=degraded):
+                youtube_results.append(video)
+                events.put(("result", video))
+        if platform_filter == "all" or platform_filter == "tiktok":
+            tiktok_results = mock_tiktok_results(selected_niches, min_views, max_subs)
+            for video in tiktok_results:
+                events.put(("result", video))
+        return store_search_snapshot(search_key, youtube_results, tiktok_results, plan, degraded)
+
+    @with_ledger(ledger)
+    def run_search():
+        with app.app_context():
+            try:
+                final_snapshot, shared = search_flights.do(search_key, search, lock_name=search_flight_lock(search_key, local_first))
+                if shared:
+                    # Another request ran this search: its whole result arrives at once
+                    results, _ = final_snapshot.page(1, final_snapshot.total_results or 1, sort)
+                    for video in results:
+                        events.put(("result", video))
+                last_event = ("done", final_snapshot)
+            except QuotaBudgetExceeded as e:
+                current_app.logger.warning(f"Streaming /viral-videos search stopped: {str(e)}")
+                last_event = ("error", {"error": "Daily YouTube quota budget exhausted. Try again tomorrow or upgrade your plan.", "details": str(e)})
+            except Exception as e:
+                current_app.logger.error(f"Error in streaming /viral-videos search: {str(e)}", exc_info=True)
+                last_event = ("error", {"error": "An internal server error occurred.", "details": str(e)})
+            finally:
+                # Booked before the client hears the search ended, and even if it's already gone
+                if ledger:
+                    ledger.flush()
+            events.put(last_event)
+
+    def generate():
+        if snapshot:
+            results, _ = snapshot.page(1, snapshot.total_results or 1, sort)
+            yield format_stream_event(stream_format, "results", {"niche": None, "results": results})
+            final_snapshot = snapshot
+        else:
+            threading.Thread(target=run_search, name="viral-search-stream", daemon=True).start()
+            final_snapshot = None
+            while final_snapshot is None:
+                event_type, payload = events.get()
+                # Drain whatever else is ready, grouping qualifying videos by niche
+                batch = [(event_type, payload)]
+                while True:
+                    try:
+                        batch.append(events.get_nowait())
+                    except queue.Empty:
+                        break
+                results_by_niche = {}
+                for event_type, payload in batch:
+                    if event_type == "result":
+                        results_by_niche.setdefault(payload.niche, []).append(payload)
+                        continue
+                    for niche, results in results_by_niche.items():
+                        yield format_stream_event(stream_format, "results", {"niche": niche, "results": results})
+                    results_by_niche = {}
+                    if event_type == "progress":
+                        yield format_stream_event(stream_format, "progress", payload)
+                    elif event_type == "error":
+                        yield format_stream_event(stream_format, "error", payload)
+                        return
+                    elif event_type == "done":
+                        final_snapshot = payload
+                for niche, results in results_by_niche.items():
+                    yield format_stream_event(stream_format, "results", {"niche": niche, "results": results})
+        _, pagination = final_snapshot.page(1, page_size, sort)
+        done = {
+            "totals": {
+                "total_results": final_snapshot.total_results,
+                "youtube_results": final_snapshot.meta.get("youtube_results", 0),
+                "tiktok_results": final_snapshot.meta.get("tiktok_results", 0),
+            },
+            "pagination": pagination,
+        }
+        if final_snapshot.meta.get("degraded"):
+            done["degraded"] = final_snapshot.meta["degraded"]
+        yield format_stream_event(stream_format, "done", done)
+
+    mimetype = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # Nginx/Heroku router: don't buffer the stream
+    return response
 
 # --- Main Search Endpoint ---
 @viral_search_bp.route("/viral-videos", methods=["GET"])
+@quota_metered
 def search_viral_videos():
     current_app.logger.info("Received request for /viral-videos")
     try:
-        niches_str = request.args.get("niches", default="", type=str)
-        video_published_days_ago_max = request.args.get("video_published_days", default=30, type=int)
-        max_subs = request.args.get("max_subs", default=10000, type=int)
-        min_views = request.args.get("min_views", default=10000, type=int) # Adjusted default for viral
-        max_channel_videos_total = request.args.get("max_channel_videos_total", default=50, type=int)
-        platform_filter = request.args.get("platform", default="all", type=str)
+        params = parse_viral_search_args(request.args)
+        selected_niches = params["niches"]
+        video_published_days_ago_max = params["video_published_days"]
+        max_subs = params["max_subs"]
+        min_views = params["min_views"]
+        max_channel_videos_total = params["max_channel_videos_total"]
+        platform_filter = params["platform"]
         
         # Parâmetros de paginação
         page_size = request.args.get("page_size", default=100, type=int)  # Tamanho da página (resultados por página)
         page = request.args.get("page", default=1, type=int)  # Número da página atual
+        snapshot_id = request.args.get("snapshot_id", default=None, type=str)  # Cursor retornado pela primeira página
+        sort = request.args.get("sort", default=DEFAULT_SORT, type=str)  # views, views_per_subscriber, recency, likes_per_view, outlier_ratio, outlier_score ou velocity
+        if sort not in SORT_KEYS:
+            return jsonify({"error": f"Invalid sort. Use one of: {', '.join(SORT_KEYS)}."}), 400
+        explain = request.args.get("explain", default="false", type=str).lower() in ("1", "true", "yes")  # Inclui o plano da busca na resposta
+        stream_format = request.args.get("stream", default="", type=str).lower()  # "ndjson" ou "sse" para resultados em streaming
+        if not stream_format and "text/event-stream" in request.headers.get("Accept", ""):
+            stream_format = "sse"
+        if stream_format and stream_format not in ("ndjson", "sse"):
+            return jsonify({"error": "Invalid stream format. Use 'ndjson' or 'sse'."}), 400
 
-        selected_niches = [n.strip() for n in niches_str.split(",") if n.strip()] if niches_str else []
         if not selected_niches:
             return jsonify({"error": "No niches provided"}), 400
 
-        current_app.logger.info(f"Search Params: niches={selected_niches}, published_days_max={video_published_days_ago_max}, max_subs={max_subs}, min_views={min_views}, max_channel_videos={max_channel_videos_total}, platform={platform_filter}, page={page}, page_size={page_size}")
+        current_app.logger.info(f"Search Params: niches={selected_niches}, published_days_max={video_published_days_ago_max}, max_subs={max_subs}, min_views={min_views}, max_channel_videos={max_channel_videos_total}, platform={platform_filter}, page={page}, page_size={page_size}, snapshot_id={snapshot_id}")
 
-        youtube_results = []
-        tiktok_results = [] # Placeholder for TikTok
+        search_key = make_viral_search_key(params)
+        if not snapshot_id:
+            niche_warehouse.record_niche_requests(selected_niches)  # Pages 2..N of a search aren't new requests
+        snapshot = snapshot_store.get(snapshot_id=snapshot_id, key=search_key)
+        video_cutoff_date = datetime.now(timezone.utc) - timedelta(days=video_published_days_ago_max)
+        plan = None
+        if snapshot:
+            etag = snapshot.etag(page, page_size, sort, explain)
+            if not stream_format and etag_matches(etag):
+                current_app.logger.info(f"Page {page} of snapshot {snapshot.id} not modified.")
+                return not_modified(etag, current_app.response_class)
+            current_app.logger.info(f"Serving page {page} from snapshot {snapshot.id} ({snapshot.total_results} results, expires in {snapshot.expires_in()}s).")
+        elif platform_filter == "all" or platform_filter == "youtube":
+            if not key_pool.configured:
+                current_app.logger.error("CRITICAL: YOUTUBE_API_KEY not configured.")
+                return jsonify({"error": "Failed to initialize YouTube client. Check API key."}), 500
+            error = budget_error()  # Only searches that reach YouTube need budget; snapshot pages are free
+            if error:
+                return error
+            plan = plan_viral_search(len(selected_niches), SEARCH_PAGES_PER_NICHE, video_cutoff_date, min_views, max_subs, max_channel_videos_total)
 
-        youtube = get_youtube_client()
-        if not youtube:
-            return jsonify({"error": "Failed to initialize YouTube client. Check API key."}), 500
-
-        if platform_filter == "all" or platform_filter == "youtube":
-            current_app.logger.info("Starting YouTube Shorts search logic...")
-            video_cutoff_date = datetime.now(timezone.utc) - timedelta(days=video_published_days_ago_max)
-            
-            all_video_ids_yt = []
-            video_to_niche_map_yt = {}
-
-            # Número de páginas a buscar por nicho (aumentado para obter mais resultados)
-            pages_per_niche = 3
-            max_results_per_page = 50  # Máximo permitido pela API do YouTube
-
-            for niche in selected_niches:
-                try:
-                    query = f"{niche} #shorts"
-                    current_app.logger.info(f"Searching YouTube for query: {query}")
-                    
-                    # Busca paginada para cada nicho
-                    next_page_token = None
-                    pages_fetched = 0
-                    
-                    while pages_fetched < pages_per_niche:
-                        # Configuração da busca com suporte a paginação
-                        search_request = youtube.search().list(
-                            q=query,
-                            part="id",
-                            type="video",
-                            videoDuration="short", # Specifically for shorts
-                            maxResults=max_results_per_page,  # Máximo permitido pela API
-                            pageToken=next_page_token
-                        )
-                        search_response = search_request.execute()
-                        
-                        for item in search_response.get("items", []):
-                            video_id = item.get("id", {}).get("videoId")
-                            if video_id:
-                                all_video_ids_yt.append(video_id)
-                                video_to_niche_map_yt[video_id] = niche
-                        
-                        # Verifica se há mais páginas
-                        next_page_token = search_response.get("nextPageToken")
-                        pages_fetched += 1
-                        
-                        # Se não houver mais páginas, sai do loop
-                        if not next_page_token:
-                            break
-                            
-                    current_app.logger.info(f"Found videos for niche '{niche}' across {pages_fetched} pages.")
-
-                except HttpError as e:
-                    # Log HttpError and continue to the next niche, or decide to return early
-                    current_app.logger.error(f"HttpError during YouTube search for niche '{niche}': {str(e)}")
-                    # Optionally, you could return handle_youtube_api_error(e) here if one niche failing should stop all
-                    continue # Continue to the next niche
-                except Exception as e:
-                    current_app.logger.error(f"Generic error during YouTube search for niche '{niche}': {str(e)}", exc_info=True)
-                    continue # Continue to the next niche
-            
-            unique_video_ids_yt = list(set(all_video_ids_yt))
-            current_app.logger.info(f"Found {len(unique_video_ids_yt)} unique YouTube video IDs across all niches.")
+        if stream_format:
+            return stream_viral_search(stream_format, search_key, snapshot, selected_niches, video_cutoff_date, min_views, max_subs, max_channel_videos_total, platform_filter, page_size, plan=plan, local_first=params["local_first"], sort=sort)
 
-            if unique_video_ids_yt:
-                video_details_list_yt = []
-                for i in range(0, len(unique_video_ids_yt), 50):
-                    batch_ids = unique_video_ids_yt[i:i+50]
-                    try:
-                        video_response = youtube.videos().list(
-                            part="snippet,statistics,contentDetails",
-                            id=",".join(batch_ids)
-                        ).execute()
-                        video_details_list_yt.extend(video_response.get("items", []))
-                    except HttpError as e:
-                        current_app.logger.error(f"HttpError fetching YouTube video details batch: {str(e)}")
-                        # Decide if to return or continue
-                        continue
-                    except Exception as e:
-                        current_app.logger.error(f"Error fetching YouTube video details batch: {str(e)}", exc_info=True)
-                        continue
-                
-                current_app.logger.info(f"Fetched details for {len(video_details_list_yt)} YouTube videos.")
-
-                channel_ids_yt = list(set([vd["snippet"]["channelId"] for vd in video_details_list_yt if vd.get("snippet")]))
-                channel_details_map_yt = {}
-                if channel_ids_yt:
-                    for i in range(0, len(channel_ids_yt), 50):
-                        batch_ids = channel_ids_yt[i:i+50]
-                        try:
-                            channel_response = youtube.channels().list(
-                                part="snippet,statistics",
-                                id=",".join(batch_ids)
-                            ).execute()
-                            for item in channel_response.get("items", []):
-                                channel_details_map_yt[item["id"]] = item
-                        except HttpError as e:
-                            current_app.logger.error(f"HttpError fetching YouTube channel details batch: {str(e)}")
-                            continue
-                        except Exception as e:
-                            current_app.logger.error(f"Error fetching YouTube channel details batch: {str(e)}", exc_info=True)
-                            continue
-                    current_app.logger.info(f"Fetched details for {len(channel_details_map_yt)} YouTube channels.")
-
-                for video_data in video_details_list_yt:
-                    try:
-                        video_id = video_data["id"]
-                        snippet = video_data.get("snippet", {})
-                        stats = video_data.get("statistics", {})
-                        content_details = video_data.get("contentDetails", {})
-                        
-                        duration_iso = content_details.get("duration")
-                        if duration_iso:
-                            duration_seconds = isodate.parse_duration(duration_iso).total_seconds()
-                            if duration_seconds > 70: 
-                                continue
-                        
-                        published_at_dt = parse_youtube_datetime(snippet.get("publishedAt"))
-                        if not published_at_dt or published_at_dt < video_cutoff_date:
-                            continue
-
-                        view_count = int(stats.get("viewCount", 0))
-                        if view_count < min_views:
-                            continue
-
-                        channel_id = snippet.get("channelId")
-                        channel_data = channel_details_map_yt.get(channel_id)
-                        if not channel_data:
-                            continue
-                        
-                        channel_stats = channel_data.get("statistics", {})
-                        subscriber_count = int(channel_stats.get("subscriberCount", 0))
-                        if subscriber_count > max_subs:
-                            continue
-                        
-                        channel_video_count = int(channel_stats.get("videoCount", 0))
-                        if channel_video_count > max_channel_videos_total:
-                            continue
-                        
-                        video_niche = video_to_niche_map_yt.get(video_id, "Unknown")
-                        formatted_video = {
-                            "id": video_id,
-                            "platform": "YouTube Shorts",
-                            "niche": video_niche,
-                            "videoTitle": snippet.get("title"),
-                            "videoLink": f"https://www.youtube.com/shorts/{video_id}",
-                            "thumbnailUrl": snippet.get("thumbnails", {}).get("high", snippet.get("thumbnails", {}).get("medium", snippet.get("thumbnails", {}).get("default", {}))).get("url"),
-                            "publishedAt": snippet.get("publishedAt"),
-                            "viewCount": view_count,
-                            "likeCount": int(stats.get("likeCount", 0)),
-                            "commentCount": int(stats.get("commentCount", 0)),
-                            "channelName": channel_data.get("snippet", {}).get("title"),
-                            "channelLink": f"https://www.youtube.com/channel/{channel_id}",
-                            "subscriberCount": subscriber_count,
-                        }
-                        youtube_results.append(formatted_video)
-                    except Exception as e:
-                        current_app.logger.error(f"Error processing YouTube video {video_data.get('id')}: {str(e)}", exc_info=True)
+        if not snapshot:
+            snapshot = run_viral_search(params, search_key=search_key, video_cutoff_date=video_cutoff_date, plan=plan)
 
-        if platform_filter == "all" or platform_filter == "tiktok":
-            current_app.logger.info("TikTok search logic placeholder.")
-            if not tiktok_results: 
-                for i, niche_val in enumerate(selected_niches):
-                    if len(tiktok_results) < 5: 
-                        tiktok_results.append({
-                            "id": f"tiktok_mock_{i+1}",
-                            "platform": "TikTok",
-                            "niche": niche_val,
-                            "videoTitle": f"Mock TikTok Video sobre {niche_val}",
-                            "videoLink": "#tiktok_video_link",
-                            "thumbnailUrl": "https://via.placeholder.com/300x300.png?text=TikTok+Mock",
-                            "publishedAt": (datetime.now(timezone.utc) - timedelta(days=i*2)).isoformat(),
-                            "viewCount": min_views + (i * 10000),
-                            "likeCount": (min_views + (i * 10000)) // 15,
-                            "commentCount": (min_views + (i * 10000)) // 150,
-                            "channelName": f"TikTokCreator{i+1}",
-                            "channelLink": "#tiktok_channel_link",
-                            "subscriberCount": max_subs // (i+1) if i < 2 else max_subs // 2
-                        })
-
-        combined_results = youtube_results + tiktok_results
-        combined_results.sort(key=lambda x: x.get("viewCount", 0), reverse=True)
-        
-        # Implementação de paginação no backend
-        total_results = len(combined_results)
-        total_pages = (total_results + page_size - 1) // page_size if total_results > 0 else 1
-        
-        # Garantir que a página solicitada é válida
-        if page < 1:
-            page = 1
-        elif page > total_pages:
-            page = total_pages
-            
-        # Calcular índices de início e fim para a página atual
-        start_idx = (page - 1) * page_size
-        end_idx = min(start_idx + page_size, total_results)
-        
-        # Obter resultados para a página atual
-        paginated_results = combined_results[start_idx:end_idx]
+        # Paginação no backend: cada página é uma fatia do snapshot
+        paginated_results, pagination = snapshot.page(page, page_size, sort)
         
         # Adicionar metadados de paginação à resposta
         response_data = {
             "results": paginated_results,
-            "pagination": {
-                "page": page,
-                "page_size": page_size,
-                "total_pages": total_pages,
-                "total_results": total_results
-            }
+            "pagination": pagination
         }
+        if explain:
+            response_data["plan"] = snapshot.meta.get("plan")
+        if snapshot.meta.get("degraded"):
+            response_data["degraded"] = snapshot.meta["degraded"]  # Nichos servidos de dados antigos (com a idade) ou sem resultados
 
-        current_app.logger.info(f"Returning {len(paginated_results)} results for page {page} of {total_pages}. Total results: {total_results} (YouTube: {len(youtube_results)}, TikTok: {len(tiktok_results)})")
-        return jsonify(response_data), 200
+        current_app.logger.info(f"Returning {len(paginated_results)} results for page {pagination['page']} of {pagination['total_pages']}. Total results: {pagination['total_results']}")
+        response = jsonify(response_data)
+        response.set_etag(snapshot.etag(page, page_size, sort, explain))  # Validador do snapshot: If-None-Match -> 304 sem remontar a página
+        return response, 200
 
-    except HttpError as e:
+    except (HttpError, QuotaBudgetExceeded) as e:
+        # The caller's budget running out mid-search is a 429; nothing partial was stored for it
         return handle_youtube_api_error(e)
     except Exception as e:
         current_app.logger.error(f"Critical error in /viral-videos endpoint: {str(e)}", exc_info=True)
@@ -1,14 +1,24 @@
 # src/routes/youtube.py
 
 import os
-import json
 import time # Adicionado para logs de tempo
+import threading
+from concurrent.futures import wait, FIRST_COMPLETED
 from flask import Blueprint, request, jsonify, current_app # Import current_app for logging
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from dotenv import load_dotenv
 from datetime import datetime, timedelta, timezone
-import math
+from src.services.channel_store import get_channels
+from src.services.channel_uploads import fetch_channel_uploads
+from src.services.video_store import channel_view_history
+from src.services.search_planner import plan_find_niches
+from src.services.niche_warehouse import store_niche_videos
+from src.services.result_columns import ResultColumns, SORT_KEYS
+from src.models.records import NicheVideoRecord
+from src.services.quota import QuotaBudgetExceeded, budget_error, quota_metered, with_current_ledger
+from src.services import youtube_client
+from src.services.youtube_data import get_youtube_client, handle_youtube_api_error
+from src.services.upstream import CircuitOpenError, youtube_breaker
 
 # Carregar variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -16,56 +26,20 @@ load_dotenv()
 # Configurar Blueprint para organizar as rotas relacionadas ao YouTube
 youtube_bp = Blueprint("youtube", __name__, url_prefix="/api/youtube")
 
-# Constantes da API do YouTube
-API_KEY = os.getenv("YOUTUBE_API_KEY")
-API_SERVICE_NAME = "youtube"
-API_VERSION = "v3"
+# Canais processados em paralelo por busca de nichos, tempo máximo por canal e prazo total
+# da requisição (abaixo dos 30s do roteador do Heroku): o que não terminar fica de fora.
+FIND_NICHES_CONCURRENCY = int(os.getenv("FIND_NICHES_CONCURRENCY", "8"))
+FIND_NICHES_CHANNEL_TIMEOUT_SECONDS = float(os.getenv("FIND_NICHES_CHANNEL_TIMEOUT_SECONDS", "10"))
+FIND_NICHES_DEADLINE_SECONDS = float(os.getenv("FIND_NICHES_DEADLINE_SECONDS", "25"))
 
 # --- Funções Auxiliares (Helpers) ---
 
-def get_youtube_client():
-    """Inicializa e retorna um cliente para a API do YouTube Data v3."""
-    current_app.logger.info("Tentando inicializar cliente do YouTube...")
-    if not API_KEY:
-        current_app.logger.error("Erro Crítico: Chave da API do YouTube (YOUTUBE_API_KEY) não configurada no .env")
-        return None
-    try:
-        youtube = build(API_SERVICE_NAME, API_VERSION, developerKey=API_KEY)
-        current_app.logger.info("Cliente do YouTube inicializado com sucesso.")
-        return youtube
-    except HttpError as e:
-        current_app.logger.error(f"Erro HTTP ao inicializar cliente do YouTube: {e.resp.status} {e.content}")
-        return None
-    except Exception as e:
-        current_app.logger.error(f"Erro genérico ao inicializar cliente do YouTube: {e}")
-        return None
-
-def handle_api_error(e):
-    """Trata erros ocorridos durante chamadas à API do YouTube."""
-    error_message = "Erro ao processar requisição na API do YouTube"
-    status_code = 500
-    details = str(e)
-    if isinstance(e, HttpError):
-        try:
-            error_content = json.loads(e.content)
-            details = error_content.get("error", {})
-            error_message = details.get("message", error_message)
-            if e.resp.status == 403 and any("quotaExceeded" in reason.get("reason", "") for reason in details.get("errors", [])):
-                error_message = "Quota da API do YouTube excedida. Tente novamente mais tarde."
-                status_code = 429
-            elif e.resp.status == 400:
-                 error_message = "Requisição inválida para a API do YouTube. Verifique os parâmetros."
-                 status_code = 400
-            else:
-                status_code = e.resp.status
-        except (json.JSONDecodeError, AttributeError):
-            details = str(e.content)
-            status_code = e.resp.status if hasattr(e, "resp") else 500
-        current_app.logger.error(f"Erro na API do YouTube: {status_code} - {error_message} - Details: {details}")
-        return jsonify({"error": error_message, "details": details}), status_code
-    else:
-        current_app.logger.error(f"Erro inesperado ao interagir com a API do YouTube: {e}")
-        return jsonify({"error": error_message, "details": details}), status_code
+# Mensagens de erro da API do YouTube (handle_youtube_api_error) em português
+API_ERROR_MESSAGES = {
+    "default": "Erro ao processar requisição na API do YouTube",
+    "quota": "Quota da API do YouTube excedida. Tente novamente mais tarde.",
+    "bad_request": "Requisição inválida para a API do YouTube. Verifique os parâmetros.",
+}
 
 def parse_iso_datetime(date_string):
     """Converte uma string de data/hora ISO 8601 para um objeto datetime com timezone."""
@@ -77,72 +51,48 @@ def parse_iso_datetime(date_string):
         return None
 
 def fetch_channel_details_batch(youtube, channel_ids):
-    """Busca detalhes de múltiplos canais em uma única chamada."""
+    """Busca detalhes de múltiplos canais, usando o cache persistente de canais.
+
+    Apenas canais ausentes ou desatualizados no cache são buscados na API (lotes de 50).
+    Retorna uma lista de ChannelRecord (src.models.records), na ordem dos IDs.
+    """
     current_app.logger.info(f"Buscando detalhes para o lote de canais: {channel_ids}")
     if not channel_ids: return []
     try:
-        channel_response = youtube.channels().list(part="snippet,statistics", id=",".join(channel_ids)).execute()
-        current_app.logger.info(f"Detalhes do lote de canais obtidos. Itens: {len(channel_response.get('items', []))}")
-        return channel_response.get("items", [])
+        channels = get_channels(youtube, channel_ids)
+        current_app.logger.info(f"Detalhes do lote de canais obtidos. Itens: {len(channels)}")
+        return [channels[channel_id] for channel_id in channel_ids if channel_id in channels]
+    except QuotaBudgetExceeded:
+        raise  # A cota do chamador acabou: a busca toda para (429)
     except Exception as e:
         current_app.logger.error(f"Erro ao buscar detalhes do lote de canais {channel_ids}: {e}")
         return []
 
-def fetch_channel_videos_paginated(youtube, channel_id, max_total_videos=100, videos_per_page=50):
-    """Busca os vídeos mais recentes de um canal, com paginação."""
-    current_app.logger.info(f"Buscando vídeos para o canal {channel_id} (max_total_videos={max_total_videos}, videos_per_page={videos_per_page})")
-    videos = []
-    next_page_token = None
-    pages_to_fetch = math.ceil(max_total_videos / min(videos_per_page, 50))
-    videos_per_page = min(videos_per_page, 50)
-    page_count = 0
-
-    for _ in range(pages_to_fetch):
-        page_count += 1
-        current_app.logger.info(f"Canal {channel_id}: Buscando página {page_count}/{pages_to_fetch} de vídeos...")
-        try:
-            search_response = youtube.search().list(
-                part="snippet", channelId=channel_id, type="video", order="date",
-                maxResults=videos_per_page, pageToken=next_page_token
-            ).execute()
-            video_items = search_response.get("items", [])
-            video_ids = [item["id"]["videoId"] for item in video_items if item.get("id", {}).get("videoId")]
-            current_app.logger.info(f"Canal {channel_id}, Página {page_count}: {len(video_ids)} IDs de vídeo encontrados.")
-
-            if not video_ids: break
-
-            video_response = youtube.videos().list(part="snippet,statistics", id=",".join(video_ids)).execute()
-            video_details_map = {item["id"]: item for item in video_response.get("items", [])}
-            current_app.logger.info(f"Canal {channel_id}, Página {page_count}: Detalhes para {len(video_details_map)} vídeos obtidos.")
-
-            for item in video_items:
-                video_id = item.get("id", {}).get("videoId")
-                if video_id in video_details_map:
-                    video_data = video_details_map[video_id]
-                    snippet = video_data.get("snippet", {})
-                    statistics = video_data.get("statistics", {})
-                    view_count_str = statistics.get("viewCount")
-                    view_count = None
-                    if view_count_str is not None: 
-                        try: view_count = int(view_count_str)
-                        except (ValueError, TypeError): pass
-                    videos.append({
-                        "videoId": video_id, "title": snippet.get("title"),
-                        "publishedAt": snippet.get("publishedAt"),
-                        "thumbnail": snippet.get("thumbnails", {}).get("default", {}).get("url"),
-                        "viewCount": view_count, "channelId": snippet.get("channelId")
-                    })
-                    if len(videos) >= max_total_videos: 
-                        current_app.logger.info(f"Canal {channel_id}: Limite de {max_total_videos} vídeos atingido.")
-                        return videos
-            next_page_token = search_response.get("nextPageToken")
-            if not next_page_token: 
-                current_app.logger.info(f"Canal {channel_id}: Não há mais páginas de vídeos.")
-                break
-            current_app.logger.info(f"Canal {channel_id}: Próximo pageToken para vídeos: {next_page_token}")
-        except Exception as e:
-            current_app.logger.error(f"Erro ao buscar vídeos da página {page_count} para o canal {channel_id}: {e}")
-            break
+def fetch_channel_videos(youtube, channel, max_total_videos, video_cutoff_date, cancelled=None):
+    """Busca os vídeos recentes de um canal pela playlist de uploads.
+
+    playlistItems.list custa 1 unidade por página (search.list custava 100) e a paginação
+    para no primeiro vídeo anterior à data de corte; os detalhes vêm do cache de vídeos
+    (videos.list em lotes de 50). Com `cancelled` marcado, para antes da próxima chamada.
+    """
+    channel_id = channel.channelId
+    current_app.logger.info(f"Buscando uploads do canal {channel_id} (max_total_videos={max_total_videos}, desde {video_cutoff_date})")
+    try:
+        uploads = fetch_channel_uploads(youtube, channel, video_cutoff_date, max_total_videos, cancelled)
+    except QuotaBudgetExceeded:
+        raise
+    except Exception as e:
+        current_app.logger.error(f"Erro ao buscar os uploads do canal {channel_id}: {e}")
+        return []
+    videos = [
+        {
+            "videoId": video.get("videoId"), "title": video.get("title"),
+            "publishedAt": video.get("publishedAt"),
+            "thumbnail": video.get("thumbnailDefault"),
+            "viewCount": video.get("viewCount"), "channelId": video.get("channelId")
+        }
+        for video in uploads
+    ]
     current_app.logger.info(f"Canal {channel_id}: Total de {len(videos)} vídeos coletados.")
     return videos
 
@@ -153,147 +103,236 @@ def calculate_views_per_subscriber(view_count, subscriber_count):
         except (ValueError, TypeError, ZeroDivisionError): return 0.0
     return 0.0
 
+def parse_find_niches_args(args):
+    """Lê e valida os parâmetros de find_niches (request.args ou MultiDict de um job)."""
+    params = {
+        "keywords": args.get("keywords"),
+        "video_published_days": args.get("video_published_days", default=90, type=int),
+        "max_subs": args.get("max_subs", default=10000, type=int),
+        "min_views": args.get("min_views", default=50000, type=int),
+        "max_channel_videos_total": args.get("max_channel_videos_total", default=999999, type=int),
+        "max_channels": min(args.get("max_channels", default=50, type=int), 50),
+        "max_videos": min(args.get("max_videos", default=20, type=int), 50),
+    }
+    return params
+
+def plan_niches_search(params):
+    """Plano da busca de nichos (ver search_planner.plan_find_niches), montado antes de qualquer chamada à API."""
+    video_cutoff_date = datetime.now(timezone.utc) - timedelta(days=params["video_published_days"])
+    return plan_find_niches(params["max_channels"], params["max_videos"], video_cutoff_date)
+
+def collect_niche_results(youtube, params, deadline_seconds=None, incomplete_channels=None, plan=None):
+    """Executa a busca de nichos (canais -> filtros -> vídeos recentes) e retorna os resultados (sem ordenação).
+
+    Segue o `plan` (por padrão plan_niches_search(params)): a data de corte dos uploads é
+    o publishedAfter do plano. Com `deadline_seconds`, devolve o que terminou dentro do
+    prazo; os canais que ficaram de fora (prazo ou timeout por canal) são acrescentados a
+    `incomplete_channels`.
+    """
+    deadline = time.monotonic() + deadline_seconds if deadline_seconds is not None else None
+    plan = plan or plan_niches_search(params)
+    current_app.logger.info(f"Plano da busca: {plan.to_dict()}")
+    keywords = params["keywords"]
+    max_subscribers = params["max_subs"]
+    min_video_views = params["min_views"]
+    max_total_videos_in_channel = params["max_channel_videos_total"]
+    max_channels_to_process = params["max_channels"]
+
+    current_app.logger.info(f"Buscando canais com keywords: \"{keywords}\" (max_channels_to_process={max_channels_to_process})")
+    search_response = youtube.search().list(q=keywords, part="snippet", type="channel", maxResults=max_channels_to_process).execute()
+    initial_channels_data = search_response.get("items", [])
+    current_app.logger.info(f"{len(initial_channels_data)} canais encontrados na busca inicial.")
+    initial_channels = [{"channelId": item["id"]["channelId"]} for item in initial_channels_data if item.get("id", {}).get("channelId")]
+    if not initial_channels: 
+        current_app.logger.info(f"Nenhum ID de canal válido encontrado para keywords: {keywords}")
+        return []
+    current_app.logger.info(f"{len(initial_channels)} IDs de canais válidos para processar.")
+
+    filtered_channels_info = {}
+    channel_ids_to_fetch = [c["channelId"] for c in initial_channels]
+    current_app.logger.info(f"Iniciando busca de detalhes para {len(channel_ids_to_fetch)} canais (lotes de 50 numa só requisição em batch).")
+    channel_details = fetch_channel_details_batch(youtube, channel_ids_to_fetch)
+
+    for channel in channel_details:
+        channel_id = channel.channelId
+        
+        channel_title_for_log = channel.title or "N/A"
+        current_app.logger.info(f"--- Avaliando Canal ID: {channel_id}, Título: {channel_title_for_log} ---")
+
+        subscriber_count = channel.subscriberCount
+        hidden_subscriber_count = channel.hiddenSubscriberCount
+        current_app.logger.info(f"Canal {channel_id}: Contagem de inscritos: {subscriber_count}, Oculta: {hidden_subscriber_count}, Cache: {channel.fetchedAt}")
+
+        if subscriber_count is None or subscriber_count >= max_subscribers:
+            current_app.logger.info(f"Canal {channel_id} REJEITADO: Contagem de inscritos ({subscriber_count}) é None ou >= max_subscribers ({max_subscribers}).")
+            continue
+        current_app.logger.info(f"Canal {channel_id} APROVADO no filtro de inscritos.")
+
+        total_video_count = channel.videoCount
+        current_app.logger.info(f"Canal {channel_id}: Total de vídeos no canal: {total_video_count}")
+
+        if total_video_count is not None and total_video_count > max_total_videos_in_channel:
+            current_app.logger.info(f"Canal {channel_id} REJEITADO: Total de vídeos ({total_video_count}) > max_total_videos_in_channel ({max_total_videos_in_channel}).")
+            continue
+        current_app.logger.info(f"Canal {channel_id} APROVADO no filtro de total de vídeos no canal.")
+        
+        filtered_channels_info[channel_id] = channel
+        current_app.logger.info(f"--- Canal ID: {channel_id} ADICIONADO aos filtrados ---")
+
+    current_app.logger.info(f"{len(filtered_channels_info)} canais passaram nos filtros iniciais.")
+    if not filtered_channels_info: return []
+
+    current_app.logger.info(f"Iniciando busca de vídeos para {len(filtered_channels_info)} canais filtrados.")
+    video_cutoff_date = parse_iso_datetime(plan.search_params["publishedAfter"])  # Aplicado ao paginar a playlist de uploads
+    current_app.logger.info(f"Data de corte para vídeos ({params['video_published_days']} dias atrás): {video_cutoff_date}")
+
+    results = process_channels(current_app._get_current_object(), list(filtered_channels_info.values()), params, video_cutoff_date, deadline, incomplete_channels)
+    current_app.logger.info(f"Total de {len(results)} vídeos coletados que atendem a todos os critérios.")
+    return results
+
+def evaluate_channel_videos(channel_info, channel_videos, video_cutoff_date, min_video_views, keywords):
+    """Aplica os filtros de data e de views aos vídeos de um canal e monta os resultados."""
+    channel_id = channel_info.channelId
+    results = []
+    for video in channel_videos:
+        video_published_at_str = video.get("publishedAt")
+        video_published_at = parse_iso_datetime(video_published_at_str)
+        current_app.logger.info(f"Vídeo {video.get('videoId')} (Canal {channel_id}): Data de pub (raw): {video_published_at_str}, Data parseada: {video_published_at}")
+
+        if not video_published_at or video_published_at < video_cutoff_date:
+            current_app.logger.info(f"Vídeo {video.get('videoId')} REJEITADO: Data de publicação ({video_published_at}) é anterior à data de corte ({video_cutoff_date}) ou inválida.")
+            continue
+        current_app.logger.info(f"Vídeo {video.get('videoId')} APROVADO no filtro de data de publicação.")
+
+        view_count = video.get("viewCount")
+        current_app.logger.info(f"Vídeo {video.get('videoId')} (Canal {channel_id}): Views={view_count}, Filtro Min Views={min_video_views}")
+        if view_count is not None and view_count >= min_video_views:
+            current_app.logger.info(f"Vídeo {video.get('videoId')} APROVADO no filtro de views.")
+            views_per_sub = calculate_views_per_subscriber(view_count, channel_info.subscriberCount)
+            results.append(NicheVideoRecord(
+                channelName=channel_info.title,
+                channelLink=f"https://www.youtube.com/channel/{channel_id}",
+                subscriberCount=channel_info.subscriberCount,
+                videoTitle=video.get("title"),
+                videoLink=f"https://www.youtube.com/watch?v={video.get('videoId')}",
+                publishedAt=video.get("publishedAt"),
+                viewCount=view_count,
+                viewsPerSubscriber=views_per_sub,
+                keyword=keywords
+            ))
+        else:
+            current_app.logger.info(f"Vídeo {video.get('videoId')} REJEITADO no filtro de views (Views: {view_count}, Mínimo: {min_video_views}).")
+    return results
+
+def process_channel(app, channel_info, params, video_cutoff_date, started_at, index, cancelled):
+    """Busca, armazena e avalia os uploads de um canal (roda numa thread do pool, com o próprio cliente).
+
+    Não faz mais chamadas depois que `cancelled` é marcado (canal abandonado pela requisição).
+    """
+    if cancelled.is_set():
+        return []
+    started_at[index] = time.monotonic()
+    with app.app_context():
+        youtube = youtube_client.get_client()
+        if not youtube:
+            return []
+        channel_videos = fetch_channel_videos(youtube, channel_info, params["max_videos"], video_cutoff_date, cancelled)
+        current_app.logger.info(f"Canal {channel_info.channelId}: {len(channel_videos)} vídeos retornados por fetch_channel_videos.")
+        store_niche_videos(params["keywords"], channel_info, channel_videos)  # Armazém local (NicheData)
+        return evaluate_channel_videos(channel_info, channel_videos, video_cutoff_date, params["min_views"], params["keywords"])
+
+def process_channels(app, channels, params, video_cutoff_date, deadline=None, incomplete_channels=None):
+    """Processa os canais em paralelo (até FIND_NICHES_CONCURRENCY ao mesmo tempo).
+
+    Um canal que passa de FIND_NICHES_CHANNEL_TIMEOUT_SECONDS é abandonado e, passado o
+    `deadline` (time.monotonic), a busca devolve o que já terminou. Os IDs dos canais que
+    ficaram de fora vão para `incomplete_channels`; os que ainda rodam são cancelados e
+    param antes da próxima chamada à API, então não gastam cota depois da requisição. Os resultados seguem a ordem dos
+    canais, não a ordem de término, para que a resposta seja determinística.
+    """
+    results_by_index = {}
+    started_at = {}  # índice do canal -> início do processamento (time.monotonic)
+    cancelled = threading.Event()
+    executor = youtube_client.WorkerPool(min(FIND_NICHES_CONCURRENCY, len(channels)))  # Threads (e clientes) compartilhados pelo processo
+    futures = {
+        executor.submit(with_current_ledger(process_channel), app, channel, params, video_cutoff_date, started_at, index, cancelled): index
+        for index, channel in enumerate(channels)
+    }
+    pending = set(futures)
+    try:
+        while pending:
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                current_app.logger.warning(f"Prazo da busca esgotado: {len(pending)} canais não terminaram e ficam de fora.")
+                break
+            timed_out = {future for future in pending if futures[future] in started_at and now - started_at[futures[future]] >= FIND_NICHES_CHANNEL_TIMEOUT_SECONDS}
+            for future in timed_out:
+                current_app.logger.warning(f"Canal {channels[futures[future]].channelId} abandonado após {FIND_NICHES_CHANNEL_TIMEOUT_SECONDS}s.")
+                if incomplete_channels is not None:
+                    incomplete_channels.append(channels[futures[future]].channelId)
+            pending -= timed_out
+            next_check = [started_at[futures[future]] + FIND_NICHES_CHANNEL_TIMEOUT_SECONDS for future in pending if futures[future] in started_at]
+            if deadline is not None:
+                next_check.append(deadline)
+            timeout = max(0.05, min(next_check) - now) if next_check else FIND_NICHES_CHANNEL_TIMEOUT_SECONDS
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    results_by_index[futures[future]] = future.result()
+                except QuotaBudgetExceeded:
+                    raise  # Só este canal falharia, mas a cota do chamador vale para a busca toda
+                except Exception as e:
+                    current_app.logger.error(f"Erro ao processar o canal {channels[futures[future]].channelId}: {e}", exc_info=True)
+    finally:
+        # Canais abandonados param na próxima chamada, sem segurar a resposta; os da fila nem começam
+        cancelled.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+    if incomplete_channels is not None:
+        incomplete_channels.extend(channels[futures[future]].channelId for future in sorted(pending, key=futures.get))
+    return [record for index in sorted(results_by_index) for record in results_by_index[index]]
+
 @youtube_bp.route("/find_niches", methods=["GET"])
+@quota_metered
 def find_niches():
     """Endpoint principal para buscar nichos no YouTube."""
     start_time = time.time()
     current_app.logger.info(f"Iniciando find_niches com parâmetros: {request.args}")
-    keywords = request.args.get("keywords")
-    video_published_within_days = request.args.get("video_published_days", default=90, type=int)
-    max_subscribers = request.args.get("max_subs", default=10000, type=int)
-    min_video_views = request.args.get("min_views", default=50000, type=int)
-    max_total_videos_in_channel = request.args.get("max_channel_videos_total", default=999999, type=int)
-    max_channels_to_process = request.args.get("max_channels", default=50, type=int)
-    max_videos_per_channel_to_analyze = request.args.get("max_videos", default=20, type=int)
-
-    if not keywords: return jsonify({"error": "Parâmetro \"keywords\" é obrigatório"}), 400
+    params = parse_find_niches_args(request.args)
+    sort = request.args.get("sort", default="views_per_subscriber", type=str)  # views, views_per_subscriber, recency, likes_per_view, outlier_ratio, outlier_score ou velocity
+    limit = request.args.get("limit", default=None, type=int)  # Só os N primeiros na ordem pedida (seleção parcial)
+    if sort not in SORT_KEYS: return jsonify({"error": f"Ordenação inválida. Use uma de: {', '.join(SORT_KEYS)}."}), 400
+    explain = request.args.get("explain", default="false", type=str).lower() in ("1", "true", "yes")  # Devolve {"results", "plan"} com o plano e a estimativa de quota
+
+    if not params["keywords"]: return jsonify({"error": "Parâmetro \"keywords\" é obrigatório"}), 400
     
-    max_channels_to_process = min(max_channels_to_process, 50)
-    max_videos_per_channel_to_analyze = min(max_videos_per_channel_to_analyze, 50)
-    current_app.logger.info(f"Parâmetros validados: keywords=\"{keywords}\", video_published_days={video_published_within_days}, max_subs={max_subscribers}, min_video_views={min_video_views}, max_channel_videos_total={max_total_videos_in_channel}, max_channels_to_process={max_channels_to_process}, max_videos_to_analyze={max_videos_per_channel_to_analyze}")
+    current_app.logger.info(f"Parâmetros validados: keywords=\"{params['keywords']}\", video_published_days={params['video_published_days']}, max_subs={params['max_subs']}, min_video_views={params['min_views']}, max_channel_videos_total={params['max_channel_videos_total']}, max_channels_to_process={params['max_channels']}, max_videos_to_analyze={params['max_videos']}")
+
+    error = budget_error()  # Cota do chamador já esgotada hoje -> 429 antes de qualquer chamada
+    if error: return error
 
     youtube = get_youtube_client()
     if not youtube: return jsonify({"error": "Falha ao conectar com a API do YouTube."}), 500
 
     try:
-        current_app.logger.info(f"Buscando canais com keywords: \"{keywords}\" (max_channels_to_process={max_channels_to_process})")
-        search_response = youtube.search().list(q=keywords, part="snippet", type="channel", maxResults=max_channels_to_process).execute()
-        initial_channels_data = search_response.get("items", [])
-        current_app.logger.info(f"{len(initial_channels_data)} canais encontrados na busca inicial.")
-        initial_channels = [{"channelId": item["id"]["channelId"]} for item in initial_channels_data if item.get("id", {}).get("channelId")]
-        if not initial_channels: 
-            current_app.logger.info(f"Nenhum ID de canal válido encontrado para keywords: {keywords}")
-            return jsonify([])
-        current_app.logger.info(f"{len(initial_channels)} IDs de canais válidos para processar.")
-
-        filtered_channels_info = {}
-        channel_ids_to_fetch = [c["channelId"] for c in initial_channels]
-        batch_size = 50
-        current_app.logger.info(f"Iniciando busca de detalhes para {len(channel_ids_to_fetch)} canais em lotes de {batch_size}.")
-        
-        for i in range(0, len(channel_ids_to_fetch), batch_size):
-            batch_ids = channel_ids_to_fetch[i:i + batch_size]
-            current_app.logger.info(f"Processando lote de IDs de canal: {batch_ids}")
-            channel_details_batch = fetch_channel_details_batch(youtube, batch_ids)
-            
-            for item in channel_details_batch:
-                channel_id = item.get("id")
-                snippet = item.get("snippet", {})
-                statistics = item.get("statistics", {})
-                
-                channel_title_for_log = snippet.get("title", "N/A")
-                current_app.logger.info(f"--- Avaliando Canal ID: {channel_id}, Título: {channel_title_for_log} ---")
-
-                subscriber_count_str = statistics.get("subscriberCount")
-                hidden_subscriber_count = statistics.get("hiddenSubscriberCount", False)
-                subscriber_count = None
-                if not hidden_subscriber_count and subscriber_count_str is not None:
-                    try: 
-                        subscriber_count = int(subscriber_count_str)
-                    except (ValueError, TypeError): 
-                        current_app.logger.warning(f"Canal {channel_id}: Falha ao converter subscriberCount \'{subscriber_count_str}\' para int.")
-                        pass
-                current_app.logger.info(f"Canal {channel_id}: Contagem de inscritos (raw): {subscriber_count_str}, Oculta: {hidden_subscriber_count}, Contagem parseada: {subscriber_count}")
-
-                if subscriber_count is None or subscriber_count >= max_subscribers:
-                    current_app.logger.info(f"Canal {channel_id} REJEITADO: Contagem de inscritos ({subscriber_count}) é None ou >= max_subscribers ({max_subscribers}).")
-                    continue
-                current_app.logger.info(f"Canal {channel_id} APROVADO no filtro de inscritos.")
-
-                total_video_count_str = statistics.get("videoCount")
-                total_video_count = None
-                if total_video_count_str is not None:
-                    try:
-                        total_video_count = int(total_video_count_str)
-                    except (ValueError, TypeError):
-                        # CORRIGIDO AQUI:
-                        current_app.logger.warning(f"Canal {channel_id}: Falha ao converter videoCount \'{total_video_count_str}\' para int.")
-                current_app.logger.info(f"Canal {channel_id}: Total de vídeos no canal (raw): {total_video_count_str}, Parseado: {total_video_count}")
-
-                if total_video_count is not None and total_video_count > max_total_videos_in_channel:
-                    current_app.logger.info(f"Canal {channel_id} REJEITADO: Total de vídeos ({total_video_count}) > max_total_videos_in_channel ({max_total_videos_in_channel}).")
-                    continue
-                current_app.logger.info(f"Canal {channel_id} APROVADO no filtro de total de vídeos no canal.")
-                
-                filtered_channels_info[channel_id] = {
-                    "channelId": channel_id, 
-                    "title": snippet.get("title"),
-                    "subscriberCount": subscriber_count,
-                    "channel_link": f"https://www.youtube.com/channel/{channel_id}"
-                }
-                current_app.logger.info(f"--- Canal ID: {channel_id} ADICIONADO aos filtrados ---")
-
-        current_app.logger.info(f"{len(filtered_channels_info)} canais passaram nos filtros iniciais.")
-        if not filtered_channels_info: return jsonify([])
-
-        results = []
-        processed_channel_count = 0
-        current_app.logger.info(f"Iniciando busca de vídeos para {len(filtered_channels_info)} canais filtrados.")
-        video_cutoff_date = datetime.now(timezone.utc) - timedelta(days=video_published_within_days)
-        current_app.logger.info(f"Data de corte para vídeos ({video_published_within_days} dias atrás): {video_cutoff_date}")
-
-        for channel_id, channel_info in filtered_channels_info.items():
-            processed_channel_count += 1
-            current_app.logger.info(f"Processando canal {processed_channel_count}/{len(filtered_channels_info)}: ID={channel_id}, Título=\"{channel_info['title']}\"")
-            channel_videos = fetch_channel_videos_paginated(youtube, channel_id, max_videos_per_channel_to_analyze)
-            current_app.logger.info(f"Canal {channel_id}: {len(channel_videos)} vídeos retornados por fetch_channel_videos_paginated.")
-            
-            for video in channel_videos:
-                video_published_at_str = video.get("publishedAt")
-                video_published_at = parse_iso_datetime(video_published_at_str)
-                current_app.logger.info(f"Vídeo {video.get('videoId')} (Canal {channel_id}): Data de pub (raw): {video_published_at_str}, Data parseada: {video_published_at}")
-
-                if not video_published_at or video_published_at < video_cutoff_date:
-                    current_app.logger.info(f"Vídeo {video.get('videoId')} REJEITADO: Data de publicação ({video_published_at}) é anterior à data de corte ({video_cutoff_date}) ou inválida.")
-                    continue
-                current_app.logger.info(f"Vídeo {video.get('videoId')} APROVADO no filtro de data de publicação.")
-
-                view_count = video.get("viewCount")
-                current_app.logger.info(f"Vídeo {video.get('videoId')} (Canal {channel_id}): Views={view_count}, Filtro Min Views={min_video_views}")
-                if view_count is not None and view_count >= min_video_views:
-                    current_app.logger.info(f"Vídeo {video.get('videoId')} APROVADO no filtro de views.")
-                    views_per_sub = calculate_views_per_subscriber(view_count, channel_info["subscriberCount"])
-                    results.append({
-                        "channelName": channel_info["title"],
-                        "channelLink": channel_info["channel_link"],
-                        "subscriberCount": channel_info["subscriberCount"],
-                        "videoTitle": video.get("title"),
-                        "videoLink": f"https://www.youtube.com/watch?v={video.get('videoId')}",
-                        "publishedAt": video.get("publishedAt"),
-                        "viewCount": view_count,
-                        "viewsPerSubscriber": views_per_sub,
-                        "keyword": keywords
-                    })
-                else:
-                    current_app.logger.info(f"Vídeo {video.get('videoId')} REJEITADO no filtro de views (Views: {view_count}, Mínimo: {min_video_views}).")
-        current_app.logger.info(f"Total de {len(results)} vídeos coletados que atendem a todos os critérios.")
-        results.sort(key=lambda x: x["viewsPerSubscriber"], reverse=True)
+        incomplete_channels = []
+        plan = plan_niches_search(params)
+        results = ResultColumns(collect_niche_results(youtube, params, FIND_NICHES_DEADLINE_SECONDS, incomplete_channels, plan), channel_view_history).rows(sort, limit)
         end_time = time.time()
         current_app.logger.info(f"find_niches concluído em {end_time - start_time:.2f} segundos. Retornando {len(results)} resultados.")
-        return jsonify(results)
-    except HttpError as e:
-        return handle_api_error(e)
+        response = jsonify({"results": results, "plan": plan.to_dict()} if explain else results)
+        if incomplete_channels:
+            response.headers["X-Incomplete-Channels"] = str(len(incomplete_channels))  # Canais que não terminaram no prazo (resultados parciais)
+        return response
+    except (HttpError, QuotaBudgetExceeded) as e:
+        return handle_youtube_api_error(e, API_ERROR_MESSAGES)  # Cota do chamador esgotada no meio da busca -> 429
+    except CircuitOpenError as e:
+        current_app.logger.warning(f"find_niches recusado: {e}")
+        return jsonify({"error": "A API do YouTube está indisponível no momento. Tente novamente em instantes."}), 503, {"Retry-After": str(max(1, e.retry_in))}
     except Exception as e:
         current_app.logger.error(f"Erro inesperado em find_niches: {e}", exc_info=True)
         return jsonify({"error": "Ocorreu um erro inesperado no servidor ao buscar nichos."}), 500
 
+@youtube_bp.route("/client_stats", methods=["GET"])
+def client_stats():
+    """Clientes do YouTube criados, conexões HTTP reaproveitadas e estado do circuit breaker deste worker."""
+    return jsonify(dict(youtube_client.client_stats.to_dict(), pid=os.getpid(), circuit_breaker=youtube_breaker.to_dict()))
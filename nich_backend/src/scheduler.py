@@ -1,26 +1,55 @@
 # src/scheduler.py
 
-from apscheduler.schedulers.background import BackgroundScheduler
-from src.routes.youtube import calculate_trending_niches
+import os
 import atexit
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from src.services.harvester import harvest_niches, HARVEST_HOURS, HARVEST_INTERVAL_MINUTES
+from src.services.trending import update_trending_niches
+from src.services.quota import QUOTA_TIMEZONE
+
+# Opt-in: the scheduler starts wherever src.main is imported (every gunicorn worker, CLI
+# scripts, the benchmarks), so only the process(es) meant to crawl should enable it
+HARVESTER_ENABLED = os.getenv("HARVESTER_ENABLED", "false").lower() in ("1", "true", "yes")
+TRENDING_HOUR = int(os.getenv("TRENDING_HOUR", "6"))  # After the night's harvest, Pacific time
+
+def run_harvest(app):
+    with app.app_context():
+        harvest_niches()
+
+def run_trending(app):
+    with app.app_context():
+        update_trending_niches()
 
 def init_scheduler(app):
-    """Initializes and starts the background scheduler."""
-    scheduler = BackgroundScheduler(daemon=True)
-    # Schedule the job to run once a week (e.g., every Monday at 3 AM)
-    # Use app.app_context() within the job if it needs access to app context
+    """Initializes and starts the background scheduler.
+
+    Only runs when HARVESTER_ENABLED is set. If several processes enable it anyway, the
+    harvester's database lock still makes sure only one of them crawls at a time.
+    """
+    scheduler = BackgroundScheduler(daemon=True, timezone=QUOTA_TIMEZONE)
+    # Off-peak hours of the quota day (Pacific Time), every HARVEST_INTERVAL_MINUTES
+    scheduler.add_job(
+        func=run_harvest,
+        args=[app],
+        trigger=CronTrigger(hour=HARVEST_HOURS, minute=f"*/{HARVEST_INTERVAL_MINUTES}", timezone=QUOTA_TIMEZONE),
+        id="niche_harvester",
+        max_instances=1,
+        coalesce=True,
+    )
+    # Incremental trending-niche computation over what was collected since the last run
     scheduler.add_job(
-        func=lambda: app.app_context().push() or calculate_trending_niches(), 
-        trigger="cron", 
-        day_of_week="mon", 
-        hour=3, 
-        minute=0
+        func=run_trending,
+        args=[app],
+        trigger=CronTrigger(hour=TRENDING_HOUR, minute=0, timezone=QUOTA_TIMEZONE),
+        id="trending_niches",
+        max_instances=1,
+        coalesce=True,
     )
     scheduler.start()
-    print("Scheduler started. Task 'calculate_trending_niches' scheduled weekly.")
+    app.logger.info(f"Scheduler started. Niche harvester scheduled at hours {HARVEST_HOURS} (Pacific), every {HARVEST_INTERVAL_MINUTES} minutes; trending niches daily at {TRENDING_HOUR}h.")
 
     # Shut down the scheduler when exiting the app
-    atexit.register(lambda: scheduler.shutdown())
+    atexit.register(lambda: scheduler.shutdown(wait=False))
 
     return scheduler
-
@@ -0,0 +1,100 @@
+# src/services/channel_store.py
+
+import os
+from datetime import datetime, timedelta
+from flask import current_app
+from src.models.channel_stats import ChannelStats
+from src.services.db_upsert import upsert_rows
+from src.services.upstream import STALE_FALLBACK_MAX_AGE_SECONDS, is_upstream_failure
+from src.services.youtube_data import id_lookups, execute_lookups
+
+# Channel statistics change slowly; rows fetched within this window are served from the
+# database instead of calling channels.list again (shared by every gunicorn worker).
+CHANNEL_STATS_TTL_SECONDS = int(os.getenv("CHANNEL_STATS_TTL_SECONDS", "43200"))
+CHANNEL_PARTS = "snippet,statistics,contentDetails"  # contentDetails: uploads playlist (same quota cost)
+
+
+def _to_int(value):
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def channel_row_from_item(item, fetched_at):
+    """Converts a channels.list item into a ChannelStats column dict."""
+    snippet = item.get("snippet", {})
+    statistics = item.get("statistics", {})
+    related_playlists = item.get("contentDetails", {}).get("relatedPlaylists", {})
+    hidden = bool(statistics.get("hiddenSubscriberCount", False))
+    return {
+        "channel_id": item["id"],
+        "title": snippet.get("title"),
+        "subscriber_count": None if hidden else _to_int(statistics.get("subscriberCount")),
+        "video_count": _to_int(statistics.get("videoCount")),
+        "hidden_subscriber_count": hidden,
+        "uploads_playlist_id": related_playlists.get("uploads"),
+        "fetched_at": fetched_at,
+    }
+
+
+def load_channels(channel_ids, max_age_seconds=None):
+    """Bulk lookup of fresh rows. Returns {channel_id: ChannelRecord} for the IDs found."""
+    max_age_seconds = CHANNEL_STATS_TTL_SECONDS if max_age_seconds is None else max_age_seconds
+    fresh_after = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    channels = {}
+    channel_ids = list(channel_ids)
+    # Chunked to stay well below the database's bound-parameter limit
+    for i in range(0, len(channel_ids), 500):
+        rows = ChannelStats.query.filter(
+            ChannelStats.channel_id.in_(channel_ids[i:i + 500]),
+            ChannelStats.fetched_at >= fresh_after,
+        ).all()
+        channels.update({row.channel_id: row.to_record() for row in rows})
+    return channels
+
+
+def store_channel_items(items):
+    """Upserts channels.list items and returns {channel_id: ChannelRecord}."""
+    fetched_at = datetime.utcnow()
+    rows = [channel_row_from_item(item, fetched_at) for item in items if item.get("id")]
+    upsert_rows(ChannelStats, rows, ["channel_id"])
+    return {row["channel_id"]: ChannelStats(**row).to_record() for row in rows}
+
+
+def get_channels(youtube, channel_ids, max_age_seconds=None, unavailable=None):
+    """Returns {channel_id: ChannelRecord}, calling channels.list only for missing or stale IDs.
+
+    Channels unknown to the API are simply absent from the result. The calls (50 IDs
+    each) share one batch round trip and fail independently: for those the API couldn't
+    answer (see upstream), stored rows up to STALE_FALLBACK_MAX_AGE_SECONDS old are
+    served instead; other API errors, or an outage with nothing to serve, propagate to
+    the caller, which keeps its own error handling. IDs of failed calls that couldn't be
+    served are added to the `unavailable` set when one is given.
+    """
+    channel_ids = list(dict.fromkeys(cid for cid in channel_ids if cid))
+    if not channel_ids:
+        return {}
+    channels = load_channels(channel_ids, max_age_seconds)
+    missing_ids = [cid for cid in channel_ids if cid not in channels]
+    current_app.logger.info(f"Channel store: {len(channels)} fresh, {len(missing_ids)} to fetch from the API.")
+    lookups = execute_lookups(youtube, id_lookups("channels", CHANNEL_PARTS, missing_ids))  # One batch round trip
+    for lookup in lookups:
+        if lookup.items:
+            channels.update(store_channel_items(lookup.items))
+    errors = [lookup.error for lookup in lookups if lookup.error is not None]
+    if errors:
+        error = next((e for e in errors if not is_upstream_failure(e)), errors[0])
+        if not is_upstream_failure(error):
+            raise error
+        failed_ids = [cid for lookup in lookups if lookup.error is not None for cid in lookup.ids]
+        stale = load_channels(failed_ids, STALE_FALLBACK_MAX_AGE_SECONDS)
+        if not stale and not channels:
+            raise error
+        current_app.logger.warning(f"Channel store: API unavailable ({error}); serving {len(stale)} stale channels.")
+        channels.update(stale)
+        if unavailable is not None:
+            unavailable.update(cid for cid in failed_ids if cid not in channels)
+    return channels
@@ -0,0 +1,182 @@
+# src/services/channel_uploads.py
+
+from datetime import datetime, timezone
+from flask import current_app
+from googleapiclient.errors import HttpError
+from src.models.user import db
+from src.models.video_details import VideoDetails
+from src.models.channel_sync import ChannelSyncState
+from src.services.db_upsert import upsert_rows
+from src.services.video_store import get_videos
+
+# Recent uploads of a channel, read from its uploads playlist.
+#
+# playlistItems.list costs 1 quota unit per page, against 100 for a
+# search.list(channelId=..., order="date") page, and lists the uploads newest first
+# with each video's publish time, so paging stops at the first video older than the
+# cutoff. The details and statistics of the collected IDs then go through the video
+# store (videos.list in batches of 50, cached).
+#
+# Each channel also keeps a high-water mark (ChannelSyncState): the newest upload already
+# seen and the range of publish times whose uploads are all in the video store. When that
+# range covers the requested window, paging stops at the mark and the new uploads are
+# merged with the stored ones, so a channel analysed again costs one playlist page; the
+# statistics of the merged window are refreshed by the video store's TTL as usual.
+
+UPLOADS_PAGE_SIZE = 50  # Maximum maxResults of playlistItems.list
+
+
+def uploads_playlist_id(channel):
+    """Uploads playlist of a ChannelRecord.
+
+    Comes from channels.list contentDetails; channels stored before it was kept fall
+    back to the playlist ID YouTube derives from the channel ID ("UC..." -> "UU...").
+    """
+    if channel.uploadsPlaylistId:
+        return channel.uploadsPlaylistId
+    if channel.channelId and channel.channelId.startswith("UC"):
+        return f"UU{channel.channelId[2:]}"
+    return None
+
+
+def _parse_published_at(value):
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _naive_utc(value):
+    """Aware datetime -> naive UTC, the way DateTime columns are stored."""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def iter_upload_pages(youtube, playlist_id, published_after, max_videos, high_water=None):
+    """Yields the (video_id, published_at) uploads of each playlistItems.list page, newest first.
+
+    Stops at the first upload published before `published_after` (an aware datetime),
+    at the `high_water` mark ((video_id, aware published_at) of an upload already seen,
+    not yielded), after `max_videos` uploads, or at the end of the playlist. Private and
+    deleted videos (no videoPublishedAt) are skipped.
+    """
+    page_token = None
+    remaining = max_videos
+    while remaining > 0:
+        response = youtube.playlistItems().list(
+            part="contentDetails", playlistId=playlist_id,
+            maxResults=min(UPLOADS_PAGE_SIZE, remaining), pageToken=page_token,
+        ).execute()
+        uploads = []
+        reached_cutoff = False
+        for item in response.get("items", []):
+            details = item.get("contentDetails", {})
+            published_at = _parse_published_at(details.get("videoPublishedAt"))
+            if not details.get("videoId") or published_at is None:
+                continue
+            if published_after and published_at < published_after:
+                reached_cutoff = True
+                break
+            if high_water and (details["videoId"] == high_water[0] or published_at < high_water[1]):
+                reached_cutoff = True
+                break
+            uploads.append((details["videoId"], published_at))
+        uploads = uploads[:remaining]
+        remaining -= len(uploads)
+        if uploads:
+            yield uploads
+        page_token = response.get("nextPageToken")
+        if reached_cutoff or not page_token:
+            return
+
+
+def _load_sync_state(channel_id):
+    state = db.session.get(ChannelSyncState, channel_id)
+    # Converted right away: the row is expired by later commits
+    return None if state is None else {
+        "newest_video_id": state.newest_video_id,
+        "newest_published_at": state.newest_published_at,
+        "covered_since": state.covered_since,
+    }
+
+
+def _stored_upload_ids(channel_id, published_since, limit):
+    """IDs of the channel's videos in the video store published since `published_since` (naive UTC), newest first."""
+    rows = (
+        db.session.query(VideoDetails.video_id)
+        .filter(VideoDetails.channel_id == channel_id, VideoDetails.published_at >= published_since)
+        .order_by(VideoDetails.published_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return [row.video_id for row in rows]
+
+
+def _record_sync(channel_id, state, uploads, cutoff, max_videos):
+    """Moves the channel's mark to the newest of `uploads` (the ones paged this time).
+
+    When paging stopped at `max_videos` it may not have reached the cutoff or the old
+    mark, so the complete range then only starts at the oldest upload paged.
+    """
+    newest_video_id, newest_published_at = (state["newest_video_id"], state["newest_published_at"]) if state else (None, None)
+    if uploads:
+        newest_video_id, newest_published_at = uploads[0][0], _naive_utc(uploads[0][1])
+    if len(uploads) >= max_videos:
+        covered_since = _naive_utc(uploads[-1][1])
+    else:
+        covered_since = state["covered_since"] if state else cutoff
+    upsert_rows(ChannelSyncState, [{
+        "channel_id": channel_id,
+        "newest_video_id": newest_video_id,
+        "newest_published_at": newest_published_at,
+        "covered_since": covered_since,
+        "synced_at": datetime.utcnow(),
+    }], ["channel_id"])
+    db.session.commit()
+
+
+def fetch_channel_uploads(youtube, channel, published_after, max_videos, cancelled=None):
+    """Returns the channel's uploads published after `published_after`, newest first.
+
+    At most `max_videos` video dicts (see VideoDetails.to_dict). When the channel's sync
+    state already covers the window (or holds at least `max_videos` uploads in it), only
+    the uploads past its mark are paged and merged with the stored ones. A channel without
+    an uploads playlist (no videos) returns an empty list; other API errors propagate.
+    Once `cancelled` (a threading.Event) is set, no more calls are made and an empty list
+    is returned, leaving the sync state as it was.
+    """
+    playlist_id = uploads_playlist_id(channel)
+    if not playlist_id or max_videos <= 0:
+        return []
+    cutoff = _naive_utc(published_after) if published_after else None
+    state = _load_sync_state(channel.channelId) if cutoff else None
+    stored_ids = []
+    if state:
+        stored_ids = _stored_upload_ids(channel.channelId, max(cutoff, state["covered_since"]), max_videos)
+        if state["covered_since"] > cutoff and len(stored_ids) < max_videos:
+            state, stored_ids = None, []  # Window older than the stored history: page it all again
+    high_water = None
+    if state and state["newest_video_id"]:
+        high_water = (state["newest_video_id"], state["newest_published_at"].replace(tzinfo=timezone.utc))
+
+    uploads = []
+    try:
+        for page in iter_upload_pages(youtube, playlist_id, published_after, max_videos, high_water):
+            uploads.extend(page)
+            if cancelled is not None and cancelled.is_set():
+                break
+    except HttpError as e:
+        if e.resp.status != 404:
+            raise
+        current_app.logger.info(f"Channel {channel.channelId}: uploads playlist {playlist_id} not found.")
+        return []
+    if cancelled is not None and cancelled.is_set():
+        current_app.logger.info(f"Channel {channel.channelId}: cancelled after {len(uploads)} uploads.")
+        return []
+    if state:
+        current_app.logger.info(f"Channel {channel.channelId}: {len(uploads)} new uploads past the mark, {len(stored_ids)} stored.")
+    video_ids = list(dict.fromkeys([video_id for video_id, _ in uploads] + stored_ids))[:max_videos]
+    videos = get_videos(youtube, video_ids) if video_ids else {}
+    # The mark only moves once every new upload is in the video store (an outage may have left some out)
+    if cutoff and all(video_id in videos for video_id, _ in uploads):
+        _record_sync(channel.channelId, state, uploads, cutoff, max_videos)
+    return [videos[video_id] for video_id in video_ids if video_id in videos]
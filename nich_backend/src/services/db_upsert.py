@@ -0,0 +1,50 @@
+# src/services/db_upsert.py
+
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+
+
+def upsert_rows(model, rows, index_elements, update_columns=None, increment_columns=()):
+    """Inserts or updates `rows` (a list of column dicts) in a single statement.
+
+    Uses INSERT ... ON CONFLICT on SQLite/PostgreSQL so concurrent gunicorn workers
+    writing the same keys never race; other dialects fall back to session.merge().
+    `update_columns` restricts which columns an existing row gets overwritten with
+    (default: every non-key column). `increment_columns` are counters: the row's value
+    is added to the existing one instead of replacing it.
+    """
+    if not rows:
+        return
+    dialect = db.engine.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(model.__table__).values(rows)
+        statement = statement.on_conflict_do_update(index_elements=index_elements, set_={
+            column.name: column + statement.excluded[column.name] if column.name in increment_columns else statement.excluded[column.name]
+            for column in model.__table__.columns
+            if column.name not in index_elements and not column.primary_key
+            and (update_columns is None or column.name in update_columns or column.name in increment_columns)
+        })
+        db.session.execute(statement)
+        db.session.commit()
+        return
+    try:
+        for row in rows:
+            if not increment_columns:
+                db.session.merge(model(**row))
+                continue
+            existing = model.query.filter_by(**{name: row[name] for name in index_elements}).with_for_update().first()
+            if existing is None:
+                db.session.add(model(**row))
+                continue
+            for name, value in row.items():
+                if name in increment_columns:
+                    setattr(existing, name, getattr(existing, name) + value)
+                elif name not in index_elements and (update_columns is None or name in update_columns):
+                    setattr(existing, name, value)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
@@ -0,0 +1,403 @@
+# src/services/fake_youtube.py
+
+import os
+import json
+import time
+import zlib
+import random
+import threading
+from email.parser import Parser
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit, parse_qsl, urlencode
+import httplib2
+from src.services.search_planner import QUOTA_COSTS
+
+# Offline stand-in for the YouTube Data API, for development and benchmarks (no quota spent).
+#
+# With YOUTUBE_FAKE_API set, youtube_client builds its clients on FakeYouTubeHttp, which
+# answers search.list, videos.list, channels.list and playlistItems.list (single or in a
+# multipart batch) at the HTTP layer: key rotation, quota accounting, retries and the
+# circuit breaker run exactly as they do against the real API.
+#
+#   YOUTUBE_FAKE_API=synthetic      deterministic data generated from each query / ID
+#   YOUTUBE_FAKE_API=<fixture.json> replays recorded responses (synthetic data for the rest)
+#
+# Fixtures are recorded from the real API with YOUTUBE_API_RECORD=<fixture.json>. Latency
+# (YOUTUBE_FAKE_LATENCY_MS +/- YOUTUBE_FAKE_JITTER_MS) and errors (a YOUTUBE_FAKE_ERROR_RATE
+# share of the calls answer YOUTUBE_FAKE_ERROR_STATUS) are injected on every call.
+
+FAKE_API = os.getenv("YOUTUBE_FAKE_API", "").strip()
+RECORD_PATH = os.getenv("YOUTUBE_API_RECORD", "").strip()
+FAKE_LATENCY_MS = float(os.getenv("YOUTUBE_FAKE_LATENCY_MS", "0"))
+FAKE_JITTER_MS = float(os.getenv("YOUTUBE_FAKE_JITTER_MS", "0"))
+FAKE_ERROR_RATE = float(os.getenv("YOUTUBE_FAKE_ERROR_RATE", "0"))
+FAKE_ERROR_STATUS = int(os.getenv("YOUTUBE_FAKE_ERROR_STATUS", "503"))
+FAKE_RESULTS_PER_QUERY = int(os.getenv("YOUTUBE_FAKE_RESULTS_PER_QUERY", "150"))  # search.list hits before the last page
+FAKE_CHANNELS_PER_QUERY = int(os.getenv("YOUTUBE_FAKE_CHANNELS_PER_QUERY", "40"))
+
+API_PATH_PREFIX = "/youtube/v3/"
+BATCH_PATH = "/batch"  # batchPath of the discovery document
+BATCH_BOUNDARY = "fake_youtube_batch"
+DEFAULT_MAX_RESULTS = 5  # search.list default, as in the real API
+ERROR_REASONS = {400: "badRequest", 403: "quotaExceeded", 404: "notFound", 429: "rateLimitExceeded"}
+# Query parameters that don't change the answer of a recorded call
+UNRECORDED_PARAMS = ("key", "alt", "prettyPrint", "publishedAfter")
+
+
+def _seed(*parts):
+    return zlib.crc32(":".join(str(part) for part in parts).encode("utf-8"))
+
+
+def _rfc3339(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def request_key(uri):
+    """Canonical form of an API call (path and sorted parameters, without the API key)."""
+    _, _, path, query, _ = urlsplit(uri)
+    params = sorted((name, value) for name, value in parse_qsl(query, keep_blank_values=True) if name not in UNRECORDED_PARAMS)
+    return f"{path}?{urlencode(params)}"
+
+
+def batch_parts(content_type, body):
+    """Splits a multipart/mixed batch body into [(id, first line, body)] (request or response parts).
+
+    `id` is what follows " + " in the part's Content-ID, shared by a request and its response.
+    """
+    message = Parser().parsestr(f"Content-Type: {content_type}\r\n\r\n{body}")
+    parts = []
+    for part in message.get_payload():
+        first_line, _, rest = part.get_payload().partition("\n")
+        content_id = (part["Content-ID"] or "").strip("<>")
+        parts.append((content_id.split(" + ", 1)[-1], first_line.strip(), rest.partition("\r\n\r\n")[2] or rest.partition("\n\n")[2]))
+    return parts
+
+
+def api_error(status, message=None):
+    reason = ERROR_REASONS.get(status, "backendError")
+    return status, {"error": {"code": status, "message": message or f"Injected {reason}.", "errors": [{"reason": reason, "domain": "youtube.fake"}]}}
+
+
+class SyntheticWorld:
+    """Channels and videos derived from their IDs, so any call can be answered without state.
+
+    A query maps to a fixed pool of channels; channel "UC<key>" has `videoCount` uploads
+    "<key>_<n>" (n=0 is the newest) spaced by its own upload interval.
+    """
+
+    def __init__(self, results_per_query=FAKE_RESULTS_PER_QUERY, channels_per_query=FAKE_CHANNELS_PER_QUERY, now=None):
+        self.results_per_query = results_per_query
+        self.channels_per_query = channels_per_query
+        self.now = (now or datetime.now(timezone.utc)).replace(microsecond=0)
+
+    def channel_keys(self, query):
+        base = _seed("query", query.lower())
+        return [f"{base:08x}{k:02x}" for k in range(self.channels_per_query)]
+
+    def _channel_profile(self, key):
+        rng = random.Random(_seed("channel", key))
+        return {
+            "subscribers": int(10 ** rng.uniform(2, 6.5)),
+            "video_count": rng.randint(5, 400),
+            "hidden": rng.random() < 0.03,
+            "upload_hours": rng.uniform(6, 96),
+        }
+
+    def channel(self, channel_id, parts):
+        if not channel_id.startswith("UC"):
+            return None
+        key = channel_id[2:]
+        profile = self._channel_profile(key)
+        item = {"kind": "youtube#channel", "id": channel_id}
+        if "snippet" in parts:
+            item["snippet"] = {"title": f"Channel {key}", "description": "", "publishedAt": _rfc3339(self.now - timedelta(days=900))}
+        if "statistics" in parts:
+            item["statistics"] = {
+                "subscriberCount": str(0 if profile["hidden"] else profile["subscribers"]),
+                "hiddenSubscriberCount": profile["hidden"],
+                "videoCount": str(profile["video_count"]),
+                "viewCount": str(profile["subscribers"] * profile["video_count"] * 3),
+            }
+        if "contentDetails" in parts:
+            item["contentDetails"] = {"relatedPlaylists": {"uploads": f"UU{key}"}}
+        return item
+
+    def _video_profile(self, video_id):
+        key, _, n = video_id.rpartition("_")
+        if not key or not n.isdigit():
+            return None
+        n = int(n)
+        channel = self._channel_profile(key)
+        if n >= channel["video_count"]:
+            return None
+        rng = random.Random(_seed("video", video_id))
+        views = int(10 ** rng.uniform(2, 7))
+        seconds = rng.randint(10, 59) if rng.random() < 0.9 else rng.randint(61, 600)
+        return {
+            "key": key,
+            "n": n,
+            "published_at": self.now - timedelta(hours=(n + rng.random()) * channel["upload_hours"]),
+            "views": views,
+            "likes": int(views * rng.uniform(0.01, 0.08)),
+            "comments": int(views * rng.uniform(0.0005, 0.005)),
+            "seconds": seconds,
+        }
+
+    def _snippet(self, video_id, profile):
+        thumbnail = f"https://i.ytimg.com/vi/{video_id}"
+        return {
+            "publishedAt": _rfc3339(profile["published_at"]),
+            "channelId": f"UC{profile['key']}",
+            "title": f"Video {profile['n']} of channel {profile['key']}",
+            "channelTitle": f"Channel {profile['key']}",
+            "thumbnails": {size: {"url": f"{thumbnail}/{size}.jpg"} for size in ("default", "medium", "high")},
+        }
+
+    def video(self, video_id, parts):
+        profile = self._video_profile(video_id)
+        if profile is None:
+            return None
+        item = {"kind": "youtube#video", "id": video_id}
+        if "snippet" in parts:
+            item["snippet"] = self._snippet(video_id, profile)
+        if "statistics" in parts:
+            item["statistics"] = {"viewCount": str(profile["views"]), "likeCount": str(profile["likes"]), "commentCount": str(profile["comments"])}
+        if "contentDetails" in parts:
+            minutes, seconds = divmod(profile["seconds"], 60)
+            item["contentDetails"] = {"duration": f"PT{minutes}M{seconds}S" if minutes else f"PT{seconds}S"}
+        return item
+
+    def _video_hits(self, params):
+        """Every video ID search.list would return for `params`, in its order."""
+        if params.get("channelId", "").startswith("UC"):
+            key = params["channelId"][2:]
+            video_ids = [f"{key}_{n}" for n in range(self._channel_profile(key)["video_count"])]
+        else:
+            query = params.get("q", "")
+            keys = self.channel_keys(query)
+            rng = random.Random(_seed("search", query.lower()))
+            video_ids = list(dict.fromkeys(f"{rng.choice(keys)}_{int(rng.expovariate(1 / 15))}" for _ in range(self.results_per_query)))
+
+        profiles = [(vid, self._video_profile(vid)) for vid in video_ids]
+        profiles = [(vid, profile) for vid, profile in profiles if profile]
+        if params.get("publishedAfter"):
+            published_after = datetime.fromisoformat(params["publishedAfter"].replace("Z", "+00:00"))
+            profiles = [(vid, profile) for vid, profile in profiles if profile["published_at"] >= published_after]
+        if params.get("videoDuration") == "short":
+            profiles = [(vid, profile) for vid, profile in profiles if profile["seconds"] < 240]
+        if params.get("order") == "viewCount":
+            profiles.sort(key=lambda hit: hit[1]["views"], reverse=True)
+        elif params.get("order") == "date":
+            profiles.sort(key=lambda hit: hit[1]["published_at"], reverse=True)
+        return profiles
+
+    def playlist_items(self, params):
+        """All playlistItems.list items of an uploads playlist ("UU<key>"), newest first."""
+        playlist_id = params.get("playlistId", "")
+        if not playlist_id.startswith("UU"):
+            return None
+        key = playlist_id[2:]
+        parts = params.get("part", "")
+        items = []
+        for n in range(self._channel_profile(key)["video_count"]):
+            video_id = f"{key}_{n}"
+            published_at = _rfc3339(self._video_profile(video_id)["published_at"])
+            item = {"kind": "youtube#playlistItem", "id": f"{playlist_id}.{n}"}
+            if "contentDetails" in parts:
+                item["contentDetails"] = {"videoId": video_id, "videoPublishedAt": published_at}
+            if "snippet" in parts:
+                item["snippet"] = {"publishedAt": published_at, "channelId": f"UC{key}", "playlistId": playlist_id, "resourceId": {"kind": "youtube#video", "videoId": video_id}}
+            items.append(item)
+        return items
+
+    def search(self, params):
+        """All search.list items for `params` (pagination is applied by the caller)."""
+        with_snippet = "snippet" in params.get("part", "")
+        if params.get("type") == "channel":
+            items = []
+            for key in self.channel_keys(params.get("q", "")):
+                item = {"kind": "youtube#searchResult", "id": {"kind": "youtube#channel", "channelId": f"UC{key}"}}
+                if with_snippet:
+                    item["snippet"] = {"channelId": f"UC{key}", "title": f"Channel {key}"}
+                items.append(item)
+            return items
+        items = []
+        for video_id, profile in self._video_hits(params):
+            item = {"kind": "youtube#searchResult", "id": {"kind": "youtube#video", "videoId": video_id}}
+            if with_snippet:
+                item["snippet"] = self._snippet(video_id, profile)
+            items.append(item)
+        return items
+
+
+class FakeYouTubeApi:
+    """Answers YouTube Data API calls from recorded responses or a SyntheticWorld, and counts them."""
+
+    def __init__(self, fixture_path=None, latency_ms=FAKE_LATENCY_MS, jitter_ms=FAKE_JITTER_MS, error_rate=FAKE_ERROR_RATE, error_status=FAKE_ERROR_STATUS, world=None):
+        self.world = world or SyntheticWorld()
+        self.recorded = {}
+        if fixture_path:
+            with open(fixture_path, encoding="utf-8") as f:
+                self.recorded = json.load(f).get("responses", {})
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._calls = {}
+        self._errors = 0
+        self._round_trips = 0
+        self._lock = threading.Lock()
+
+    def reset_stats(self):
+        with self._lock:
+            self._calls = {}
+            self._errors = 0
+            self._round_trips = 0
+
+    def stats(self):
+        """Calls per method, the quota units the real API would have charged, and injected errors."""
+        with self._lock:
+            return {
+                "calls": dict(self._calls),
+                "total_calls": sum(self._calls.values()),
+                "quota_units": sum(QUOTA_COSTS.get(method, 1) * calls for method, calls in self._calls.items()),
+                "round_trips": self._round_trips,
+                "errors": self._errors,
+            }
+
+    def _round_trip(self):
+        with self._lock:
+            self._round_trips += 1
+        if self.latency_ms or self.jitter_ms:
+            time.sleep(max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+
+    def respond_batch(self, content_type, body):
+        """Answers a multipart batch in one round trip; each call in it is counted and may fail on its own."""
+        self._round_trip()
+        parts = []
+        for part_id, request_line, _ in batch_parts(content_type, body):
+            status, content = self.respond(f"https://youtube.googleapis.com{request_line.split(' ')[1]}", round_trip=False)
+            parts.append(
+                f"--{BATCH_BOUNDARY}\r\nContent-Type: application/http\r\nContent-ID: <response-fake + {part_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(content)}\r\n"
+            )
+        return f"multipart/mixed; boundary={BATCH_BOUNDARY}", "".join(parts) + f"--{BATCH_BOUNDARY}--\r\n"
+
+    def respond(self, uri, round_trip=True):
+        """Returns (status, body dict) for a GET on the API."""
+        path = urlsplit(uri).path
+        resource = path[len(API_PATH_PREFIX):] if path.startswith(API_PATH_PREFIX) else ""
+        with self._lock:
+            method = f"youtube.{resource}.list"
+            self._calls[method] = self._calls.get(method, 0) + 1
+        if round_trip:
+            self._round_trip()
+        if self.error_rate and random.random() < self.error_rate:
+            with self._lock:
+                self._errors += 1
+            return api_error(self.error_status)
+
+        recorded = self.recorded.get(request_key(uri))
+        if recorded is not None:
+            return recorded["status"], recorded["body"]
+        params = dict(parse_qsl(urlsplit(uri).query, keep_blank_values=True))
+        if resource == "search":
+            return 200, self._page("youtube#searchListResponse", self.world.search(params), params)
+        if resource == "playlistItems":
+            items = self.world.playlist_items(params)
+            if items is None:
+                return api_error(404, "The playlist identified with the request's playlistId parameter cannot be found.")
+            return 200, self._page("youtube#playlistItemListResponse", items, params)
+        if resource in ("videos", "channels"):
+            lookup = self.world.video if resource == "videos" else self.world.channel
+            parts = set(params.get("part", "").split(","))
+            items = [item for item in (lookup(item_id, parts) for item_id in params.get("id", "").split(",") if item_id) if item]
+            return 200, {"kind": f"youtube#{resource[:-1]}ListResponse", "pageInfo": {"totalResults": len(items), "resultsPerPage": len(items)}, "items": items}
+        return api_error(404, f"The fake API doesn't implement {path}.")
+
+    def _page(self, kind, items, params):
+        max_results = min(50, int(params.get("maxResults", DEFAULT_MAX_RESULTS)))
+        token = params.get("pageToken", "")
+        offset = int(token[1:]) if token.startswith("p") and token[1:].isdigit() else 0
+        body = {
+            "kind": kind,
+            "pageInfo": {"totalResults": len(items), "resultsPerPage": max_results},
+            "items": items[offset:offset + max_results],
+        }
+        if offset + max_results < len(items):
+            body["nextPageToken"] = f"p{offset + max_results}"
+        return body
+
+
+class FakeYouTubeHttp(httplib2.Http):
+    """httplib2.Http answered by a FakeYouTubeApi instead of the network."""
+
+    def __init__(self, api=None, **kwargs):
+        super().__init__(**kwargs)
+        self.api = api or get_fake_api()
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=httplib2.DEFAULT_MAX_REDIRECTS, connection_type=None):
+        if method == "POST" and urlsplit(uri).path == BATCH_PATH:
+            content_type, content = self.api.respond_batch((headers or {}).get("content-type", ""), body)
+            return httplib2.Response({"status": 200, "content-type": content_type}), content.encode("utf-8")
+        status, content = self.api.respond(uri)
+        response = httplib2.Response({"status": status, "content-type": "application/json; charset=UTF-8"})
+        return response, json.dumps(content).encode("utf-8")
+
+
+class RecordingHttp:
+    """Wraps a real Http and saves every successful API response to a fixture file."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, http, path=RECORD_PATH):
+        self._http = http
+        self._path = path
+
+    def __getattr__(self, name):
+        return getattr(self._http, name)
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        response, content = self._http.request(uri, method, body=body, headers=headers, **kwargs)
+        if response.status != 200:
+            return response, content
+        path = urlsplit(uri).path
+        if path.startswith(API_PATH_PREFIX):
+            self._save({request_key(uri): {"status": 200, "body": json.loads(content)}})
+        elif method == "POST" and path == BATCH_PATH:
+            # Each call of a batch is saved like a single call, so replays work batched or not
+            request_lines = {part_id: line for part_id, line, _ in batch_parts((headers or {}).get("content-type", ""), body)}
+            self._save({
+                request_key(request_lines[part_id].split(" ")[1]): {"status": 200, "body": json.loads(part_body)}
+                for part_id, status_line, part_body in batch_parts(response["content-type"], content.decode("utf-8"))
+                if part_id in request_lines and status_line.split(" ")[1] == "200"
+            })
+        return response, content
+
+    def _save(self, entries):
+        if not entries:
+            return
+        with self._lock:
+            fixture = {"responses": {}}
+            if os.path.exists(self._path):
+                with open(self._path, encoding="utf-8") as f:
+                    fixture = json.load(f)
+            fixture["responses"].update(entries)
+            with open(f"{self._path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(fixture, f)
+            os.replace(f"{self._path}.tmp", self._path)
+
+
+_fake_api = None
+_fake_api_lock = threading.Lock()
+
+
+def get_fake_api():
+    """The process-wide fake API, configured from the environment on first use."""
+    global _fake_api
+    if _fake_api is None:
+        with _fake_api_lock:
+            if _fake_api is None:
+                _fake_api = FakeYouTubeApi(fixture_path=FAKE_API if FAKE_API not in ("", "1", "synthetic") else None)
+    return _fake_api
@@ -0,0 +1,78 @@
+# src/services/harvester.py
+
+import os
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from src.routes.viral_search import SEARCH_PAGES_PER_NICHE, search_youtube_shorts
+from src.services.niche_warehouse import NICHE_WAREHOUSE_MAX_AGE_SECONDS, covered_niches, most_requested_niches, normalize_keyword
+from src.services.search_planner import UNBOUNDED_MAX_SUBS, UNBOUNDED_MAX_CHANNEL_VIDEOS, plan_viral_search
+from src.services.quota import QUOTA_FREE_GLOBAL_SHARE, QuotaLedger, use_ledger, units_used, global_daily_quota
+from src.services.key_pool import key_pool
+from src.services.job_lock import acquire_lock, release_lock
+
+# Off-peak crawl of popular niches. Each niche is searched with loose filters, so the
+# video/channel stores and the niche warehouse it fills can answer most interactive
+# searches of that niche (local-first) without calling YouTube.
+
+HARVEST_NICHES = [n.strip() for n in os.getenv(
+    "HARVEST_NICHES", "fitness,cooking,gaming,personal finance,travel,beauty,tech,pets,comedy,motivation"
+).split(",") if n.strip()]
+HARVEST_TOP_REQUESTED = int(os.getenv("HARVEST_TOP_REQUESTED", "20"))  # Most searched niches, refreshed first
+HARVEST_QUOTA_BUDGET = int(os.getenv("HARVEST_QUOTA_BUDGET", "3000"))  # Units per quota day
+HARVEST_HOURS = os.getenv("HARVEST_HOURS", "0-5")  # Cron hours, Pacific time (quota day)
+HARVEST_INTERVAL_MINUTES = int(os.getenv("HARVEST_INTERVAL_MINUTES", "30"))
+HARVEST_PUBLISHED_DAYS = int(os.getenv("HARVEST_PUBLISHED_DAYS", "30"))
+HARVEST_MIN_VIEWS = int(os.getenv("HARVEST_MIN_VIEWS", "10000"))
+# Niches harvested (or searched interactively) more recently than this are skipped
+HARVEST_REFRESH_AFTER_SECONDS = int(os.getenv("HARVEST_REFRESH_AFTER_SECONDS", str(NICHE_WAREHOUSE_MAX_AGE_SECONDS // 2)))
+HARVEST_SCOPE = "harvester"
+HARVEST_LOCK_NAME = "niche-harvester"
+HARVEST_LOCK_TTL_SECONDS = 1800
+
+
+def harvest_candidates():
+    """Most requested niches first, then the configured ones, without duplicates."""
+    candidates = {}
+    for niche in most_requested_niches(HARVEST_TOP_REQUESTED) + HARVEST_NICHES:
+        candidates.setdefault(normalize_keyword(niche), niche)
+    return list(candidates.values())
+
+
+def harvest_niches():
+    """Refreshes stale popular niches until the harvest budget is spent. Runs in an app context.
+
+    Returns the list of niches harvested (empty when another worker holds the lock).
+    """
+    if not key_pool.configured:
+        current_app.logger.warning("Niche harvester skipped: YOUTUBE_API_KEY not configured.")
+        return []
+    if not acquire_lock(HARVEST_LOCK_NAME, HARVEST_LOCK_TTL_SECONDS):
+        current_app.logger.info("Niche harvester already running on another worker.")
+        return []
+
+    harvested = []
+    try:
+        video_cutoff_date = datetime.now(timezone.utc) - timedelta(days=HARVEST_PUBLISHED_DAYS)
+        ledger = QuotaLedger(HARVEST_SCOPE, "system")
+        # Interactive users keep at least the share of the quota non-subscribers can't touch
+        global_limit = int(global_daily_quota() * QUOTA_FREE_GLOBAL_SHARE)
+        with use_ledger(ledger):
+            for niche in harvest_candidates():
+                if covered_niches([niche], video_cutoff_date, HARVEST_MIN_VIEWS, UNBOUNDED_MAX_SUBS, UNBOUNDED_MAX_CHANNEL_VIDEOS, max_age_seconds=HARVEST_REFRESH_AFTER_SECONDS):
+                    continue
+                plan = plan_viral_search(1, SEARCH_PAGES_PER_NICHE, video_cutoff_date, HARVEST_MIN_VIEWS, UNBOUNDED_MAX_SUBS, UNBOUNDED_MAX_CHANNEL_VIDEOS)
+                spent = units_used(HARVEST_SCOPE)
+                if spent + plan.estimated_quota_units > HARVEST_QUOTA_BUDGET or units_used("global") + plan.estimated_quota_units > global_limit:
+                    current_app.logger.info(f"Niche harvester stopping: budget reached ({spent}/{HARVEST_QUOTA_BUDGET} units today).")
+                    break
+                videos = search_youtube_shorts([niche], video_cutoff_date, HARVEST_MIN_VIEWS, UNBOUNDED_MAX_SUBS, UNBOUNDED_MAX_CHANNEL_VIDEOS, plan=plan, local_first=False)
+                ledger.flush()
+                harvested.append(niche)
+                current_app.logger.info(f"Niche harvester: '{niche}' refreshed ({len(videos)} videos, {units_used(HARVEST_SCOPE)} units today).")
+                acquire_lock(HARVEST_LOCK_NAME, HARVEST_LOCK_TTL_SECONDS)  # Renews the lease
+    except Exception as e:
+        current_app.logger.error(f"Niche harvester failed: {e}", exc_info=True)
+    finally:
+        release_lock(HARVEST_LOCK_NAME)
+    current_app.logger.info(f"Niche harvester done: {len(harvested)} niches refreshed.")
+    return harvested
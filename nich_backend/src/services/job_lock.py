@@ -0,0 +1,36 @@
+# src/services/job_lock.py
+
+import os
+import socket
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.scheduler_lock import SchedulerLock
+
+# Every gunicorn worker (and every dyno) starts its own scheduler; the lease in the
+# database makes sure a scheduled job runs on only one of them at a time.
+LOCK_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lock(name, ttl_seconds, owner=LOCK_OWNER):
+    """Takes (or renews) the lease `name`. Returns False when another live owner holds it."""
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+    try:
+        db.session.add(SchedulerLock(name=name, owner=owner, expires_at=expires_at, acquired_at=now))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+    updated = SchedulerLock.query.filter(
+        SchedulerLock.name == name,
+        or_(SchedulerLock.expires_at < now, SchedulerLock.owner == owner),
+    ).update({"owner": owner, "expires_at": expires_at}, synchronize_session=False)
+    db.session.commit()
+    return updated == 1
+
+
+def release_lock(name, owner=LOCK_OWNER):
+    SchedulerLock.query.filter_by(name=name, owner=owner).delete(synchronize_session=False)
+    db.session.commit()
@@ -0,0 +1,122 @@
+# src/services/key_pool.py
+
+import os
+import time
+import hashlib
+import threading
+from datetime import datetime, time as day_time, timedelta
+from flask import current_app, has_app_context
+from src.services.quota import YOUTUBE_DAILY_QUOTA, QUOTA_TIMEZONE, key_scope, units_used
+
+# Pool of YouTube API keys (YOUTUBE_API_KEYS, comma separated, plus YOUTUBE_API_KEY).
+# Each key must belong to its own Google Cloud project, since the quota is per project.
+#
+# Every API call goes out with the available key that has the most headroom (daily quota
+# minus the units booked under its QuotaUsage scope today). A key that answers
+# quotaExceeded is set aside until the next quota reset (midnight Pacific time). Keys are
+# identified by a short hash, never by their value, in logs, usage rows and endpoints.
+
+KEY_USAGE_REFRESH_SECONDS = int(os.getenv("KEY_USAGE_REFRESH_SECONDS", "60"))  # Re-read of the booked usage
+
+
+def key_label(api_key):
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:8]
+
+
+def next_quota_reset(now=None):
+    now = (now or datetime.now(QUOTA_TIMEZONE)).astimezone(QUOTA_TIMEZONE)
+    return datetime.combine(now.date() + timedelta(days=1), day_time.min, tzinfo=QUOTA_TIMEZONE)
+
+
+class ApiKey:
+    __slots__ = ("label", "value", "used_units", "exhausted_until")
+
+    def __init__(self, value):
+        self.label = key_label(value)
+        self.value = value
+        self.used_units = 0  # Booked today, plus what this process sent since the last refresh
+        self.exhausted_until = None
+
+    def is_available(self, now):
+        return self.exhausted_until is None or self.exhausted_until <= now
+
+    @property
+    def headroom(self):
+        return YOUTUBE_DAILY_QUOTA - self.used_units
+
+
+class KeyPool:
+    """Process-wide set of API keys, loaded from the environment on first use."""
+
+    def __init__(self):
+        self._keys = None
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def keys(self):
+        if self._keys is None:
+            with self._lock:
+                if self._keys is None:
+                    values = [k.strip() for k in os.getenv("YOUTUBE_API_KEYS", "").split(",") if k.strip()]
+                    values.append(os.getenv("YOUTUBE_API_KEY", "").strip())
+                    self._keys = [ApiKey(value) for value in dict.fromkeys(v for v in values if v)]
+        return self._keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def configured(self):
+        return bool(self.keys)
+
+    def refresh_usage(self, force=False):
+        """Re-reads each key's booked usage for today (needs an app context)."""
+        if not has_app_context() or (not force and time.monotonic() - self._refreshed_at < KEY_USAGE_REFRESH_SECONDS):
+            return
+        self._refreshed_at = time.monotonic()
+        try:
+            booked = {key.label: units_used(key_scope(key.label)) for key in self.keys}
+        except Exception as e:
+            current_app.logger.error(f"Failed to read API key usage: {e}")
+            return
+        with self._lock:
+            for key in self.keys:
+                key.used_units = booked[key.label]
+
+    def choose(self, exclude=()):
+        """The available key with the most headroom, or None when every key is exhausted."""
+        self.refresh_usage()
+        now = datetime.now(QUOTA_TIMEZONE)
+        with self._lock:
+            candidates = [key for key in self.keys if key.label not in exclude and key.is_available(now)]
+            return max(candidates, key=lambda key: key.headroom, default=None)
+
+    def record(self, key, units):
+        with self._lock:
+            key.used_units += units
+
+    def mark_exhausted(self, key):
+        with self._lock:
+            key.exhausted_until = next_quota_reset()
+        if has_app_context():
+            current_app.logger.warning(f"YouTube API key {key.label} exhausted until {key.exhausted_until.isoformat()}.")
+
+    def status(self):
+        self.refresh_usage(force=True)
+        now = datetime.now(QUOTA_TIMEZONE)
+        with self._lock:
+            return [
+                {
+                    "key": key.label,
+                    "used_units": key.used_units,
+                    "daily_quota": YOUTUBE_DAILY_QUOTA,
+                    "headroom_units": max(0, key.headroom),
+                    "available": key.is_available(now),
+                    "exhausted_until": key.exhausted_until.isoformat() if not key.is_available(now) else None,
+                }
+                for key in self.keys
+            ]
+
+
+key_pool = KeyPool()
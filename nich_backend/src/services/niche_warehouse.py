@@ -0,0 +1,212 @@
+# src/services/niche_warehouse.py
+
+import os
+from datetime import datetime, timedelta
+from flask import current_app
+from src.models.user import db
+from src.models.niche_data import NicheData, NicheCoverage, NicheDemand
+from src.models.records import ChannelRecord
+from src.services.db_upsert import upsert_rows
+
+# Every video the searches fetch is kept in NicheData, keyed by niche. When a niche was
+# searched recently with filters at least as loose as the current ones, the viral search
+# answers it from the table ("local-first") and only calls YouTube for the other niches.
+NICHE_WAREHOUSE_MAX_AGE_SECONDS = int(os.getenv("NICHE_WAREHOUSE_MAX_AGE_SECONDS", "21600"))
+SEARCH_LOCAL_FIRST = os.getenv("SEARCH_LOCAL_FIRST", "true").lower() in ("1", "true", "yes")
+SOURCE_SHORTS = "shorts"
+SOURCE_NICHES = "niches"
+
+
+def normalize_keyword(niche):
+    return niche.strip().lower()
+
+
+def _naive_utc(dt):
+    # Stored as naive UTC, like the other DateTime columns
+    return dt.replace(tzinfo=None) if dt.tzinfo is None else (dt - dt.utcoffset()).replace(tzinfo=None)
+
+
+def _parse_published_at(date_string):
+    if not date_string:
+        return None
+    try:
+        return _naive_utc(datetime.fromisoformat(date_string.replace("Z", "+00:00")))
+    except ValueError:
+        return None
+
+
+def _views_per_subscriber(view_count, subscriber_count):
+    if subscriber_count and view_count is not None:
+        return round(view_count / subscriber_count, 2)
+    return 0.0
+
+
+def short_row(video, channel, collected_at):
+    """NicheData column dict for a (normalized video, ChannelRecord) pair of the Shorts pipeline."""
+    return {
+        "keyword": normalize_keyword(video["niche"]),
+        "source": SOURCE_SHORTS,
+        "channel_id": video["channelId"],
+        "video_id": video["id"],
+        "channel_name": channel.title,
+        "video_title": video.get("title"),
+        "thumbnail_url": video.get("thumbnailUrl"),
+        "subscriber_count": channel.subscriberCount,
+        "channel_video_count": channel.videoCount,
+        "view_count": video.get("viewCount"),
+        "like_count": video.get("likeCount"),
+        "comment_count": video.get("commentCount"),
+        "views_per_subscriber": _views_per_subscriber(video.get("viewCount"), channel.subscriberCount),
+        "video_published_at": _parse_published_at(video.get("publishedAt")),
+        "data_collected_at": collected_at,
+    }
+
+
+def store_rows(rows):
+    """Upserts NicheData rows; a failure is logged and never breaks the search that produced them."""
+    try:
+        for i in range(0, len(rows), 500):
+            upsert_rows(NicheData, rows[i:i + 500], ["keyword", "source", "video_id"])
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Failed to store {len(rows)} videos in the niche warehouse: {e}")
+
+
+def store_short_search(niches, pairs, started_at, video_cutoff_date, min_views, max_subs=None, max_channel_videos_total=None):
+    """Stores the (video, channel) pairs a Shorts search fetched and marks `niches` as covered.
+
+    `niches` must only hold the niches whose whole pipeline (search, videos.list and
+    channels.list) succeeded; videos of the other niches are stored without coverage.
+
+    The bounds are the filters the pairs were already pruned with (None = not pruned), so
+    later searches only reuse the coverage when their filters are as strict or stricter.
+    """
+    collected_at = datetime.utcnow()
+    rows = [short_row(video, channel, collected_at) for video, channel in pairs if channel]
+    store_rows(rows)
+    counts = {}
+    for row in rows:
+        counts[row["keyword"]] = counts.get(row["keyword"], 0) + 1
+    coverage = [
+        {
+            "keyword": normalize_keyword(niche),
+            "source": SOURCE_SHORTS,
+            "started_at": started_at,
+            "searched_at": collected_at,
+            "published_after": _naive_utc(video_cutoff_date),
+            "min_views": min_views,
+            "max_subs": max_subs,
+            "max_channel_videos_total": max_channel_videos_total,
+            "video_count": counts.get(normalize_keyword(niche), 0),
+        }
+        for niche in dict.fromkeys(niches)
+    ]
+    try:
+        upsert_rows(NicheCoverage, coverage, ["keyword", "source"])
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Failed to record niche warehouse coverage for {niches}: {e}")
+    current_app.logger.info(f"Niche warehouse: stored {len(rows)} videos for {len(coverage)} niches.")
+
+
+def store_niche_videos(keyword, channel, videos):
+    """Stores the uploads find_niches fetched for one channel (a ChannelRecord) under `keyword`."""
+    collected_at = datetime.utcnow()
+    store_rows([
+        {
+            "keyword": normalize_keyword(keyword),
+            "source": SOURCE_NICHES,
+            "channel_id": channel.channelId,
+            "video_id": video["videoId"],
+            "channel_name": channel.title,
+            "video_title": video.get("title"),
+            "thumbnail_url": video.get("thumbnail"),
+            "subscriber_count": channel.subscriberCount,
+            "channel_video_count": channel.videoCount,
+            "view_count": video.get("viewCount"),
+            "views_per_subscriber": _views_per_subscriber(video.get("viewCount"), channel.subscriberCount),
+            "video_published_at": _parse_published_at(video.get("publishedAt")),
+            "data_collected_at": collected_at,
+        }
+        for video in videos if video.get("videoId")
+    ])
+
+
+def record_niche_requests(niches):
+    """Counts one more request for each niche (drives the harvester's refresh order)."""
+    now = datetime.utcnow()
+    rows = [{"keyword": keyword, "request_count": 1, "last_requested_at": now} for keyword in dict.fromkeys(normalize_keyword(n) for n in niches)]
+    if not rows:
+        return
+    try:
+        upsert_rows(NicheDemand, rows, ["keyword"], update_columns=["last_requested_at"], increment_columns=["request_count"])
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Failed to record niche requests {niches}: {e}")
+
+
+def most_requested_niches(limit):
+    return [row.keyword for row in NicheDemand.query.order_by(NicheDemand.request_count.desc(), NicheDemand.last_requested_at.desc()).limit(limit)]
+
+
+def _covers(coverage_bound, requested):
+    return coverage_bound is None or requested <= coverage_bound
+
+
+def covered_niches(niches, video_cutoff_date, min_views, max_subs, max_channel_videos_total, max_age_seconds=None):
+    """Returns {niche: coverage start} for the niches the warehouse can answer with these filters."""
+    max_age_seconds = NICHE_WAREHOUSE_MAX_AGE_SECONDS if max_age_seconds is None else max_age_seconds
+    fresh_after = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    keywords = {normalize_keyword(niche): niche for niche in niches}
+    try:
+        rows = NicheCoverage.query.filter(
+            NicheCoverage.keyword.in_(list(keywords)),
+            NicheCoverage.source == SOURCE_SHORTS,
+            NicheCoverage.searched_at >= fresh_after,
+        ).all()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Failed to read niche warehouse coverage: {e}")
+        return {}
+    cutoff = _naive_utc(video_cutoff_date)
+    return {
+        keywords[row.keyword]: row.started_at
+        for row in rows
+        if row.published_after <= cutoff
+        and row.min_views <= min_views
+        and _covers(row.max_subs, max_subs) and _covers(row.max_channel_videos_total, max_channel_videos_total)
+    }
+
+
+def iter_local_shorts(covered, video_cutoff_date, min_views, max_subs, max_channel_videos_total):
+    """Yields (video, channel) pairs, shaped like the Shorts pipeline's, from the warehouse.
+
+    Uses the (keyword, video_published_at) index; only rows written by each niche's
+    covering search (or later) are read.
+    """
+    cutoff = _naive_utc(video_cutoff_date)
+    for niche, started_at in covered.items():
+        rows = NicheData.query.filter(
+            NicheData.keyword == normalize_keyword(niche),
+            NicheData.video_published_at >= cutoff,
+            NicheData.source == SOURCE_SHORTS,
+            NicheData.view_count >= min_views,
+            db.func.coalesce(NicheData.subscriber_count, 0) <= max_subs,
+            db.func.coalesce(NicheData.channel_video_count, 0) <= max_channel_videos_total,
+            NicheData.data_collected_at >= started_at,
+        ).all()
+        current_app.logger.info(f"Niche warehouse: {len(rows)} videos for '{niche}' served locally.")
+        for row in rows:
+            video = {
+                "id": row.video_id,
+                "niche": niche,
+                "title": row.video_title,
+                "thumbnailUrl": row.thumbnail_url,
+                "publishedAt": row.video_published_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "channelId": row.channel_id,
+                "viewCount": row.view_count or 0,
+                "likeCount": row.like_count or 0,
+                "commentCount": row.comment_count or 0,
+            }
+            channel = ChannelRecord(row.channel_id, row.channel_name, row.subscriber_count, row.channel_video_count, False, None, None)
+            yield video, channel
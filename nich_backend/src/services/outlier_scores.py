@@ -0,0 +1,86 @@
+# src/services/outlier_scores.py
+
+import numpy as np
+
+# Channel-baseline scores of a set of videos, computed in one vectorized pass.
+#
+# Views per subscriber says little about whether a video broke out: a channel with few,
+# loyal subscribers looks viral on every upload. Here each video is compared with its own
+# channel instead: the median views and median absolute deviation (MAD) of the channel's
+# reference videos are the baseline, and the ratio to their median views per day since
+# publication corrects for videos that simply had more time. The reference is every video
+# fetched for the channel (see video_store.channel_view_history), not just the ones a
+# search's filters kept, which would bias the baseline upwards; channels without one fall
+# back to their videos in the set. Channels are coded with one dict pass and the medians
+# come from one lexsort per statistic, so thousands of videos cost a few array operations
+# rather than a Python loop per video.
+
+MAD_TO_SIGMA = 1.4826  # Scales a MAD to a standard deviation for normally distributed data
+MIN_AGE_DAYS = 1 / 24  # Videos younger than an hour count as an hour old
+MIN_BASELINE = 1.0  # Floor of the baselines (views, views per day), so idle channels don't divide by zero
+
+SCORE_KEYS = ("outlier_ratio", "outlier_score", "velocity")
+
+
+def grouped_medians(codes, values, group_count):
+    """Median of `values` per group code (NaN for empty groups), with a single lexsort."""
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    counts = np.bincount(codes, minlength=group_count)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    medians = np.full(group_count, np.nan)
+    present = counts > 0
+    low = starts[present] + (counts[present] - 1) // 2
+    high = starts[present] + counts[present] // 2
+    medians[present] = (sorted_values[low] + sorted_values[high]) / 2
+    return medians, counts
+
+
+def score_videos(channel_keys, views, published_at, now, reference=None):
+    """Returns {score key: float array} for the videos, each against its channel's baseline.
+
+    `channel_keys` identifies each video's channel (any hashable values), `views`
+    are the view counts and `published_at` POSIX timestamps (NaN when unknown), at `now`.
+    `reference` is an optional (channel_keys, views, published_at) triple of the videos
+    the baselines are computed from; channels absent from it use their own videos here.
+
+    - outlier_ratio: views / the channel's median views (1.0 = a typical video).
+    - outlier_score: robust z-score, (views - median) / (MAD_TO_SIGMA * MAD); 0.0 when
+      the channel has a single reference video or no spread.
+    - velocity: views per day since publication / the channel's median views per day;
+      NaN when the publish time is unknown.
+    """
+    views = np.asarray(views, dtype=float)
+    published_at = np.asarray(published_at, dtype=float)
+    if views.size == 0:
+        return {key: np.empty(0) for key in SCORE_KEYS}
+    reference_keys, reference_views, reference_published = reference or ((), (), ())
+    reference_views = np.asarray(reference_views, dtype=float)
+    reference_published = np.asarray(reference_published, dtype=float)
+    channel_codes = {}
+    reference_codes = np.fromiter((channel_codes.setdefault(key, len(channel_codes)) for key in reference_keys), dtype=np.intp, count=reference_views.size)
+    referenced = len(channel_codes)
+    codes = np.fromiter((channel_codes.setdefault(key, len(channel_codes)) for key in channel_keys), dtype=np.intp, count=views.size)
+    group_count = len(channel_codes)
+    # Channels without reference videos are their own reference
+    own = codes >= referenced
+    reference_codes = np.concatenate((reference_codes, codes[own]))
+    reference_views = np.concatenate((reference_views, views[own]))
+    reference_published = np.concatenate((reference_published, published_at[own]))
+
+    median_views, _ = grouped_medians(reference_codes, reference_views, group_count)
+    mad, _ = grouped_medians(reference_codes, np.abs(reference_views - median_views[reference_codes]), group_count)
+    baseline = median_views[codes]
+    scale = MAD_TO_SIGMA * mad[codes]
+
+    reference_per_day = reference_views / np.maximum((now - reference_published) / 86400.0, MIN_AGE_DAYS)
+    known = np.isfinite(reference_per_day)
+    median_per_day, _ = grouped_medians(reference_codes[known], reference_per_day[known], group_count)
+    views_per_day = views / np.maximum((now - published_at) / 86400.0, MIN_AGE_DAYS)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "outlier_ratio": views / np.maximum(baseline, MIN_BASELINE),
+            "outlier_score": np.where(scale > 0, (views - baseline) / scale, 0.0),
+            "velocity": views_per_day / np.maximum(median_per_day[codes], MIN_BASELINE),
+        }
@@ -0,0 +1,342 @@
+# src/services/quota.py
+
+import os
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from zoneinfo import ZoneInfo
+
+import jwt
+from flask import request, jsonify, make_response, current_app
+from googleapiclient.http import HttpRequest
+from sqlalchemy import func
+
+from src.models.user import User, db
+from src.models.quota_usage import QuotaUsage
+from src.routes.auth import JWT_SECRET
+from src.services.search_planner import QUOTA_COSTS
+
+# Daily quota of each API key (one Google Cloud project per key, see key_pool), and how
+# much of it users may spend per tier. Non-subscribers can only use part of the global
+# quota, so paying users keep being served once the day gets busy.
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+QUOTA_FREE_GLOBAL_SHARE = float(os.getenv("QUOTA_FREE_GLOBAL_SHARE", "0.6"))
+TIER_BUDGETS = {
+    "anonymous": int(os.getenv("QUOTA_BUDGET_ANONYMOUS", "1000")),
+    "free": int(os.getenv("QUOTA_BUDGET_FREE", "2000")),
+    "subscribed": int(os.getenv("QUOTA_BUDGET_SUBSCRIBED", "5000")),
+}
+ACTIVE_SUBSCRIPTION_STATUSES = ("active", "trialing")
+
+# YouTube resets quotas at midnight Pacific Time
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+_current_ledger = contextvars.ContextVar("quota_ledger", default=None)
+
+
+def quota_day(now=None):
+    return (now or datetime.now(QUOTA_TIMEZONE)).astimezone(QUOTA_TIMEZONE).date()
+
+
+def key_scope(key_label):
+    """QuotaUsage scope of one pooled API key."""
+    return f"key:{key_label}"
+
+
+def global_daily_quota():
+    """Daily quota of all the pooled API keys together."""
+    from src.services.key_pool import key_pool  # key_pool reads its usage through this module
+    return YOUTUBE_DAILY_QUOTA * max(1, len(key_pool))
+
+
+class QuotaBudgetExceeded(Exception):
+    """Raised instead of making an API call that would take a request past its caller's budget."""
+
+
+class QuotaLedger:
+    """Per-request tally of YouTube API calls, flushed to QuotaUsage when the request ends.
+
+    With `limit_units` (what the caller had left when the request started), a call that
+    would go past it raises QuotaBudgetExceeded before it is made, so one long search
+    can't overrun the budget that was only checked up front.
+    """
+
+    def __init__(self, scope, tier, limit_units=None):
+        self.scope = scope
+        self.tier = tier
+        self.limit_units = limit_units
+        self._usage = {}  # method -> [calls, units]
+        self._key_usage = {}  # key label -> {method -> [calls, units]}
+        self._flushed_units = 0
+        self._spent_units = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def record(self, method_id, key_label=None):
+        units = QUOTA_COSTS.get(method_id, 1)
+        with self._lock:
+            if self.limit_units is not None and self._spent_units + units > self.limit_units:
+                raise QuotaBudgetExceeded(f"{method_id} ({units} units) would exceed the {self.limit_units} units left to {self.scope}")
+            self._spent_units += units
+            usages = [self._usage]
+            if key_label:
+                usages.append(self._key_usage.setdefault(key_label, {}))
+            for usage in usages:
+                counters = usage.setdefault(method_id, [0, 0])
+                counters[0] += 1
+                counters[1] += units
+            closed = self._closed
+        if closed:
+            self.flush()  # A worker still running after the request: booked right away
+        return units
+
+    @property
+    def total_units(self):
+        with self._lock:
+            return sum(units for _, units in self._usage.values())
+
+    def to_dict(self):
+        with self._lock:
+            return {method: {"calls": calls, "units": units} for method, (calls, units) in self._usage.items()}
+
+    def flush(self):
+        with self._lock:
+            usage, self._usage = self._usage, {}
+            key_usage, self._key_usage = self._key_usage, {}
+        if usage:
+            record_usage([self.scope, "global"], usage)
+            self._flushed_units += sum(units for _, units in usage.values())
+        for key_label, usage in key_usage.items():
+            record_usage([key_scope(key_label)], usage)
+
+    def close(self):
+        """Flushes the tally; calls recorded afterwards are flushed one by one as they happen."""
+        with self._lock:
+            self._closed = True
+        self.flush()
+
+    @property
+    def flushed_units(self):
+        return self._flushed_units
+
+
+def record_usage(scopes, usage, day=None):
+    """Adds {method: [calls, units]} to today's counters of every scope in one transaction."""
+    day = day or quota_day()
+    rows = [
+        {"day": day, "scope": scope, "method": method, "calls": calls, "units": units, "updated_at": datetime.utcnow()}
+        for scope in scopes
+        for method, (calls, units) in usage.items()
+    ]
+    try:
+        dialect = db.engine.dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            statement = insert(QuotaUsage.__table__).values(rows)
+            statement = statement.on_conflict_do_update(
+                index_elements=["day", "scope", "method"],
+                set_={
+                    "calls": QuotaUsage.__table__.c.calls + statement.excluded.calls,
+                    "units": QuotaUsage.__table__.c.units + statement.excluded.units,
+                    "updated_at": statement.excluded.updated_at,
+                },
+            )
+            db.session.execute(statement)
+        else:
+            for row in rows:
+                existing = QuotaUsage.query.filter_by(day=row["day"], scope=row["scope"], method=row["method"]).with_for_update().first()
+                if existing:
+                    existing.calls += row["calls"]
+                    existing.units += row["units"]
+                else:
+                    db.session.add(QuotaUsage(**row))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Failed to record YouTube quota usage {usage} for {scopes}: {e}")
+
+
+def units_used(scope, day=None):
+    day = day or quota_day()
+    total = db.session.query(func.coalesce(func.sum(QuotaUsage.units), 0)).filter(
+        QuotaUsage.day == day, QuotaUsage.scope == scope
+    ).scalar()
+    return int(total or 0)
+
+
+def usage_breakdown(scope, day=None):
+    day = day or quota_day()
+    rows = QuotaUsage.query.filter_by(day=day, scope=scope).all()
+    return {row.method: {"calls": row.calls, "units": row.units} for row in rows}
+
+
+def current_ledger():
+    return _current_ledger.get()
+
+
+@contextmanager
+def use_ledger(ledger):
+    """Meters the API calls made inside the block (e.g. a background job) on `ledger`, flushing it at the end."""
+    token = _current_ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _current_ledger.reset(token)
+        ledger.flush()
+
+
+def with_ledger(ledger):
+    """Decorator making `ledger` the current one while the function runs, on whatever thread."""
+    def decorator(fn):
+        @wraps(fn)
+        def run(*args, **kwargs):
+            token = _current_ledger.set(ledger)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _current_ledger.reset(token)
+        return run
+    return decorator
+
+
+def with_current_ledger(fn):
+    """Wraps `fn` so the calling thread's ledger is also used on the worker thread running it."""
+    return with_ledger(_current_ledger.get())(fn)
+
+
+def charge_call(method_id, key_label=None):
+    """Books one API call on the current ledger, or right away outside metered requests."""
+    ledger = _current_ledger.get()
+    if ledger is not None:
+        ledger.record(method_id, key_label)
+    else:
+        # Calls outside a metered request (background jobs) are booked right away
+        scopes = ["system", "global"] + ([key_scope(key_label)] if key_label else [])
+        record_usage(scopes, {method_id: [1, QUOTA_COSTS.get(method_id, 1)]})
+
+
+class AccountedHttpRequest(HttpRequest):
+    """googleapiclient request that charges its quota cost before going out.
+
+    Passed as `requestBuilder` to build(), so every search/videos/channels call made
+    through the client is counted, whatever code path issued it (calls sent in a batch
+    are charged by youtube_client.execute_batch instead). `key_label` is the
+    pooled API key the call goes out with (set by youtube_client.PooledHttpRequest).
+    A call is charged once, however many times it is sent (another key after
+    quotaExceeded, retries of transient failures).
+    """
+
+    key_label = None
+    charged = False
+
+    def charge(self):
+        if not self.charged:
+            charge_call(self.methodId, self.key_label)
+            self.charged = True
+
+    def execute(self, *args, **kwargs):
+        self.charge()
+        return super().execute(*args, **kwargs)
+
+
+def resolve_principal():
+    """Returns (scope, tier, user) for the caller; the bearer token is optional on search endpoints."""
+    auth_header = request.headers.get("Authorization", "")
+    if auth_header.startswith("Bearer "):
+        try:
+            data = jwt.decode(auth_header.split(" ")[1], JWT_SECRET, algorithms=["HS256"])
+            user = db.session.get(User, int(data["sub"]))
+            if user:
+                subscribed = bool(user.is_subscribed) or user.subscription_status in ACTIVE_SUBSCRIPTION_STATUSES
+                return f"user:{user.id}", "subscribed" if subscribed else "free", user
+        except jwt.InvalidTokenError:
+            pass
+    # remote_addr is the hop the trusted proxy appended (see ProxyFix in src/main.py), never a client-set header
+    return f"anon:{request.remote_addr or 'unknown'}", "anonymous", None
+
+
+def budget_status(scope, tier):
+    """Today's usage and limits for a caller."""
+    daily_quota = global_daily_quota()
+    global_limit = daily_quota if tier == "subscribed" else int(daily_quota * QUOTA_FREE_GLOBAL_SHARE)
+    used = units_used(scope)
+    global_used = units_used("global")
+    budget = TIER_BUDGETS.get(tier, TIER_BUDGETS["anonymous"])
+    return {
+        "day": quota_day().isoformat(),
+        "scope": scope,
+        "tier": tier,
+        "used_units": used,
+        "budget_units": budget,
+        "remaining_units": max(0, budget - used),
+        "global_used_units": global_used,
+        "global_limit_units": global_limit,
+        "global_remaining_units": max(0, global_limit - global_used),
+    }
+
+
+def remaining_budget(status):
+    """Units a caller may still spend today: the lower of its own and its tier's global allowance."""
+    return min(status["remaining_units"], status["global_remaining_units"])
+
+
+def budget_exhausted_response(scope, tier, status):
+    current_app.logger.warning(f"Quota budget exhausted for {scope} ({tier}): {status}")
+    return jsonify({"error": "Daily YouTube quota budget exhausted. Try again tomorrow or upgrade your plan.", "quota": status}), 429
+
+
+def check_budget():
+    """Resolves the caller and its budget. Returns (scope, tier, status, error_response)."""
+    scope, tier, _ = resolve_principal()
+    status = budget_status(scope, tier)
+    if remaining_budget(status) <= 0:
+        return scope, tier, status, budget_exhausted_response(scope, tier, status)
+    return scope, tier, status, None
+
+
+def budget_error():
+    """The 429 response when the caller of the current quota_metered request has no budget left, else None.
+
+    Views call it right before their first YouTube call, so what they serve without one
+    (snapshot pages, 304 revalidations) stays available to callers who spent their budget.
+    """
+    ledger = _current_ledger.get()
+    if ledger is None or ledger.limit_units is None or ledger.limit_units > 0:
+        return None
+    return budget_exhausted_response(ledger.scope, ledger.tier, budget_status(ledger.scope, ledger.tier))
+
+
+def quota_metered(view):
+    """Decorator for endpoints that call the YouTube API.
+
+    Meters every API call the view makes against what the caller has left today (its
+    tier budget, capped by the share of the global daily quota the tier may use): calls
+    past it fail with QuotaBudgetExceeded. The view decides when a request needs the API
+    and rejects it up front with budget_error(). The totals are flushed to QuotaUsage
+    when the view returns.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        scope, tier, _ = resolve_principal()
+        status = budget_status(scope, tier)
+        ledger = QuotaLedger(scope, tier, limit_units=remaining_budget(status))
+        token = _current_ledger.set(ledger)
+        try:
+            response = make_response(view(*args, **kwargs))
+        finally:
+            _current_ledger.reset(token)
+            ledger.flush()
+        if response.is_streamed:
+            # Streaming views keep calling the API after returning; book the rest at the end
+            response.call_on_close(ledger.flush)
+            return response
+        ledger.close()
+        response.headers["X-Quota-Units"] = str(ledger.flushed_units)
+        response.headers["X-Quota-Remaining"] = str(max(0, remaining_budget(status) - ledger.flushed_units))
+        return response
+    return wrapper
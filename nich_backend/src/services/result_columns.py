@@ -0,0 +1,178 @@
+# src/services/result_columns.py
+
+import sys
+import time
+import dataclasses
+from datetime import datetime, timezone
+import numpy as np
+from src.services.outlier_scores import score_videos, SCORE_KEYS
+
+# Search results are kept column by column instead of one dict per video: counts live in
+# NumPy arrays, repeated strings (niche, channel, platform) are interned, and only the rows
+# of the page being returned are rebuilt. Rows may be dicts (stored job results) or slotted
+# records (src.models.records), and come back as the same type; records are rebuilt straight
+# from the column values. Pages are cut with a partial top-k selection on the requested
+# sort key instead of sorting the whole result set.
+# The channel-baseline keys (outlier_ratio, outlier_score, velocity) are scored for all
+# rows at once by src.services.outlier_scores, grouping the rows by the channel ID in their
+# channel link, against the channel history the caller passes in (`channel_history`).
+
+COUNT_FIELDS = ("viewCount", "likeCount", "commentCount", "subscriberCount")
+FLOAT_FIELDS = ("viewsPerSubscriber",)
+INTERNED_FIELDS = ("niche", "platform", "channelName", "channelLink", "keyword")
+
+SORT_KEYS = ("views", "views_per_subscriber", "recency", "likes_per_view") + SCORE_KEYS
+DEFAULT_SORT = "views"
+
+
+def _timestamp(date_string):
+    if not date_string:
+        return np.nan
+    try:
+        return datetime.fromisoformat(date_string.replace("Z", "+00:00")).timestamp()
+    except (ValueError, TypeError):
+        return np.nan
+
+
+class ResultColumns:
+    """Immutable columnar result set built from a list of result dicts or records (all with the same fields).
+
+    `channel_history(channel_ids, published_after)` optionally returns the reference videos
+    of the channel baselines as (channel_ids, views, POSIX timestamps); it is only called
+    when the rows are first sorted by one of the SCORE_KEYS.
+    """
+
+    def __init__(self, rows, channel_history=None):
+        self.size = len(rows)
+        self.channel_history = channel_history
+        self.record_type = type(rows[0]) if rows and dataclasses.is_dataclass(rows[0]) else None
+        if self.record_type:
+            self.fields = [field.name for field in dataclasses.fields(self.record_type)]
+        else:
+            self.fields = list(rows[0]) if rows else []
+        self._counts = {}
+        self._floats = {}
+        self._objects = {}
+        self._sort_values = {}
+        for field in self.fields:
+            if self.record_type:
+                values = [getattr(row, field) for row in rows]
+            else:
+                values = [row.get(field) for row in rows]
+            if field in COUNT_FIELDS:
+                missing = np.fromiter((value is None for value in values), dtype=bool, count=self.size)
+                column = np.fromiter((value or 0 for value in values), dtype=np.int64, count=self.size)
+                self._counts[field] = (column, missing if missing.any() else None)
+            elif field in FLOAT_FIELDS:
+                self._floats[field] = np.fromiter((np.nan if value is None else value for value in values), dtype=float, count=self.size)
+            elif field in INTERNED_FIELDS:
+                self._objects[field] = [sys.intern(value) if isinstance(value, str) else value for value in values]
+            else:
+                self._objects[field] = values
+
+    def __len__(self):
+        return self.size
+
+    def _count_values(self, field):
+        if field not in self._counts:
+            return np.zeros(self.size)
+        return self._counts[field][0].astype(float)
+
+    def _published_timestamps(self):
+        return np.fromiter((_timestamp(value) for value in self._objects.get("publishedAt", [None] * self.size)), dtype=float, count=self.size)
+
+    def _channel_keys(self):
+        """Channel ID of each row, from its link (https://www.youtube.com/channel/<id>), else its name."""
+        links = self._objects.get("channelLink")
+        if links:
+            return [link.rsplit("/", 1)[-1] if isinstance(link, str) else link for link in links]
+        return self._objects.get("channelName") or [None] * self.size
+
+    def _score(self):
+        channel_keys = self._channel_keys()
+        published_at = self._published_timestamps()
+        reference = None
+        if self.channel_history and self.size:
+            # Reference videos published since the oldest row, so they cover the same window
+            oldest = np.nanmin(published_at) if np.isfinite(published_at).any() else None
+            published_after = None if oldest is None else datetime.fromtimestamp(oldest, timezone.utc).replace(tzinfo=None)
+            reference = self.channel_history(sorted({key for key in channel_keys if isinstance(key, str)}), published_after)
+        return score_videos(channel_keys, self._count_values("viewCount"), published_at, time.time(), reference)
+
+    def sort_values(self, sort):
+        """Float array where larger means first for `sort` (computed once per key)."""
+        if sort not in self._sort_values:
+            if sort == "views":
+                values = self._count_values("viewCount")
+            elif sort == "views_per_subscriber":
+                if "viewsPerSubscriber" in self._floats:
+                    values = self._floats["viewsPerSubscriber"]
+                else:
+                    subscribers = self._count_values("subscriberCount")
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        values = np.where(subscribers > 0, self._count_values("viewCount") / subscribers, 0.0)
+            elif sort == "recency":
+                values = self._published_timestamps()
+            elif sort == "likes_per_view":
+                views = self._count_values("viewCount")
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    values = np.where(views > 0, self._count_values("likeCount") / views, 0.0)
+            elif sort in SCORE_KEYS:
+                for key, scored in self._score().items():
+                    self._sort_values[key] = np.nan_to_num(scored, nan=-np.inf)
+                return self._sort_values[sort]
+            else:
+                raise ValueError(f"Unknown sort key: {sort}")
+            self._sort_values[sort] = np.nan_to_num(values, nan=-np.inf)
+        return self._sort_values[sort]
+
+    def top(self, sort, k):
+        """Indices of the first `k` rows in `sort` order; ties keep the original order."""
+        k = min(k, self.size)
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        descending = -self.sort_values(sort)
+        if k < self.size:
+            kth = np.partition(descending, k - 1)[k - 1]
+            better = np.flatnonzero(descending < kth)
+            ties = np.flatnonzero(descending == kth)[:k - len(better)]
+            candidates = np.concatenate((better, ties))
+        else:
+            candidates = np.arange(self.size)
+        return candidates[np.lexsort((candidates, descending[candidates]))]
+
+    def _value(self, field, index):
+        if field in self._counts:
+            column, missing = self._counts[field]
+            return None if missing is not None and missing[index] else int(column[index])
+        if field in self._floats:
+            value = self._floats[field][index]
+            return None if np.isnan(value) else float(value)
+        return self._objects[field][index]
+
+    def row(self, index):
+        """Row `index` as the input type; records are built positionally, in field order, with no dict."""
+        values = [self._value(field, index) for field in self.fields]
+        return self.record_type(*values) if self.record_type else dict(zip(self.fields, values))
+
+    def rows(self, sort=DEFAULT_SORT, limit=None):
+        """The first `limit` rows (all by default), in `sort` order."""
+        return [self.row(index) for index in self.top(sort, self.size if limit is None else limit)]
+
+    def page(self, page, page_size, sort=DEFAULT_SORT):
+        """Returns (page_results, pagination) for the requested page, clamping invalid pages."""
+        page_size = max(1, page_size)
+        total_results = self.size
+        total_pages = (total_results + page_size - 1) // page_size if total_results > 0 else 1
+        page = min(max(page, 1), total_pages)
+        start_idx = (page - 1) * page_size
+        end_idx = min(start_idx + page_size, total_results)
+        indices = self.top(sort, end_idx)[start_idx:end_idx]
+        pagination = {
+            "page": page,
+            "page_size": page_size,
+            "total_pages": total_pages,
+            "total_results": total_results,
+            "sort": sort,
+        }
+        return [self.row(index) for index in indices], pagination
@@ -0,0 +1,166 @@
+# src/services/search_jobs.py
+
+import os
+import json
+import uuid
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.search_job import SearchJob
+from src.services.quota import QuotaLedger, use_ledger, budget_status, remaining_budget
+
+# Long searches run on this bounded pool instead of holding a gunicorn worker for the whole
+# upstream latency; the request only creates the job and returns its id. Status, progress
+# and results live in the database, so any worker can answer the polling requests.
+SEARCH_JOB_WORKERS = int(os.getenv("SEARCH_JOB_WORKERS", "2"))
+# Jobs queued or running in this process beyond which new submissions are refused
+SEARCH_JOB_MAX_PENDING = int(os.getenv("SEARCH_JOB_MAX_PENDING", "20"))
+# A pending job not updated for this long belonged to a worker that died; it is failed, not reused
+SEARCH_JOB_STALE_SECONDS = int(os.getenv("SEARCH_JOB_STALE_SECONDS", "1800"))
+# Finished jobs (and their results) are deleted after this long
+SEARCH_JOB_RETENTION_SECONDS = int(os.getenv("SEARCH_JOB_RETENTION_SECONDS", "86400"))
+
+
+class JobQueueFull(Exception):
+    """Raised when this process already has SEARCH_JOB_MAX_PENDING jobs queued or running."""
+
+
+def _is_stale(job, now=None):
+    last_update = job.updated_at or job.created_at
+    return last_update < (now or datetime.utcnow()) - timedelta(seconds=SEARCH_JOB_STALE_SECONDS)
+
+
+def active_job_key(kind, params_key, scope):
+    """Key held by the pending job for this search and caller; the unique index on it keeps
+    two workers from queueing the same job."""
+    return hashlib.sha256(f"{kind}:{scope}:{params_key}".encode("utf-8")).hexdigest()
+
+
+def _fail_lost_job(job):
+    job.status = SearchJob.STATUS_FAILED
+    job.error = "Job lost: the worker running it stopped. Submit the search again."
+    job.finished_at = datetime.utcnow()
+    job.active_key = None
+    db.session.commit()
+
+
+def get_job(job_id):
+    """Loads a job, failing it first if it was left pending by a worker that is gone."""
+    job = db.session.get(SearchJob, job_id)
+    if job and not job.is_finished and _is_stale(job):
+        _fail_lost_job(job)
+    return job
+
+
+def purge_expired_jobs():
+    cutoff = datetime.utcnow() - timedelta(seconds=SEARCH_JOB_RETENTION_SECONDS)
+    try:
+        SearchJob.query.filter(SearchJob.created_at < cutoff).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Failed to purge expired search jobs: {e}")
+
+
+class SearchJobRunner:
+    """Bounded, per-process pool of search jobs with de-duplication of identical pending jobs.
+
+    Only a caller's own pending job is reused: another scope gets a job of its own, with its
+    own params, quota and budget checks.
+    """
+
+    def __init__(self, max_workers=SEARCH_JOB_WORKERS, max_pending=SEARCH_JOB_MAX_PENDING):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created on first use so that gunicorn workers don't inherit threads from the master
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="search-job")
+        return self._executor
+
+    def find_pending(self, kind, params_key, scope):
+        job = SearchJob.query.filter_by(active_key=active_job_key(kind, params_key, scope)).first()
+        if job and _is_stale(job):
+            # Frees the key so the search can be queued again
+            _fail_lost_job(job)
+            return None
+        return job
+
+    def submit(self, kind, params, params_key, run, scope, tier):
+        """Queues `run(params, on_progress)` as a job, or returns the caller's identical pending one.
+
+        Returns (job dict, reused). Raises JobQueueFull when the pool is saturated.
+        """
+        with self._lock:
+            existing = self.find_pending(kind, params_key, scope)
+            if existing:
+                return existing.to_dict(), True
+            if self._pending >= self.max_pending:
+                raise JobQueueFull()
+            job = SearchJob(id=uuid.uuid4().hex, kind=kind, params_key=params_key, active_key=active_job_key(kind, params_key, scope), params=json.dumps(params), scope=scope, tier=tier)
+            db.session.add(job)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Another worker queued the same job between the lookup and the insert
+                db.session.rollback()
+                existing = self.find_pending(kind, params_key, scope)
+                if existing:
+                    return existing.to_dict(), True
+                raise
+            job_data = job.to_dict()
+            self._pending += 1
+        app = current_app._get_current_object()
+        try:
+            self._get_executor().submit(self._run, app, job_data["id"], run, params, scope, tier)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        current_app.logger.info(f"Queued {kind} search job {job_data['id']} for {scope}.")
+        return job_data, False
+
+    def _update(self, job_id, **fields):
+        job = db.session.get(SearchJob, job_id)
+        for name, value in fields.items():
+            setattr(job, name, value)
+        job.updated_at = datetime.utcnow()
+        db.session.commit()
+
+    def _run(self, app, job_id, run, params, scope, tier):
+        with app.app_context():
+            # The budget was checked when the job was queued; calls past what is left now fail
+            ledger = QuotaLedger(scope, tier, limit_units=remaining_budget(budget_status(scope, tier)))
+            try:
+                self._update(job_id, status=SearchJob.STATUS_RUNNING, started_at=datetime.utcnow())
+
+                def on_progress(progress):
+                    self._update(job_id, progress=json.dumps(progress))
+
+                with use_ledger(ledger):
+                    result = run(params, on_progress)
+                self._update(job_id, status=SearchJob.STATUS_SUCCEEDED, active_key=None, result=current_app.json.dumps(result), quota_units=ledger.flushed_units, finished_at=datetime.utcnow())
+                current_app.logger.info(f"Search job {job_id} succeeded ({ledger.flushed_units} quota units).")
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Search job {job_id} failed: {e}", exc_info=True)
+                try:
+                    self._update(job_id, status=SearchJob.STATUS_FAILED, active_key=None, error=str(e), quota_units=ledger.flushed_units, finished_at=datetime.utcnow())
+                except Exception as update_error:
+                    db.session.rollback()
+                    current_app.logger.error(f"Failed to record the failure of search job {job_id}: {update_error}")
+            finally:
+                with self._lock:
+                    self._pending -= 1
+                db.session.remove()
+
+
+job_runner = SearchJobRunner()
@@ -0,0 +1,95 @@
+# src/services/search_planner.py
+
+import os
+import math
+
+# YouTube Data API v3 quota cost (units) of every method we call.
+# https://developers.google.com/youtube/v3/determine_quota_cost
+QUOTA_COSTS = {
+    "youtube.search.list": 100,
+    "youtube.videos.list": 1,
+    "youtube.channels.list": 1,
+    "youtube.playlistItems.list": 1,
+}
+IDS_PER_REQUEST = 50  # videos.list / channels.list accept up to 50 IDs per call
+RESULTS_PER_SEARCH_PAGE = 50
+
+# Asking search.list for the most viewed videos first only pays off when the view filter
+# is strict enough; below this threshold relevance ordering returns more small channels.
+VIEW_ORDER_MIN_VIEWS = int(os.getenv("SEARCH_VIEW_ORDER_MIN_VIEWS", "50000"))
+# Channel filters looser than these don't prune anything, so resolving channels first
+# would only add latency.
+UNBOUNDED_MAX_SUBS = 10_000_000
+UNBOUNDED_MAX_CHANNEL_VIDEOS = 100_000
+
+
+def to_rfc3339(dt):
+    """Formats an aware datetime the way search.list expects publishedAfter."""
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class SearchPlan:
+    """What a search will ask the API for, in which order, and what it should cost."""
+
+    def __init__(self, search_params, channels_first, estimated_quota_units, steps):
+        self.search_params = search_params
+        self.channels_first = channels_first
+        self.estimated_quota_units = estimated_quota_units
+        self.steps = steps
+
+    def to_dict(self):
+        return {
+            "search_params": self.search_params,
+            "channels_first": self.channels_first,
+            "estimated_quota_units": self.estimated_quota_units,
+            "steps": self.steps,
+        }
+
+
+def plan_viral_search(niche_count, pages_per_niche, video_cutoff_date, min_views, max_subs, max_channel_videos_total):
+    """Plans the Shorts search of /api/search/viral-videos.
+
+    The publish-date cutoff is pushed into search.list (publishedAfter) and, for strict view
+    filters, so is the ordering. When the channel filters can prune anything, search.list is
+    asked for snippets (same 100 units) so channels are resolved before videos and
+    videos.list is skipped for videos of rejected channels.
+    """
+    search_params = {"publishedAfter": to_rfc3339(video_cutoff_date)}
+    if min_views >= VIEW_ORDER_MIN_VIEWS:
+        search_params["order"] = "viewCount"
+    channels_first = max_subs < UNBOUNDED_MAX_SUBS or max_channel_videos_total < UNBOUNDED_MAX_CHANNEL_VIDEOS
+    search_params["part"] = "snippet" if channels_first else "id"
+
+    search_calls = niche_count * pages_per_niche
+    max_hits = search_calls * RESULTS_PER_SEARCH_PAGE
+    detail_batches = math.ceil(max_hits / IDS_PER_REQUEST)
+    estimated_quota_units = (
+        search_calls * QUOTA_COSTS["youtube.search.list"]
+        + detail_batches * QUOTA_COSTS["youtube.videos.list"]
+        + detail_batches * QUOTA_COSTS["youtube.channels.list"]
+    )
+    if channels_first:
+        steps = ["search.list (snippet)", "channels.list for unseen channels", "channel filters", "videos.list for accepted channels", "video filters"]
+    else:
+        steps = ["search.list (id)", "videos.list", "video filters", "channels.list", "channel filters"]
+    return SearchPlan(search_params, channels_first, estimated_quota_units, steps)
+
+
+def plan_find_niches(max_channels, max_videos_per_channel, video_cutoff_date):
+    """Plans /api/youtube/find_niches (channel search -> channel filters -> recent uploads per channel).
+
+    Channels are always resolved first here. Their uploads are read from the uploads
+    playlist (playlistItems.list, 1 unit per page instead of 100 for search.list), newest
+    first, so pagination stops as soon as uploads are older than the cutoff. Planned before
+    the channel search, so the estimate assumes all `max_channels` pass the filters (an
+    upper bound).
+    """
+    search_params = {"publishedAfter": to_rfc3339(video_cutoff_date)}  # Applied while paging the uploads playlist
+    pages_per_channel = math.ceil(max_videos_per_channel / RESULTS_PER_SEARCH_PAGE) if max_videos_per_channel > 0 else 0
+    estimated_quota_units = (
+        QUOTA_COSTS["youtube.search.list"]
+        + math.ceil(max_channels / IDS_PER_REQUEST) * QUOTA_COSTS["youtube.channels.list"]
+        + max_channels * pages_per_channel * (QUOTA_COSTS["youtube.playlistItems.list"] + QUOTA_COSTS["youtube.videos.list"])
+    )
+    steps = ["search.list (channels)", "channels.list (uploads playlist)", "channel filters", "playlistItems.list per accepted channel (until the cutoff)", "videos.list", "video filters"]
+    return SearchPlan(search_params, True, estimated_quota_units, steps)
@@ -0,0 +1,134 @@
+# src/services/search_snapshots.py
+
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from src.services.result_columns import ResultColumns, DEFAULT_SORT
+
+# Filtered result sets of /api/search/viral-videos are kept here so that page 2..N
+# (in any sort order) are served as slices of the same snapshot instead of re-running
+# the whole YouTube pipeline (search.list + videos.list + channels.list).
+
+SNAPSHOT_TTL_SECONDS = int(os.getenv("SEARCH_SNAPSHOT_TTL_SECONDS", "900"))
+SNAPSHOT_MAX_ENTRIES = int(os.getenv("SEARCH_SNAPSHOT_MAX_ENTRIES", "256"))
+
+
+def normalize_niches(niches):
+    """Lowercases, strips and de-duplicates niches, ignoring their order."""
+    return sorted({n.strip().lower() for n in niches if n and n.strip()})
+
+
+def make_search_key(niches, **filters):
+    """Builds a stable key from the search parameters (niche order and case are ignored)."""
+    normalized = {"niches": normalize_niches(niches)}
+    normalized.update({name: value for name, value in filters.items()})
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SearchSnapshot:
+    """A filtered result set, held in columns, ready to be sorted and sliced into pages."""
+
+    def __init__(self, key, results, meta=None, ttl=SNAPSHOT_TTL_SECONDS, channel_history=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.columns = ResultColumns(results, channel_history)
+        self.meta = meta or {}
+        self.created_at = time.time()
+        self.expires_at = self.created_at + ttl
+
+    @property
+    def total_results(self):
+        return self.columns.size
+
+    @property
+    def results(self):
+        """Every result, most viewed first."""
+        return self.columns.rows(DEFAULT_SORT)
+
+    def is_expired(self, now=None):
+        return (now or time.time()) >= self.expires_at
+
+    def expires_in(self, now=None):
+        return max(0, int(self.expires_at - (now or time.time())))
+
+    def etag(self, *representation):
+        """Strong validator of one representation (page, page size, sort...) of this snapshot.
+
+        Snapshots never change, so the validator only depends on the snapshot id and the
+        representation; the cursor's remaining lifetime (snapshot_expires_in) is advisory.
+        """
+        payload = ":".join(str(part) for part in (self.id,) + representation)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def page(self, page, page_size, sort=DEFAULT_SORT):
+        """Returns (page_results, pagination) for the requested page in `sort` order, clamping invalid pages."""
+        page_results, pagination = self.columns.page(page, page_size, sort)
+        pagination["snapshot_id"] = self.id
+        pagination["snapshot_expires_in"] = self.expires_in()
+        return page_results, pagination
+
+
+class SearchSnapshotStore:
+    """In-process, thread-safe LRU of search snapshots with a TTL.
+
+    Snapshots are addressable both by id (returned to the client as a cursor) and
+    by the normalized search key, so a page request that lands on a worker which
+    never saw the snapshot id still reuses an equivalent snapshot if it has one.
+    """
+
+    def __init__(self, ttl=SNAPSHOT_TTL_SECONDS, max_entries=SNAPSHOT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._by_id = OrderedDict()
+        self._id_by_key = {}
+        self._lock = threading.Lock()
+
+    def get(self, snapshot_id=None, key=None):
+        """Looks up a live snapshot by id first, then by key. Returns None on miss."""
+        with self._lock:
+            self._evict_expired()
+            if snapshot_id and snapshot_id in self._by_id:
+                snapshot = self._by_id[snapshot_id]
+                # A cursor is only honoured for the same search parameters
+                if key is None or snapshot.key == key:
+                    self._by_id.move_to_end(snapshot_id)
+                    return snapshot
+            if key and key in self._id_by_key:
+                snapshot_id = self._id_by_key[key]
+                self._by_id.move_to_end(snapshot_id)
+                return self._by_id[snapshot_id]
+        return None
+
+    def put(self, key, results, meta=None, ttl=None, channel_history=None):
+        snapshot = SearchSnapshot(key, results, meta=meta, ttl=self.ttl if ttl is None else ttl, channel_history=channel_history)
+        with self._lock:
+            previous_id = self._id_by_key.get(key)
+            if previous_id:
+                self._by_id.pop(previous_id, None)
+            self._by_id[snapshot.id] = snapshot
+            self._id_by_key[key] = snapshot.id
+            while len(self._by_id) > self.max_entries:
+                _, evicted = self._by_id.popitem(last=False)
+                if self._id_by_key.get(evicted.key) == evicted.id:
+                    del self._id_by_key[evicted.key]
+        return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._by_id.clear()
+            self._id_by_key.clear()
+
+    def _evict_expired(self):
+        now = time.time()
+        for snapshot_id in [sid for sid, s in self._by_id.items() if s.is_expired(now)]:
+            snapshot = self._by_id.pop(snapshot_id)
+            if self._id_by_key.get(snapshot.key) == snapshot_id:
+                del self._id_by_key[snapshot.key]
+
+
+snapshot_store = SearchSnapshotStore()
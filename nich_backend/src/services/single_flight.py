@@ -0,0 +1,107 @@
+# src/services/single_flight.py
+
+import os
+import time
+import threading
+from flask import current_app
+from googleapiclient.errors import HttpError
+from src.models.user import db
+from src.services.job_lock import acquire_lock, release_lock
+from src.services.upstream import CircuitOpenError
+
+# Identical searches arriving while one is already running wait for it instead of
+# repeating every search.list / videos.list / channels.list call.
+#
+# Inside a worker the first caller of a key runs the search and the others block on it
+# and receive the same result. Only upstream failures are shared with them: anything
+# else may be the leader's own (its quota budget running out), so the waiting callers
+# run the search again, one of them as the new leader. Across workers the leader also holds a DB
+# lease named after the key: another worker's leader waits for the lease to be released
+# and then runs the search itself, which in local-first mode is answered from what the
+# first worker just stored in the niche warehouse.
+
+SINGLE_FLIGHT_WAIT_SECONDS = int(os.getenv("SINGLE_FLIGHT_WAIT_SECONDS", "120"))  # Max wait for another worker
+SINGLE_FLIGHT_LOCK_TTL_SECONDS = int(os.getenv("SINGLE_FLIGHT_LOCK_TTL_SECONDS", "300"))
+SINGLE_FLIGHT_POLL_SECONDS = 1.0
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def wait_for_lease(lock_name, timeout=SINGLE_FLIGHT_WAIT_SECONDS, ttl=SINGLE_FLIGHT_LOCK_TTL_SECONDS):
+    """Takes the lease `lock_name`, polling while another worker holds it.
+
+    Returns True when the lease was taken, False when `timeout` ran out first.
+    """
+    deadline = time.monotonic() + timeout
+    while not acquire_lock(lock_name, ttl):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(SINGLE_FLIGHT_POLL_SECONDS)
+    return True
+
+
+class SingleFlight:
+    """Per-process registry of in-flight computations, keyed by normalized parameters.
+
+    Errors of the `shared_errors` types are raised in every caller of a run; after any
+    other error the callers that waited run `fn` again.
+    """
+
+    def __init__(self, shared_errors=()):
+        self.shared_errors = shared_errors
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, lock_name=None):
+        """Runs `fn()` once for all concurrent callers of `key`.
+
+        Returns (result, shared); `shared` is True for the callers that waited on another
+        thread's run. With `lock_name`, the run is also serialized across workers.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+            if leader:
+                break
+            call.done.wait()
+            if call.error is None:
+                return call.result, True
+            if isinstance(call.error, self.shared_errors):
+                raise call.error
+            current_app.logger.info(f"The identical search failed on its own caller ({type(call.error).__name__}); running it again.")
+
+        leased = False
+        try:
+            if lock_name:
+                leased = wait_for_lease(lock_name)
+                if not leased:
+                    current_app.logger.warning(f"Gave up waiting for '{lock_name}' after {SINGLE_FLIGHT_WAIT_SECONDS}s; running anyway.")
+            call.result = fn()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            if leased:
+                try:
+                    release_lock(lock_name)
+                except Exception as e:
+                    db.session.rollback()
+                    current_app.logger.error(f"Failed to release '{lock_name}': {e}")
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+# YouTube answered with an error or is circuit-broken: the same for every caller
+search_flights = SingleFlight(shared_errors=(HttpError, CircuitOpenError))
@@ -0,0 +1,188 @@
+# src/services/trending.py
+
+import os
+from datetime import datetime, time, timedelta
+import numpy as np
+from flask import current_app
+from sqlalchemy import and_, func, or_
+from src.models.user import db
+from src.models.niche_data import NicheData, NicheWeeklyStats, TrendingNiche
+from src.services.db_upsert import upsert_rows
+from src.services.job_lock import acquire_lock, release_lock
+from src.services.outlier_scores import grouped_medians
+
+# Weekly trending niches, computed from the warehouse (NicheData) with NumPy.
+#
+# Rows are bucketed by the Monday of the week they were collected. Each run only looks at
+# the weeks that received rows since the previous run (normally just the current one):
+# their rows are read in (keyword, id)-ordered chunks, the keywords a chunk completes get
+# their medians from one sort instead of Python loops, and the result is upserted into
+# NicheWeeklyStats. Closed weeks are never read again. The ranked top N of every
+# recomputed week is then materialized into TrendingNiche, which the read endpoint
+# serves as is.
+
+TRENDING_TOP_N = int(os.getenv("TRENDING_TOP_N", "10"))
+TRENDING_CHUNK_SIZE = int(os.getenv("TRENDING_CHUNK_SIZE", "50000"))
+TRENDING_MIN_VIDEOS = int(os.getenv("TRENDING_MIN_VIDEOS", "5"))  # Smaller samples aren't ranked
+TRENDING_LOCK_NAME = "trending-engine"
+TRENDING_LOCK_TTL_SECONDS = 3600
+MAX_WEEK_OVER_WEEK_CHANGE = 10.0  # Caps the boost of niches coming from almost nothing
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def iter_week_chunks(week_start_date, chunk_size=TRENDING_CHUNK_SIZE):
+    """Yields (keywords, views_per_subscriber, view_counts) arrays for the rows collected in a week.
+
+    Rows come ordered by (keyword, id), so a keyword's rows are contiguous across chunks.
+    """
+    start = datetime.combine(week_start_date, time.min)
+    end = start + timedelta(days=7)
+    last_keyword, last_id = None, 0
+    while True:
+        query = db.session.query(
+            NicheData.id, NicheData.keyword, NicheData.views_per_subscriber, NicheData.view_count
+        ).filter(
+            NicheData.data_collected_at >= start,
+            NicheData.data_collected_at < end,
+            NicheData.view_count.isnot(None),
+        )
+        if last_keyword is not None:
+            query = query.filter(or_(
+                NicheData.keyword > last_keyword,
+                and_(NicheData.keyword == last_keyword, NicheData.id > last_id),
+            ))
+        rows = query.order_by(NicheData.keyword, NicheData.id).limit(chunk_size).all()
+        if not rows:
+            return
+        last_id, last_keyword = rows[-1][0], rows[-1][1]
+        _, keywords, views_per_subscriber, view_counts = zip(*rows)
+        yield (
+            np.array(keywords, dtype=object),
+            np.array(views_per_subscriber, dtype=float),
+            np.array(view_counts, dtype=float),
+        )
+
+
+def keyword_stats(keywords, views_per_subscriber, view_counts, week_start_date, computed_at):
+    """Per-keyword medians of complete keyword groups, as NicheWeeklyStats column dicts."""
+    unique_keywords, codes = np.unique(keywords.astype(str), return_inverse=True)
+    median_vps, counts = grouped_medians(codes, np.nan_to_num(views_per_subscriber), len(unique_keywords))
+    median_views, _ = grouped_medians(codes, view_counts, len(unique_keywords))
+    return [
+        {
+            "keyword": str(keyword),
+            "week_start_date": week_start_date,
+            "video_count": int(count),
+            "median_views_per_subscriber": float(vps),
+            "median_view_count": float(views),
+            "computed_at": computed_at,
+        }
+        for keyword, count, vps, views in zip(unique_keywords, counts, median_vps, median_views)
+    ]
+
+
+def compute_week_stats(week_start_date, computed_at):
+    """Per-keyword stats of one week, as NicheWeeklyStats column dicts.
+
+    Each chunk's keywords are finished as soon as their rows are complete; only the last
+    keyword of a chunk, which may continue in the next one, is carried over. Memory is
+    bounded by a chunk plus the largest keyword of the week, and the medians stay exact.
+    """
+    stats = []
+    carry = None
+    for chunk in iter_week_chunks(week_start_date):
+        if carry is not None:
+            chunk = tuple(np.concatenate(pair) for pair in zip(carry, chunk))
+        # The chunk's last keyword starts right after the last row of another keyword
+        others = np.flatnonzero(chunk[0] != chunk[0][-1])
+        tail = int(others[-1]) + 1 if others.size else 0
+        if tail:
+            stats.extend(keyword_stats(*(column[:tail] for column in chunk), week_start_date, computed_at))
+        carry = tuple(column[tail:] for column in chunk)
+    if carry is not None:
+        stats.extend(keyword_stats(*carry, week_start_date, computed_at))
+    return stats
+
+
+def rank_week(week_start_date, top_n=TRENDING_TOP_N):
+    """Scores the keywords of a week against the previous one and materializes the top N.
+
+    trend_score = median views/subscriber × (1 + week-over-week change of that median)
+    × log(1 + videos), so niches that are both strong and growing rank first and tiny
+    samples are damped.
+    """
+    current = NicheWeeklyStats.query.filter(
+        NicheWeeklyStats.week_start_date == week_start_date,
+        NicheWeeklyStats.video_count >= TRENDING_MIN_VIDEOS,
+    ).all()
+    previous = {
+        row.keyword: row.median_views_per_subscriber
+        for row in NicheWeeklyStats.query.filter(NicheWeeklyStats.week_start_date == week_start_date - timedelta(days=7)).all()
+    }
+    TrendingNiche.query.filter_by(week_start_date=week_start_date).delete(synchronize_session=False)
+    if current:
+        median_vps = np.array([row.median_views_per_subscriber or 0.0 for row in current])
+        counts = np.array([row.video_count for row in current], dtype=float)
+        previous_vps = np.array([previous.get(row.keyword, np.nan) for row in current], dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = np.where(previous_vps > 0, (median_vps - previous_vps) / previous_vps, np.nan)
+        growth = np.clip(np.nan_to_num(change, nan=0.0), -1.0, MAX_WEEK_OVER_WEEK_CHANGE)
+        scores = median_vps * (1.0 + growth) * np.log1p(counts)
+        for rank, index in enumerate(np.argsort(-scores, kind="stable")[:top_n], start=1):
+            row = current[index]
+            db.session.add(TrendingNiche(
+                week_start_date=week_start_date,
+                rank=rank,
+                keyword=row.keyword,
+                trend_score=round(float(scores[index]), 4),
+                video_count=row.video_count,
+                median_views_per_subscriber=row.median_views_per_subscriber,
+                week_over_week_change=None if np.isnan(change[index]) else round(float(change[index]), 4),
+            ))
+    db.session.commit()
+    return min(len(current), top_n)
+
+
+def update_trending_niches():
+    """Recomputes the weeks that received warehouse rows since the last run. Runs in an app context.
+
+    Returns the list of week start dates recomputed.
+    """
+    if not acquire_lock(TRENDING_LOCK_NAME, TRENDING_LOCK_TTL_SECONDS):
+        current_app.logger.info("Trending engine already running on another worker.")
+        return []
+    try:
+        started_at = datetime.utcnow()
+        watermark = db.session.query(func.max(NicheWeeklyStats.computed_at)).scalar()
+        oldest_new_row = db.session.query(func.min(NicheData.data_collected_at))
+        if watermark:
+            oldest_new_row = oldest_new_row.filter(NicheData.data_collected_at >= watermark)
+        oldest_new_row = oldest_new_row.scalar()
+        if oldest_new_row is None:
+            current_app.logger.info("Trending engine: no warehouse rows since the last run.")
+            return []
+
+        weeks = []
+        week = week_start(oldest_new_row.date())
+        while week <= week_start(started_at.date()):
+            weeks.append(week)
+            week += timedelta(days=7)
+        for week in weeks:
+            rows = compute_week_stats(week, started_at)
+            upsert_rows(NicheWeeklyStats, rows, ["keyword", "week_start_date"])
+            ranked = rank_week(week)
+            current_app.logger.info(f"Trending engine: week {week} -> {len(rows)} niches, top {ranked} materialized.")
+        return weeks
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Trending engine failed: {e}", exc_info=True)
+        return []
+    finally:
+        release_lock(TRENDING_LOCK_NAME)
+
+
+def latest_trending_week():
+    return db.session.query(func.max(TrendingNiche.week_start_date)).scalar()
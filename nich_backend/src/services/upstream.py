@@ -0,0 +1,173 @@
+# src/services/upstream.py
+
+import os
+import json
+import time
+import random
+import threading
+import httplib2
+from googleapiclient.errors import HttpError
+
+# Resilience of the calls to the YouTube API.
+#
+# Transient failures (5xx, rate limits, network errors) are retried with full-jitter
+# exponential backoff, or after the Retry-After the API asked for. A circuit breaker
+# counts consecutive transient failures: past the threshold it opens and calls fail
+# right away with CircuitOpenError, until a single probe call is let through after the
+# cool-down. Callers fall back to the last good data they stored (video/channel stores,
+# niche warehouse) and say how old it is, instead of waiting on a failing upstream.
+
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "3"))
+UPSTREAM_BACKOFF_BASE_SECONDS = float(os.getenv("UPSTREAM_BACKOFF_BASE_SECONDS", "0.5"))
+UPSTREAM_BACKOFF_MAX_SECONDS = float(os.getenv("UPSTREAM_BACKOFF_MAX_SECONDS", "8"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("UPSTREAM_BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = int(os.getenv("UPSTREAM_BREAKER_RESET_SECONDS", "30"))
+# Oldest stored data served when fresh data can't be fetched
+STALE_FALLBACK_MAX_AGE_SECONDS = int(os.getenv("STALE_FALLBACK_MAX_AGE_SECONDS", str(7 * 86400)))
+
+TRANSIENT_STATUSES = (429, 500, 502, 503, 504)
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+QUOTA_ERROR_REASONS = ("quotaExceeded", "dailyLimitExceeded")
+NETWORK_ERRORS = (OSError, httplib2.HttpLib2Error)  # Includes timeouts and refused/reset connections
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"{name} circuit open: upstream failing, retry in {retry_in}s.")
+        self.retry_in = retry_in
+
+
+def error_reasons(error):
+    """The `reason` of each error in an HttpError's JSON body."""
+    try:
+        return [item.get("reason") for item in json.loads(error.content.decode("utf-8")).get("error", {}).get("errors", [])]
+    except (ValueError, AttributeError):
+        return []
+
+
+def is_quota_error(error):
+    return isinstance(error, HttpError) and error.resp.status == 403 and bool(set(error_reasons(error)) & set(QUOTA_ERROR_REASONS))
+
+
+def is_transient(error):
+    if isinstance(error, HttpError):
+        return error.resp.status in TRANSIENT_STATUSES or (
+            error.resp.status == 403 and bool(set(error_reasons(error)) & set(RATE_LIMIT_REASONS))
+        )
+    return isinstance(error, NETWORK_ERRORS)
+
+
+def is_upstream_failure(error):
+    """True for errors after which stored (stale) data should be served instead."""
+    return isinstance(error, CircuitOpenError) or is_transient(error) or is_quota_error(error)
+
+
+def retry_after_seconds(error):
+    try:
+        return float(error.resp.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff; the server's Retry-After wins when it sent one."""
+    if retry_after is not None:
+        return min(UPSTREAM_BACKOFF_MAX_SECONDS, retry_after)
+    return random.uniform(0, min(UPSTREAM_BACKOFF_MAX_SECONDS, UPSTREAM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures -> half-open (one probe) after `reset_seconds`."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_in(self):
+        if self.state != self.OPEN:
+            return 0
+        return max(0, int(self.opened_at + self.reset_seconds - time.monotonic()))
+
+    @property
+    def is_open(self):
+        """True while calls would be refused (open and still cooling down, or a probe is out)."""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at < self.reset_seconds
+            return self.state == self.HALF_OPEN and self._probing
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "retry_in_seconds": self.retry_in(),
+                "times_opened": self.times_opened,
+            }
+
+
+youtube_breaker = CircuitBreaker("youtube")
+
+
+def call_with_resilience(send, breaker=youtube_breaker, max_retries=UPSTREAM_MAX_RETRIES):
+    """Runs `send()` through the circuit breaker, retrying transient failures with backoff."""
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError(breaker.name, breaker.retry_in())
+        try:
+            result = send()
+        except Exception as e:
+            if not is_transient(e):
+                breaker.record_success()  # The upstream answered; the error is about this call
+                raise
+            breaker.record_failure()
+            if attempt >= max_retries:
+                raise
+            time.sleep(backoff_delay(attempt, retry_after_seconds(e)))
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
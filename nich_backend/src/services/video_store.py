@@ -0,0 +1,162 @@
+# src/services/video_store.py
+
+import os
+from datetime import datetime, timedelta, timezone
+import isodate
+from flask import current_app
+from src.models.video_details import VideoDetails
+from src.services.db_upsert import upsert_rows
+from src.services.upstream import is_upstream_failure
+from src.services.youtube_data import id_lookups, execute_lookups
+
+# Static metadata (title, publishedAt, thumbnails, duration) is kept for good; only the
+# statistics expire, and stale entries are refreshed with the much smaller part=statistics.
+VIDEO_STATS_TTL_SECONDS = int(os.getenv("VIDEO_STATS_TTL_SECONDS", "3600"))
+FULL_PARTS = "snippet,statistics,contentDetails"
+THUMBNAIL_PREFERENCE = ("high", "medium", "default")
+STATS_COLUMNS = ("view_count", "like_count", "comment_count", "stats_fetched_at")
+
+
+def _to_int(value):
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _parse_published_at(date_string):
+    if not date_string:
+        return None
+    try:
+        # Stored as naive UTC, like the other DateTime columns
+        return datetime.fromisoformat(date_string.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def _parse_duration(duration_iso):
+    if not duration_iso:
+        return None
+    try:
+        return int(isodate.parse_duration(duration_iso).total_seconds())
+    except (isodate.ISO8601Error, ValueError, TypeError):
+        return None
+
+
+def stats_row_from_item(item, fetched_at):
+    statistics = item.get("statistics", {})
+    return {
+        "video_id": item["id"],
+        "view_count": _to_int(statistics.get("viewCount")),
+        "like_count": _to_int(statistics.get("likeCount")),
+        "comment_count": _to_int(statistics.get("commentCount")),
+        "stats_fetched_at": fetched_at,
+    }
+
+
+def video_row_from_item(item, fetched_at):
+    """Converts a full videos.list item into a VideoDetails column dict."""
+    snippet = item.get("snippet", {})
+    thumbnails = snippet.get("thumbnails", {})
+    best_thumbnail = next((thumbnails[size] for size in THUMBNAIL_PREFERENCE if size in thumbnails), {})
+    row = stats_row_from_item(item, fetched_at)
+    row.update({
+        "channel_id": snippet.get("channelId"),
+        "title": snippet.get("title"),
+        "published_at": _parse_published_at(snippet.get("publishedAt")),
+        "thumbnail_default": thumbnails.get("default", {}).get("url"),
+        "thumbnail_high": best_thumbnail.get("url"),
+        "duration_seconds": _parse_duration(item.get("contentDetails", {}).get("duration")),
+        "metadata_fetched_at": fetched_at,
+    })
+    return row
+
+
+def get_videos(youtube, video_ids, max_stats_age_seconds=None, unavailable=None):
+    """Returns {video_id: video dict} for the given IDs.
+
+    Cache misses are fetched with the full parts; cached videos whose statistics are older
+    than the TTL are refreshed with part=statistics only. Videos the API no longer returns
+    are absent from the result. Each call of 50 IDs succeeds or fails on its own: when the
+    API is unavailable (see upstream), cached videos are served with their old statistics
+    (statsFetchedAt tells their age) and uncached ones are left out; other API errors, or
+    an outage with nothing cached or fetched, propagate. IDs of failed calls that couldn't
+    be served are added to the `unavailable` set when one is given.
+    """
+    video_ids = list(dict.fromkeys(vid for vid in video_ids if vid))
+    if not video_ids:
+        return {}
+    max_stats_age_seconds = VIDEO_STATS_TTL_SECONDS if max_stats_age_seconds is None else max_stats_age_seconds
+    fresh_after = datetime.utcnow() - timedelta(seconds=max_stats_age_seconds)
+
+    cached = {}
+    for i in range(0, len(video_ids), 500):
+        for row in VideoDetails.query.filter(VideoDetails.video_id.in_(video_ids[i:i + 500])).all():
+            # Converted right away: rows are expired by the commits below
+            cached[row.video_id] = (row.to_dict(), row.stats_fetched_at or datetime.min)
+
+    missing_ids = [vid for vid in video_ids if vid not in cached]
+    stale_ids = {vid for vid in video_ids if vid in cached and cached[vid][1] < fresh_after}
+    current_app.logger.info(f"Video store: {len(video_ids) - len(missing_ids) - len(stale_ids)} fresh, {len(stale_ids)} stale statistics, {len(missing_ids)} missing.")
+
+    videos = {vid: video for vid, (video, _) in cached.items() if vid not in stale_ids}
+    fetched_at = datetime.utcnow()
+
+    # Misses (full parts) and stale statistics go out together, in one batch round trip
+    lookups = execute_lookups(youtube, id_lookups("videos", FULL_PARTS, missing_ids) + id_lookups("videos", "statistics", sorted(stale_ids)))
+    errors = [lookup.error for lookup in lookups if lookup.error is not None]
+    full_items = [item for lookup in lookups if lookup.part == FULL_PARTS for item in lookup.items]
+    stats_items = [item for lookup in lookups if lookup.part == "statistics" for item in lookup.items]
+
+    if full_items:
+        rows = [video_row_from_item(item, fetched_at) for item in full_items]
+        upsert_rows(VideoDetails, rows, ["video_id"])
+        videos.update({row["video_id"]: VideoDetails(**row).to_dict() for row in rows})
+
+    if stats_items:
+        rows = [stats_row_from_item(item, fetched_at) for item in stats_items]
+        upsert_rows(VideoDetails, rows, ["video_id"], update_columns=STATS_COLUMNS)
+        for row in rows:
+            video = cached[row["video_id"]][0]
+            video.update({
+                "viewCount": row["view_count"],
+                "likeCount": row["like_count"],
+                "commentCount": row["comment_count"],
+                "statsFetchedAt": fetched_at.isoformat(),
+            })
+            videos[row["video_id"]] = video
+
+    if errors:
+        error = next((e for e in errors if not is_upstream_failure(e)), errors[0])
+        if not is_upstream_failure(error) or not (cached or videos):
+            raise error
+        unrefreshed = {vid: video for vid, (video, _) in cached.items() if vid not in videos}
+        current_app.logger.warning(f"Video store: {len(errors)} of {len(lookups)} lookups failed ({error}); serving {len(unrefreshed)} videos with stale statistics.")
+        videos.update(unrefreshed)
+        if unavailable is not None:
+            unavailable.update(vid for lookup in lookups if lookup.error is not None for vid in lookup.ids if vid not in videos)
+
+    return {vid: videos[vid] for vid in video_ids if vid in videos}
+
+
+def channel_view_history(channel_ids, published_after=None):
+    """(channel_ids, view_counts, POSIX publish times) of the stored videos of these channels.
+
+    Every video any search fetched for the channel, published since `published_after`
+    (naive UTC) when given: the reference the channel baselines of the result sorts are
+    computed from (see outlier_scores), instead of only the videos a search kept.
+    """
+    history = ([], [], [])
+    for i in range(0, len(channel_ids), 500):
+        query = VideoDetails.query.with_entities(VideoDetails.channel_id, VideoDetails.view_count, VideoDetails.published_at).filter(
+            VideoDetails.channel_id.in_(channel_ids[i:i + 500]), VideoDetails.view_count.isnot(None)
+        )
+        if published_after is not None:
+            query = query.filter(VideoDetails.published_at >= published_after)
+        for channel_id, view_count, published_at in query:
+            history[0].append(channel_id)
+            history[1].append(view_count)
+            history[2].append(published_at.replace(tzinfo=timezone.utc).timestamp() if published_at else float("nan"))
+    return history
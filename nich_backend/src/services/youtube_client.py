@@ -0,0 +1,292 @@
+# src/services/youtube_client.py
+
+import os
+import json
+import time
+import socket
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait as concurrent_wait
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+from googleapiclient.http import DEFAULT_HTTP_TIMEOUT_SEC
+from src.services.quota import AccountedHttpRequest, QuotaBudgetExceeded
+from src.services.search_planner import QUOTA_COSTS
+from src.services.key_pool import key_pool
+from src.services.upstream import UPSTREAM_MAX_RETRIES, backoff_delay, call_with_resilience, is_quota_error, is_transient
+from src.services import fake_youtube
+
+# One YouTube client per thread (httplib2.Http is not thread-safe), kept for the life of the
+# thread: the discovery document is parsed once per process and each thread's Http keeps
+# its keep-alive connection to googleapis.com instead of doing a new TLS handshake per request.
+# Clients are not tied to an API key: each call picks one from the key pool when it is sent.
+#
+# For the clients to outlive a request, so must the threads: the searches run their API
+# calls on the process-wide `api_workers` threads, each through a WorkerPool that caps
+# how many of them one request uses at a time, instead of on executors of their own.
+
+API_SERVICE_NAME = "youtube"
+API_VERSION = "v3"
+BATCH_MAX_CALLS = int(os.getenv("YOUTUBE_BATCH_MAX_CALLS", "50"))  # Calls per multipart batch request
+API_WORKER_THREADS = int(os.getenv("YOUTUBE_API_WORKER_THREADS", "32"))  # Shared by every request of the process
+
+
+class ClientStats:
+    """Process-wide counters of client creation and HTTP connection reuse."""
+
+    def __init__(self):
+        self.clients_created = 0
+        self.requests = 0
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self._lock = threading.Lock()
+
+    def client_created(self):
+        with self._lock:
+            self.clients_created += 1
+
+    def request_sent(self, reused_connection):
+        with self._lock:
+            self.requests += 1
+            if reused_connection:
+                self.connections_reused += 1
+            else:
+                self.connections_opened += 1
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "clients_created": self.clients_created,
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "connections_reused": self.connections_reused,
+            }
+
+
+client_stats = ClientStats()
+
+
+class CountingHttp(httplib2.Http):
+    """httplib2.Http that reports whether each request reused a pooled connection."""
+
+    def request(self, uri, *args, **kwargs):
+        scheme, authority = httplib2.urlnorm(httplib2.iri2uri(uri))[:2]
+        client_stats.request_sent(f"{scheme}:{authority}" in self.connections)
+        return super().request(uri, *args, **kwargs)
+
+
+def quota_exhausted_error():
+    """HttpError raised when no pooled key has quota left, shaped like YouTube's own."""
+    content = {"error": {"code": 403, "message": "Every YouTube API key has exhausted its daily quota.", "errors": [{"reason": "quotaExceeded"}]}}
+    return HttpError(httplib2.Response({"status": 403}), json.dumps(content).encode("utf-8"))
+
+
+def with_api_key(uri, api_key):
+    scheme, netloc, path, query, fragment = urlsplit(uri)
+    params = [(name, value) for name, value in parse_qsl(query, keep_blank_values=True) if name != "key"]
+    params.append(("key", api_key))
+    return urlunsplit((scheme, netloc, path, urlencode(params), fragment))
+
+
+class PooledHttpRequest(AccountedHttpRequest):
+    """Sends each call with the pooled API key that has the most headroom.
+
+    A key that answers quotaExceeded is set aside until the quota reset and the call is
+    sent again with the next key. Transient failures are retried and tracked by the
+    circuit breaker (see upstream).
+    """
+
+    def execute(self, *args, **kwargs):
+        return call_with_resilience(lambda: self._execute_with_pooled_key(*args, **kwargs))
+
+    def _execute_with_pooled_key(self, *args, **kwargs):
+        tried = set()
+        while True:
+            api_key = key_pool.choose(exclude=tried)
+            if api_key is None:
+                raise quota_exhausted_error()
+            self.key_label = api_key.label
+            self.uri = with_api_key(self.uri, api_key.value)
+            key_pool.record(api_key, QUOTA_COSTS.get(self.methodId, 1))
+            try:
+                return super().execute(*args, **kwargs)
+            except HttpError as e:
+                if not is_quota_error(e):
+                    raise
+                key_pool.mark_exhausted(api_key)
+                tried.add(api_key.label)
+
+
+def execute_batch(youtube, requests):
+    """Sends un-executed requests of `youtube` together and returns [(response, error)] in their order.
+
+    Up to BATCH_MAX_CALLS requests share one multipart batch round trip (a single
+    request is just executed). Each one is charged once, like a single call, and succeeds or
+    fails on its own: one answered with quotaExceeded is sent again with the next pooled
+    key, transient failures are retried with backoff, and any other error is returned in
+    its slot instead of failing the rest.
+    """
+    if len(requests) == 1:
+        try:
+            return [(requests[0].execute(), None)]
+        except QuotaBudgetExceeded:
+            raise  # Not a failed call: it was never sent
+        except Exception as e:
+            return [(None, e)]
+
+    results = [None] * len(requests)
+    pending = list(range(len(requests)))
+    tried = set()
+    attempt = 0
+    while pending:
+        api_key = key_pool.choose(exclude=tried)
+        if api_key is None:
+            for index in pending:
+                results[index] = (None, quota_exhausted_error())
+            break
+        quota_failed, retry = [], []
+        for start in range(0, len(pending), BATCH_MAX_CALLS):
+            chunk = pending[start:start + BATCH_MAX_CALLS]
+            responses = {}
+
+            def callback(request_id, response, exception, responses=responses):
+                responses[int(request_id)] = (response, exception)
+
+            batch = youtube.new_batch_http_request()
+            for index in chunk:
+                request = requests[index]
+                request.uri = with_api_key(request.uri, api_key.value)
+                key_pool.record(api_key, QUOTA_COSTS.get(request.methodId, 1))
+                request.key_label = api_key.label
+                request.charge()  # Only on the first attempt: a retry isn't a new call for the caller
+                batch.add(request, callback=callback, request_id=str(index))
+            try:
+                call_with_resilience(batch.execute)  # The round trip itself is retried there
+            except Exception as e:
+                for index in chunk:
+                    results[index] = (None, e)
+                continue
+            for index in chunk:
+                response, error = responses[index]
+                if error is not None and is_quota_error(error):
+                    quota_failed.append(index)
+                elif error is not None and is_transient(error) and attempt < UPSTREAM_MAX_RETRIES:
+                    retry.append(index)
+                else:
+                    results[index] = (response, error)
+        if quota_failed:
+            key_pool.mark_exhausted(api_key)
+            tried.add(api_key.label)
+        if retry:
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+        pending = sorted(quota_failed + retry)
+    return results
+
+
+@lru_cache(maxsize=None)
+def discovery_document(service_name=API_SERVICE_NAME, version=API_VERSION):
+    """The discovery document bundled with google-api-python-client, parsed once per process."""
+    content = get_static_doc(service_name, version)
+    if content is None:
+        raise RuntimeError(f"No bundled discovery document for {service_name} {version}.")
+    return json.loads(content)
+
+
+def build_http():
+    if fake_youtube.FAKE_API:
+        return fake_youtube.FakeYouTubeHttp()  # Offline stand-in (development and benchmarks)
+    # Same defaults as googleapiclient.http.build_http
+    http = CountingHttp(timeout=socket.getdefaulttimeout() or DEFAULT_HTTP_TIMEOUT_SEC)
+    http.redirect_codes = http.redirect_codes - {308}
+    if fake_youtube.RECORD_PATH:
+        return fake_youtube.RecordingHttp(http)
+    return http
+
+
+def build_client():
+    # The developer key given here is replaced per call by PooledHttpRequest
+    client = build_from_document(discovery_document(), http=build_http(), developerKey=key_pool.keys[0].value, requestBuilder=PooledHttpRequest)
+    client_stats.client_created()
+    return client
+
+
+_local = threading.local()
+
+
+def get_client():
+    """Returns this thread's YouTube client, building it once. None when no API key is configured."""
+    if not key_pool.configured:
+        return None
+    client = getattr(_local, "client", None)
+    if client is None:
+        client = _local.client = build_client()
+    return client
+
+
+api_workers = ThreadPoolExecutor(max_workers=API_WORKER_THREADS, thread_name_prefix="youtube-api")
+
+
+class WorkerPool:
+    """Runs one request's tasks on the shared `api_workers`, at most `max_workers` of them at a time.
+
+    Behaves like the ThreadPoolExecutor it replaces (submit, shutdown, context manager),
+    but its threads, and their clients, are kept after the request. Tasks beyond
+    `max_workers` wait here instead of in the shared queue.
+    """
+
+    def __init__(self, max_workers, executor=None):
+        self.max_workers = max(1, max_workers)
+        self._executor = executor or api_workers
+        self._queued = deque()
+        self._futures = []
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        with self._lock:
+            self._queued.append((future, fn, args, kwargs))
+            self._futures.append(future)
+        self._dispatch()
+        return future
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                if self._running >= self.max_workers or not self._queued:
+                    return
+                future, fn, args, kwargs = self._queued.popleft()
+                if not future.set_running_or_notify_cancel():
+                    continue  # Cancelled while queued
+                self._running += 1
+            self._executor.submit(fn, *args, **kwargs).add_done_callback(lambda task, future=future: self._finished(future, task))
+
+    def _finished(self, future, task):
+        with self._lock:
+            self._running -= 1
+        if task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+        self._dispatch()
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        if cancel_futures:
+            with self._lock:
+                queued, self._queued = self._queued, deque()
+            for future, _, _, _ in queued:
+                future.cancel()
+        if wait:
+            concurrent_wait(self._futures)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown(wait=True)
+        return False
@@ -0,0 +1,98 @@
+# src/services/youtube_data.py
+
+import json
+from flask import current_app, jsonify
+from googleapiclient.errors import HttpError
+from src.services import youtube_client
+from src.services.key_pool import key_pool
+from src.services.quota import QuotaBudgetExceeded
+
+# Data access shared by the YouTube routes and stores: the per-thread client, the
+# translation of API errors into responses, and ID lookups (videos.list /
+# channels.list) sent together as one batch round trip instead of one per 50 IDs.
+
+IDS_PER_LOOKUP = 50  # Maximum number of IDs per videos.list / channels.list call
+
+ERROR_MESSAGES = {
+    "default": "Error processing YouTube API request",
+    "quota": "YouTube API quota exceeded. Try again later.",
+    "bad_request": "Invalid request to YouTube API. Check parameters.",
+}
+
+
+def get_youtube_client():
+    """This thread's YouTube client, or None when no API key is configured or it can't be built."""
+    if not key_pool.configured:
+        current_app.logger.error("CRITICAL: YouTube API key not configured (YOUTUBE_API_KEY or YOUTUBE_API_KEYS).")
+        return None
+    try:
+        return youtube_client.get_client()
+    except Exception as e:
+        current_app.logger.error(f"Error building YouTube client: {str(e)}")
+        return None
+
+
+def handle_youtube_api_error(e, messages=ERROR_MESSAGES):
+    """JSON error response for an exception raised by a YouTube API call.
+
+    quotaExceeded (and the caller's own budget running out mid-request) becomes 429,
+    other API errors keep their status. `messages` lets each blueprint answer in its own
+    language.
+    """
+    error_message = messages["default"]
+    status_code = 500
+    details = str(e)
+    if isinstance(e, QuotaBudgetExceeded):
+        error_message = messages["quota"]
+        status_code = 429
+    elif isinstance(e, HttpError):
+        try:
+            details = json.loads(e.content.decode("utf-8")).get("error", {})
+            error_message = details.get("message", error_message)
+            if e.resp.status == 403 and any("quotaExceeded" in reason.get("reason", "") for reason in details.get("errors", [])):
+                error_message = messages["quota"]
+                status_code = 429
+            elif e.resp.status == 400:
+                error_message = messages["bad_request"]
+                status_code = 400
+            else:
+                status_code = e.resp.status
+        except (ValueError, AttributeError):
+            details = e.content.decode("utf-8", "replace") if hasattr(e.content, "decode") else str(e.content)
+            status_code = e.resp.status if hasattr(e, "resp") else 500
+    current_app.logger.error(f"YouTube API Error: {status_code} - {error_message} - Details: {details}")
+    return jsonify({"error": error_message, "details": details}), status_code
+
+
+class IdLookup:
+    """One videos.list / channels.list call for up to IDS_PER_LOOKUP IDs, and its outcome."""
+
+    __slots__ = ("resource", "part", "ids", "items", "error")
+
+    def __init__(self, resource, part, ids):
+        self.resource = resource
+        self.part = part
+        self.ids = ids
+        self.items = []
+        self.error = None
+
+
+def id_lookups(resource, part, ids):
+    """Splits `ids` into lookups of `resource` ("videos" or "channels") with `part`."""
+    ids = list(ids)
+    return [IdLookup(resource, part, ids[i:i + IDS_PER_LOOKUP]) for i in range(0, len(ids), IDS_PER_LOOKUP)]
+
+
+def execute_lookups(youtube, lookups):
+    """Runs the lookups in as few round trips as possible (see youtube_client.execute_batch).
+
+    Fills each lookup's `items`, or its `error` when that call failed; the others are
+    unaffected. Returns `lookups`.
+    """
+    requests = [getattr(youtube, lookup.resource)().list(part=lookup.part, id=",".join(lookup.ids)) for lookup in lookups]
+    for lookup, (response, error) in zip(lookups, youtube_client.execute_batch(youtube, requests) if requests else []):
+        if error is not None:
+            lookup.error = error
+        else:
+            lookup.items = response.get("items", [])
+    return lookups
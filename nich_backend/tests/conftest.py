@@ -0,0 +1,25 @@
+# tests/conftest.py
+
+import os
+import tempfile
+
+import pytest
+
+# The app reads its configuration at import time: point it at a throwaway database and
+# keep the background scheduler and the real YouTube API (see fake_youtube) out of the tests
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ.setdefault("YOUTUBE_API_KEY", "test-key")
+os.environ.setdefault("HARVESTER_ENABLED", "false")
+os.environ.setdefault("YOUTUBE_FAKE_API", "synthetic")
+
+
+@pytest.fixture(scope="session")
+def app():
+    from src.main import app
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,44 @@
+# tests/test_find_niches.py
+
+import time
+
+from src.routes import youtube as youtube_routes
+from src.services import quota
+from src.services.fake_youtube import get_fake_api
+
+
+def fake_quota_units():
+    return get_fake_api().stats()["quota_units"]
+
+
+def test_abandoned_channels_stop_and_their_calls_are_booked(app, client, monkeypatch):
+    fake = get_fake_api()
+    monkeypatch.setattr(fake, "latency_ms", 40)
+    monkeypatch.setattr(youtube_routes, "FIND_NICHES_DEADLINE_SECONDS", 0.3)
+    monkeypatch.setattr(youtube_routes, "FIND_NICHES_CONCURRENCY", 2)
+    monkeypatch.setitem(quota.TIER_BUDGETS, "anonymous", 10 ** 9)
+    monkeypatch.setattr(quota, "global_daily_quota", lambda: 10 ** 9)
+    with app.app_context():
+        booked_before = quota.units_used("anon:198.51.100.51")
+    served_before = fake_quota_units()
+    pages_before = fake.stats()["calls"].get("youtube.playlistItems.list", 0)
+
+    response = client.get(
+        "/api/youtube/find_niches?keywords=deadline-woodworking&min_views=0&max_subs=1000000000&max_channels=30",
+        environ_base={"REMOTE_ADDR": "198.51.100.51"},
+    )
+    assert response.status_code == 200
+    assert int(response.headers["X-Incomplete-Channels"]) > 0
+
+    # Wait for the channels still running when the response was sent
+    served = fake_quota_units()
+    while True:
+        time.sleep(0.3)
+        if fake_quota_units() == served:
+            break
+        served = fake_quota_units()
+    with app.app_context():
+        booked = quota.units_used("anon:198.51.100.51") - booked_before
+    assert booked == served - served_before
+    # Queued channels never started: far fewer uploads pages than channels
+    assert fake.stats()["calls"]["youtube.playlistItems.list"] - pages_before < 30
@@ -0,0 +1,51 @@
+# tests/test_key_failover.py
+
+import itertools
+
+import pytest
+
+from src.services import youtube_client
+from src.services.fake_youtube import api_error, get_fake_api
+from src.services.key_pool import ApiKey, key_pool
+from src.services.quota import QuotaLedger, with_ledger
+from src.services.video_store import get_videos
+
+_ids = itertools.count()
+
+
+@pytest.fixture
+def exhausted_first_key(monkeypatch):
+    """Two pooled keys; the first one answers every call with quotaExceeded."""
+    monkeypatch.setattr(key_pool, "_keys", [ApiKey("failover-key-a"), ApiKey("failover-key-b")])
+    fake = get_fake_api()
+    respond = fake.respond
+
+    def respond_with_exhausted_key(uri, round_trip=True):
+        if "key=failover-key-a" in uri:
+            return api_error(403)
+        return respond(uri, round_trip)
+
+    monkeypatch.setattr(fake, "respond", respond_with_exhausted_key)
+
+
+def lookup_units(app, count):
+    """Quota units charged to a caller for looking up `count` new videos."""
+    ledger = QuotaLedger("test", "anonymous")
+    video_ids = [f"failover{next(_ids)}_0" for _ in range(count)]  # Upload 0 of a synthetic channel always exists
+
+    @with_ledger(ledger)
+    def lookup():
+        with app.app_context():
+            youtube = youtube_client.build_client()  # Fresh client: the patched key pool decides the keys
+            return get_videos(youtube, video_ids)
+
+    assert set(lookup()) == set(video_ids)
+    return ledger.total_units
+
+
+def test_batched_calls_failed_over_to_another_key_are_charged_once(app, exhausted_first_key):
+    assert lookup_units(app, 100) == 2  # Two videos.list calls of 50 IDs, in one batch
+
+
+def test_single_call_failed_over_to_another_key_is_charged_once(app, exhausted_first_key):
+    assert lookup_units(app, 10) == 1
@@ -0,0 +1,20 @@
+# tests/test_niche_warehouse.py
+
+from src.models.user import db
+from src.models.niche_data import NicheDemand
+from src.services.niche_warehouse import record_niche_requests, normalize_keyword
+
+
+def test_record_niche_requests_counts_each_request(app):
+    with app.app_context():
+        record_niche_requests(["Demand Cooking", "demand cooking", "Demand Fishing"])
+        first_seen = db.session.get(NicheDemand, normalize_keyword("demand cooking")).last_requested_at
+        record_niche_requests(["Demand Cooking"])
+        db.session.expire_all()
+
+        cooking = db.session.get(NicheDemand, normalize_keyword("demand cooking"))
+        fishing = db.session.get(NicheDemand, normalize_keyword("demand fishing"))
+        assert cooking.request_count == 2  # Repeated niches in one request count once
+        assert cooking.last_requested_at >= first_seen
+        assert fishing.request_count == 1
+        db.session.remove()
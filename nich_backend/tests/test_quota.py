@@ -0,0 +1,63 @@
+# tests/test_quota.py
+
+import pytest
+
+from src.models.user import User, db
+from src.routes.auth import generate_token
+
+
+def caller(client, **kwargs):
+    response = client.get("/api/quota/usage", **kwargs)
+    assert response.status_code == 200
+    return response.get_json()["caller"]
+
+
+def test_anonymous_caller_is_keyed_on_the_proxy_hop(client):
+    # The router appends the address it saw; anything before it was sent by the client
+    response = caller(client, headers={"X-Forwarded-For": "1.2.3.4, 203.0.113.9"}, environ_base={"REMOTE_ADDR": "10.0.0.1"})
+    assert response["scope"] == "anon:203.0.113.9"
+    assert response["tier"] == "anonymous"
+
+
+def test_spoofed_forwarded_for_does_not_change_the_scope(client):
+    first = caller(client, headers={"X-Forwarded-For": "1.1.1.1, 203.0.113.9"}, environ_base={"REMOTE_ADDR": "10.0.0.1"})
+    second = caller(client, headers={"X-Forwarded-For": "2.2.2.2, 203.0.113.9"}, environ_base={"REMOTE_ADDR": "10.0.0.1"})
+    assert first["scope"] == second["scope"]
+
+
+def test_direct_connection_uses_the_socket_address(client):
+    assert caller(client, environ_base={"REMOTE_ADDR": "198.51.100.7"})["scope"] == "anon:198.51.100.7"
+
+
+@pytest.fixture
+def users(app):
+    with app.app_context():
+        free = User(name="Free", email="free@example.com", password_hash="x")
+        subscribed = User(name="Paid", email="paid@example.com", password_hash="x", subscription_status="active")
+        db.session.add_all([free, subscribed])
+        db.session.commit()
+        ids = {"free": free.id, "subscribed": subscribed.id}
+    yield ids
+    with app.app_context():
+        User.query.filter(User.id.in_(ids.values())).delete(synchronize_session=False)
+        db.session.commit()
+
+
+@pytest.mark.parametrize("tier", ["free", "subscribed"])
+def test_bearer_token_resolves_the_user(client, users, tier):
+    token = generate_token(users[tier])
+    response = caller(client, headers={"Authorization": f"Bearer {token}"})
+    assert response["scope"] == f"user:{users[tier]}"
+    assert response["tier"] == tier
+
+
+def test_invalid_token_falls_back_to_anonymous(client):
+    response = caller(client, headers={"Authorization": "Bearer not-a-token"}, environ_base={"REMOTE_ADDR": "198.51.100.7"})
+    assert response["scope"] == "anon:198.51.100.7"
+    assert response["tier"] == "anonymous"
+
+
+def test_issued_tokens_are_accepted_by_protected_routes(client, users):
+    response = client.get("/api/auth/me", headers={"Authorization": f"Bearer {generate_token(users['free'])}"})
+    assert response.status_code == 200
+    assert response.get_json()["id"] == users["free"]
@@ -0,0 +1,76 @@
+# tests/test_quota_budget.py
+
+from src.services import quota
+
+
+def search(client, niches, address):
+    return client.get(
+        f"/api/search/viral-videos?niches={niches}&platform=youtube&local_first=false",
+        environ_base={"REMOTE_ADDR": address},
+    )
+
+
+def test_budget_running_out_mid_search_is_a_429(app, client, monkeypatch):
+    monkeypatch.setitem(quota.TIER_BUDGETS, "anonymous", 150)
+    response = search(client, "budget-birds,budget-fish,budget-cows", "198.51.100.31")
+    assert response.status_code == 429
+    assert "degraded" not in response.get_json()
+
+
+def test_budget_failure_is_not_stored_for_other_callers(app, client, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setitem(quota.TIER_BUDGETS, "anonymous", 150)
+        assert search(client, "shared-birds,shared-fish", "198.51.100.32").status_code == 429
+
+    # The next caller gets a search of its own, not the budget-cut result
+    response = search(client, "shared-birds,shared-fish", "198.51.100.33")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert "degraded" not in body
+    assert body["pagination"]["total_results"] > 0
+
+
+def test_find_niches_budget_running_out_is_a_429(app, client, monkeypatch):
+    # Enough for the channel search and channels.list, not for the uploads of the channels
+    monkeypatch.setitem(quota.TIER_BUDGETS, "anonymous", 101)
+    response = client.get("/api/youtube/find_niches?keywords=budget-gardening&min_views=0", environ_base={"REMOTE_ADDR": "198.51.100.34"})
+    assert response.status_code == 429
+    assert "Quota" in response.get_json()["error"]
+
+
+def test_spent_budget_still_serves_snapshot_pages_and_revalidations(app, client, monkeypatch):
+    first = search(client, "cached-birds", "198.51.100.35")
+    assert first.status_code == 200
+    snapshot_id = first.get_json()["pagination"]["snapshot_id"]
+
+    monkeypatch.setitem(quota.TIER_BUDGETS, "anonymous", 0)
+    assert search(client, "uncached-birds", "198.51.100.36").status_code == 429
+
+    page = client.get(
+        f"/api/search/viral-videos?niches=cached-birds&platform=youtube&local_first=false&snapshot_id={snapshot_id}&page_size=1",
+        environ_base={"REMOTE_ADDR": "198.51.100.36"},
+    )
+    assert page.status_code == 200
+    assert page.headers["X-Quota-Units"] == "0"
+
+    revalidated = client.get(
+        f"/api/search/viral-videos?niches=cached-birds&platform=youtube&local_first=false&snapshot_id={snapshot_id}&page_size=1",
+        headers={"If-None-Match": page.headers["ETag"]},
+        environ_base={"REMOTE_ADDR": "198.51.100.36"},
+    )
+    assert revalidated.status_code == 304
+
+
+def test_quota_remaining_header_includes_the_global_share(app, client, monkeypatch):
+    first = search(client, "headroom-birds", "198.51.100.37")
+    with app.app_context():
+        global_used = quota.units_used("global")
+    # The key pool only has 50 units left, far less than the caller's own budget
+    monkeypatch.setattr(quota, "QUOTA_FREE_GLOBAL_SHARE", 1.0)
+    monkeypatch.setattr(quota, "global_daily_quota", lambda: global_used + 50)
+    page = client.get(
+        f"/api/search/viral-videos?niches=headroom-birds&platform=youtube&local_first=false&snapshot_id={first.get_json()['pagination']['snapshot_id']}",
+        environ_base={"REMOTE_ADDR": "198.51.100.38"},
+    )
+    assert page.status_code == 200
+    assert page.headers["X-Quota-Remaining"] == "50"
@@ -0,0 +1,63 @@
+# tests/test_result_columns.py
+
+import random
+from dataclasses import asdict
+
+import pytest
+
+from src.models.records import ShortVideoRecord
+from src.services.result_columns import ResultColumns
+
+
+def make_record(index, views, likes):
+    return ShortVideoRecord(
+        id=f"v{index}", platform="youtube", niche="cats", videoTitle=f"Video {index}",
+        videoLink=f"https://www.youtube.com/shorts/v{index}", thumbnailUrl="",
+        publishedAt="2026-01-01T00:00:00Z", viewCount=views, likeCount=likes, commentCount=None,
+        channelName="Channel", channelLink="https://www.youtube.com/channel/c1", subscriberCount=1000,
+    )
+
+
+@pytest.fixture
+def records():
+    rng = random.Random(7)
+    # Few distinct values, so most rows tie with others
+    return [make_record(index, rng.choice([0, 10, 10, 50, 100]), rng.choice([0, 1, 5])) for index in range(200)]
+
+
+@pytest.mark.parametrize("k", [1, 3, 17, 199, 200, 500])
+def test_top_keeps_ties_in_input_order(records, k):
+    columns = ResultColumns(records)
+    expected = sorted(range(len(records)), key=lambda index: -records[index].viewCount)[:k]
+    assert columns.top("views", k).tolist() == expected
+
+
+def test_top_likes_per_view_matches_stable_sort(records):
+    def likes_per_view(record):
+        return record.likeCount / record.viewCount if record.viewCount else 0.0
+
+    columns = ResultColumns(records)
+    expected = sorted(range(len(records)), key=lambda index: -likes_per_view(records[index]))[:25]
+    assert columns.top("likes_per_view", 25).tolist() == expected
+
+
+def test_top_of_empty_and_non_positive_k(records):
+    assert ResultColumns([]).top("views", 10).tolist() == []
+    assert ResultColumns(records).top("views", 0).tolist() == []
+
+
+def test_rows_come_back_as_the_input_type(records):
+    columns = ResultColumns(records)
+    assert columns.rows(limit=5) == sorted(records, key=lambda record: -record.viewCount)[:5]
+    assert ResultColumns([asdict(record) for record in records]).rows(limit=5) == [asdict(record) for record in columns.rows(limit=5)]
+
+
+def test_missing_counts_round_trip_as_none(records):
+    row = ResultColumns(records).row(0)
+    assert row.commentCount is None
+    assert row == records[0]
+
+
+def test_unknown_sort_key(records):
+    with pytest.raises(ValueError):
+        ResultColumns(records).top("nope", 5)
@@ -0,0 +1,80 @@
+# tests/test_search_jobs.py
+
+import threading
+
+import pytest
+
+from src.models.user import db
+from src.models.search_job import SearchJob
+from src.services.search_jobs import SearchJobRunner, active_job_key
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
+        db.session.remove()
+
+
+@pytest.fixture
+def blocked_run():
+    release = threading.Event()
+
+    def run(params, on_progress):
+        release.wait(10)
+        return {"results": []}
+
+    yield run
+    release.set()
+
+
+def test_pending_job_is_reused_only_by_the_same_scope(app_context, blocked_run):
+    runner = SearchJobRunner(max_workers=2)
+    params = {"keywords": "scope-test"}
+
+    first, reused = runner.submit("niches", params, "key-scope", blocked_run, "ip:1.1.1.1", "free")
+    assert not reused
+    again, reused = runner.submit("niches", params, "key-scope", blocked_run, "ip:1.1.1.1", "free")
+    assert reused and again["id"] == first["id"]
+
+    other, reused = runner.submit("niches", params, "key-scope", blocked_run, "ip:2.2.2.2", "free")
+    assert not reused and other["id"] != first["id"]
+
+
+def test_job_queued_by_another_worker_is_reused(app_context, blocked_run, monkeypatch):
+    # Two processes: each has its own runner lock, so only the database can de-duplicate
+    first_worker = SearchJobRunner(max_workers=1)
+    second_worker = SearchJobRunner(max_workers=1)
+    first, _ = first_worker.submit("niches", {"keywords": "race"}, "key-race", blocked_run, "ip:3.3.3.3", "free")
+
+    # The second worker looked before the first one committed: its first lookup misses
+    find_pending = second_worker.find_pending
+    lookups = []
+
+    def racing_find_pending(*args):
+        lookups.append(args)
+        return find_pending(*args) if len(lookups) > 1 else None
+
+    monkeypatch.setattr(second_worker, "find_pending", racing_find_pending)
+    job, reused = second_worker.submit("niches", {"keywords": "race"}, "key-race", blocked_run, "ip:3.3.3.3", "free")
+
+    assert reused and job["id"] == first["id"]
+    assert SearchJob.query.filter_by(params_key="key-race").count() == 1
+
+
+def test_finished_job_releases_its_key(app_context):
+    runner = SearchJobRunner(max_workers=1)
+
+    def run(params, on_progress):
+        return {"results": []}
+
+    job, _ = runner.submit("niches", {"keywords": "done"}, "key-done", run, "ip:4.4.4.4", "free")
+    runner._get_executor().submit(lambda: None).result(5)  # Single worker: the job ran before this
+    db.session.expire_all()
+
+    finished = db.session.get(SearchJob, job["id"])
+    assert finished.status == SearchJob.STATUS_SUCCEEDED
+    assert finished.active_key is None
+    assert not SearchJob.query.filter_by(active_key=active_job_key("niches", "key-done", "ip:4.4.4.4")).count()
+    again, reused = runner.submit("niches", {"keywords": "done"}, "key-done", run, "ip:4.4.4.4", "free")
+    assert not reused and again["id"] != job["id"]
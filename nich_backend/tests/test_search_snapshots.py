@@ -0,0 +1,79 @@
+# tests/test_search_snapshots.py
+
+import pytest
+
+from src.services import search_snapshots
+from src.services.search_snapshots import SearchSnapshotStore, make_search_key, normalize_niches
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(search_snapshots.time, "time", lambda: now[0])
+    return now
+
+
+def results(count=3):
+    return [{"id": f"v{index}", "niche": "cats", "viewCount": index} for index in range(count)]
+
+
+def test_normalize_niches():
+    assert normalize_niches([" Cats", "dogs ", "CATS", "", "  ", None]) == ["cats", "dogs"]
+
+
+def test_search_key_ignores_niche_order_case_and_duplicates():
+    key = make_search_key(["Cats", "dogs"], max_subs=1000, days=7)
+    assert make_search_key(["dogs", " cats ", "cats"], days=7, max_subs=1000) == key
+    assert make_search_key(["cats"], max_subs=1000, days=7) != key
+    assert make_search_key(["cats", "dogs"], max_subs=2000, days=7) != key
+
+
+def test_snapshot_expires_after_ttl(clock):
+    store = SearchSnapshotStore(ttl=60)
+    snapshot = store.put("key", results())
+    assert snapshot.expires_in() == 60
+
+    clock[0] += 59
+    assert store.get(snapshot.id) is snapshot
+    assert store.get(key="key") is snapshot
+
+    clock[0] += 1
+    assert snapshot.is_expired()
+    assert store.get(snapshot.id) is None
+    assert store.get(key="key") is None
+
+
+def test_put_ttl_overrides_store_default(clock):
+    store = SearchSnapshotStore(ttl=60)
+    snapshot = store.put("key", results(), ttl=5)
+    clock[0] += 5
+    assert store.get(snapshot.id) is None
+
+
+def test_cursor_only_honoured_for_the_same_search(clock):
+    store = SearchSnapshotStore()
+    snapshot = store.put("cats", results())
+    other = store.put("dogs", results())
+    assert store.get(snapshot.id, key="cats") is snapshot
+    # A cursor from another search falls back to the key
+    assert store.get(snapshot.id, key="dogs") is other
+    assert store.get(snapshot.id, key="birds") is None
+
+
+def test_put_replaces_the_snapshot_of_the_same_key(clock):
+    store = SearchSnapshotStore()
+    first = store.put("key", results())
+    second = store.put("key", results(5))
+    assert store.get(first.id) is None
+    assert store.get(key="key") is second
+
+
+def test_lru_eviction(clock):
+    store = SearchSnapshotStore(max_entries=2)
+    first = store.put("a", results())
+    second = store.put("b", results())
+    store.get(first.id)  # Most recently used now
+    store.put("c", results())
+    assert store.get(key="a") is first
+    assert store.get(second.id) is None
+    assert store.get(key="b") is None
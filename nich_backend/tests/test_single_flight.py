@@ -0,0 +1,70 @@
+# tests/test_single_flight.py
+
+import time
+import threading
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from src.services.quota import QuotaBudgetExceeded
+from src.services.single_flight import SingleFlight
+
+
+def run_with_follower(app, flights, leader_fn, follower_fn):
+    """Runs leader_fn as the leader of "key" and follower_fn from a caller that joins it; returns both outcomes."""
+    started, release = threading.Event(), threading.Event()
+    outcomes = {}
+
+    def leader():
+        started.set()
+        release.wait(5)
+        return leader_fn()
+
+    def call(name, fn):
+        with app.app_context():
+            try:
+                outcomes[name] = flights.do("key", fn)
+            except Exception as e:
+                outcomes[name] = e
+
+    leader_thread = threading.Thread(target=call, args=("leader", leader))
+    leader_thread.start()
+    started.wait(5)
+    follower_thread = threading.Thread(target=call, args=("follower", follower_fn))
+    follower_thread.start()
+    # Let the leader finish only once the follower is blocked on its call
+    deadline = time.monotonic() + 5
+    while not flights._calls["key"].done._cond._waiters and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    leader_thread.join(5)
+    follower_thread.join(5)
+    return outcomes["leader"], outcomes["follower"]
+
+
+def test_followers_share_the_leader_result(app):
+    leader, follower = run_with_follower(app, SingleFlight(), lambda: "result", lambda: "own")
+    assert leader == ("result", False)
+    assert follower == ("result", True)
+
+
+def test_leader_budget_failure_is_not_shared(app):
+    def out_of_budget():
+        raise QuotaBudgetExceeded("leader is out of budget")
+
+    leader, follower = run_with_follower(app, SingleFlight(shared_errors=(HttpError,)), out_of_budget, lambda: "own")
+    assert isinstance(leader, QuotaBudgetExceeded)
+    assert follower == ("own", False)
+
+
+def test_upstream_failures_are_shared(app):
+    def upstream_down():
+        raise HttpError(httplib2.Response({"status": 503}), b"{}")
+
+    def must_not_run():
+        pytest.fail("the follower ran the search again")
+
+    leader, follower = run_with_follower(app, SingleFlight(shared_errors=(HttpError,)), upstream_down, must_not_run)
+    assert isinstance(leader, HttpError)
+    assert follower is leader
@@ -0,0 +1,38 @@
+# tests/test_viral_search_stream.py
+
+import json
+
+from src.services import quota
+
+
+def stream(client, niches, address):
+    response = client.get(
+        f"/api/search/viral-videos?niches={niches}&platform=youtube&local_first=false&stream=ndjson",
+        environ_base={"REMOTE_ADDR": address},
+    )
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+
+
+def used_units(app, scope):
+    with app.app_context():
+        return quota.units_used(scope)
+
+
+def test_streamed_search_is_booked_on_the_caller(app, client):
+    global_before = used_units(app, "global")
+    system_before = used_units(app, "system")
+    events = stream(client, "stream-cats,stream-dogs", "198.51.100.21")
+    assert events[-1]["type"] == "done"
+    spent = used_units(app, "anon:198.51.100.21")
+    assert spent > 0
+    assert used_units(app, "global") - global_before == spent
+    assert used_units(app, "system") == system_before
+
+
+def test_streamed_search_stops_at_the_caller_budget(app, client, monkeypatch):
+    monkeypatch.setitem(quota.TIER_BUDGETS, "anonymous", 150)
+    events = stream(client, "stream-birds,stream-fish,stream-cows", "198.51.100.22")
+    assert events[-1]["type"] == "error"
+    assert "quota" in events[-1]["error"]
+    assert 0 < used_units(app, "anon:198.51.100.22") <= 150
@@ -0,0 +1,53 @@
+# tests/test_youtube_client.py
+
+import threading
+import time
+
+import pytest
+
+from src.services import quota
+from src.services.youtube_client import WorkerPool, client_stats
+
+
+def test_worker_pool_caps_concurrency_per_request():
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def task(value):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return value * 2
+
+    with WorkerPool(3) as pool:
+        futures = [pool.submit(task, value) for value in range(12)]
+    assert [future.result() for future in futures] == [value * 2 for value in range(12)]
+    assert peak[0] == 3
+
+
+def test_worker_pool_propagates_errors_and_cancels_queued_tasks():
+    release = threading.Event()
+    pool = WorkerPool(1)
+    blocking = pool.submit(release.wait, 5)
+    queued = pool.submit(lambda: 1)
+    failing = WorkerPool(1).submit(lambda: 1 / 0)
+    pool.shutdown(wait=False, cancel_futures=True)
+    release.set()
+    assert queued.cancelled()
+    assert blocking.result(5) is True
+    with pytest.raises(ZeroDivisionError):
+        failing.result(5)
+
+
+def test_clients_outlive_the_requests(app, client, monkeypatch):
+    monkeypatch.setitem(quota.TIER_BUDGETS, "anonymous", 10 ** 9)
+    monkeypatch.setattr(quota, "global_daily_quota", lambda: 10 ** 9)
+    for niches in ("reuse-a,reuse-b,reuse-c", "reuse-d,reuse-e,reuse-f"):
+        before = client_stats.to_dict()["clients_created"]
+        response = client.get(f"/api/search/viral-videos?niches={niches}&platform=youtube&local_first=false", environ_base={"REMOTE_ADDR": "198.51.100.41"})
+        assert response.status_code == 200
+    # The second search runs on the threads, and clients, the first one created
+    assert client_stats.to_dict()["clients_created"] == before
@@ -36,6 +36,8 @@ interface PaginationInfo {
   page_size: number;
   total_pages: number;
   total_results: number;
+  snapshot_id?: string;
+  snapshot_expires_in?: number;
 }
 
 // Interface para a resposta da API
@@ -86,6 +88,7 @@ export default function Home() {
   const [apiPageSize, setApiPageSize] = useState(100);
   const [apiTotalPages, setApiTotalPages] = useState(1);
   const [apiTotalResults, setApiTotalResults] = useState(0);
+  const [apiSnapshotId, setApiSnapshotId] = useState<string | null>(null);
 
   // Load saved channels from localStorage on component mount
   useEffect(() => {
@@ -198,7 +201,10 @@ export default function Home() {
 
     try {
       const backendUrl = import.meta.env.VITE_BACKEND_URL || "http://localhost:5000";
-      const response = await fetch(`${backendUrl}/api/search/viral-videos?${params.toString()}`);
+      const token = localStorage.getItem('token');
+      const response = await fetch(`${backendUrl}/api/search/viral-videos?${params.toString()}`, {
+        headers: token ? { 'Authorization': `Bearer ${token}` } : {}
+      });
 
       if (!response.ok) {
         const errorData = await response.json();
@@ -223,6 +229,7 @@ export default function Home() {
       setApiPageSize(paginationInfo.page_size);
       setApiTotalPages(paginationInfo.total_pages);
       setApiTotalResults(paginationInfo.total_results);
+      setApiSnapshotId(paginationInfo.snapshot_id || null);
       
       console.log(`Mostrando ${results.length} de ${paginationInfo.total_results} resultados totais (Página ${paginationInfo.page} de ${paginationInfo.total_pages})`);
 
@@ -252,10 +259,17 @@ export default function Home() {
     };
     
     const params = new URLSearchParams(searchParams);
+    // Reutiliza o snapshot da busca no backend (evita refazer a busca inteira no YouTube)
+    if (apiSnapshotId) {
+      params.set("snapshot_id", apiSnapshotId);
+    }
     
     try {
       const backendUrl = import.meta.env.VITE_BACKEND_URL || "http://localhost:5000";
-      const response = await fetch(`${backendUrl}/api/search/viral-videos?${params.toString()}`);
+      const token = localStorage.getItem('token');
+      const response = await fetch(`${backendUrl}/api/search/viral-videos?${params.toString()}`, {
+        headers: token ? { 'Authorization': `Bearer ${token}` } : {}
+      });
 
       if (!response.ok) {
         const errorData = await response.json();
@@ -267,6 +281,7 @@ export default function Home() {
       
       setAllResults(results);
       setApiCurrentPage(responseData.pagination.page);
+      setApiSnapshotId(responseData.pagination.snapshot_id || null);
       setCurrentPage(1); // Reset local pagination when changing API page
       
       console.log(`Carregada página ${responseData.pagination.page} de ${responseData.pagination.total_pages} (${results.length} resultados)`);